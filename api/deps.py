@@ -0,0 +1,13 @@
+from typing import List
+from fastapi import Body, HTTPException
+from database.portfolio import BULK_MAX_USERS
+
+
+def bulk_usernames(usernames: List[str] = Body(..., embed=True)) -> list:
+    """Usernames of a bulk request body ({"usernames": [...]}), without blanks and duplicates"""
+    usernames = list(dict.fromkeys(name.strip() for name in usernames if name.strip()))
+    if not usernames:
+        raise HTTPException(status_code=400, detail="At least one username is required")
+    if len(usernames) > BULK_MAX_USERS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_USERS} usernames per request")
+    return usernames
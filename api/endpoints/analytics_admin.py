@@ -0,0 +1,57 @@
+import re
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from database import crud
+from database.analytics_store import refresh_snapshot, snapshot_status
+from api.responses import FastJSONResponse
+
+router = APIRouter()
+
+# Query name -> crud function answering it from the analytics snapshot
+PORTFOLIO_QUERIES = {
+    "monthly_flows": crud.get_portfolio_monthly_flows,
+    "category_totals": crud.get_portfolio_category_totals,
+    "emi_ratios": crud.get_portfolio_emi_ratios,
+}
+
+MONTH_PATTERN = re.compile(r"^\d{4}-\d{2}$")
+
+@router.get("/snapshot")
+def get_snapshot_status():
+    """The current Parquet snapshot behind the portfolio queries"""
+    status = snapshot_status()
+    if status is None:
+        raise HTTPException(status_code=404, detail="No analytics snapshot yet; POST /admin/analytics/snapshot")
+    return status
+
+@router.post("/snapshot")
+def take_snapshot():
+    """Refresh the Parquet snapshot (only statement tables changed since the last one are read)"""
+    try:
+        result = refresh_snapshot()
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    print(f"📦 Analytics snapshot: {result['written']} tables written, {result['kept']} kept in {result['seconds']}s")
+    return result
+
+@router.get("/{query}")
+def portfolio_query(
+    query: str,
+    start_month: Optional[str] = Query(None, description="First month, YYYY-MM"),
+    end_month: Optional[str] = Query(None, description="Last month, YYYY-MM")
+):
+    """Cross-user aggregate answered from the latest snapshot, without touching Postgres"""
+    if query not in PORTFOLIO_QUERIES:
+        raise HTTPException(status_code=404, detail=f"Unknown query: {query}. Available: {list(PORTFOLIO_QUERIES)}")
+    for month in (start_month, end_month):
+        if month and not MONTH_PATTERN.match(month):
+            raise HTTPException(status_code=400, detail=f"Invalid month '{month}', expected YYYY-MM")
+
+    try:
+        result = PORTFOLIO_QUERIES[query](start_month, end_month)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=f"{e}; POST /admin/analytics/snapshot")
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    return FastJSONResponse({"query": query, **result})
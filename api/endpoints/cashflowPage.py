@@ -1,8 +1,14 @@
 import pandas as pd
 from fastapi import APIRouter, HTTPException, Query
 from typing import Optional
+from datetime import date
 import numpy as np
 from database import crud
+from database.monthly_aggregates import load_monthly_aggregates
+from database.daily_balances import load_daily_balances, combine_daily_balances
+from database.shared_cache import cached_payload
+from database.window_index import build_window_index
+from api.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -11,70 +17,55 @@ def financial_summary(username: Optional[str] = Query(None)):
     if not username:
         raise HTTPException(status_code=400, detail="Username is required")
 
-    user_id = crud.get_user_id_by_username(username)
-    if not user_id:
+    user_data = crud.get_user_statements(username)
+    if not user_data:
         raise HTTPException(status_code=404, detail="User not found")
 
-    table_names = crud.get_transaction_table_names(user_id)
-    if not table_names:
+    if not user_data["table_names"]:
         raise HTTPException(status_code=404, detail="No transaction tables found")
 
-    all_data = []
-    for table in table_names:
-        rows = crud.get_transaction_data_from_table(table)
-        if rows:
-            all_data.extend(rows)
+    return FastJSONResponse(cached_payload("cashflow-page", user_data, lambda: build_financial_summary(username)))
 
-    if not all_data:
+def build_financial_summary(username: str, user_data: Optional[dict] = None, balances: Optional[dict] = None) -> dict:
+    """
+    Monthwise cashflow table plus trailing 3/6/9/12-month aggregates, from
+    load_monthly_aggregates and load_daily_balances.
+    """
+    if user_data is None:
+        user_data = load_monthly_aggregates(username)
+    if not user_data or not user_data["rows"]:
         return {}
+    if balances is None:
+        balances = load_daily_balances(username)
 
-    df = pd.DataFrame(all_data)
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    df = df.dropna(subset=['date', 'balance_amount'])
-    df = df.sort_values('date')
-    df = df.drop_duplicates(subset='date', keep='last')
-
-    # Carry forward daily balance
-    full_range = pd.date_range(start=df['date'].min(), end=df['date'].max(), freq='D')
-    df_bal = df.set_index('date').reindex(full_range).rename_axis('date')
-    df_bal['balance'] = df_bal['balance_amount'].ffill()
-    df_bal['month'] = df_bal.index.to_period('M').astype(str)
-
-    # Main transaction DataFrame
-    df_txn = pd.DataFrame(all_data)
-    df_txn['date'] = pd.to_datetime(df_txn['date'], errors='coerce')
-    df_txn = df_txn.dropna(subset=['date'])
-
-    df_txn['month'] = df_txn['date'].dt.to_period('M').astype(str)
-
-    def compute_summary(df_txn, df_bal, months=None):
-        if months:
-            last_month = pd.Timestamp.today().to_period('M')
-            month_cutoff = last_month - months + 1
-            mask = df_txn['month'] >= month_cutoff.strftime('%Y-%m')
-            df_txn = df_txn[mask]
-            df_bal = df_bal[df_bal['month'] >= month_cutoff.strftime('%Y-%m')]
+    # Monthly aggregates are maintained at ingest time, one row per statement table and month
+    df_agg = pd.DataFrame(user_data["rows"])
 
+    # The average balance comes from the consolidated daily series instead: summing the per-table
+    # averages would count overlapping statements of the same account twice
+    daily = combine_daily_balances(balances["rows"], balances["accounts"]) if balances else combine_daily_balances([])
+    avg_balance = daily.groupby(daily.index.to_period('M').astype(str)).mean()
+
+    def compute_summary(df_agg):
         summary = (
-            df_txn.groupby('month')
+            df_agg.groupby('month')
             .agg(
-                inflow=('credit_amount', 'sum'),
-                outflow=('debit_amount', 'sum'),
-                inflow_txn_count=('credit_amount', lambda x: x.gt(0).sum()),
-                outflow_txn_count=('debit_amount', lambda x: x.gt(0).sum())
+                inflow=('inflow', 'sum'),
+                outflow=('outflow', 'sum'),
+                inflow_txn_count=('inflow_txn_count', 'sum'),
+                outflow_txn_count=('outflow_txn_count', 'sum'),
+                txn_count=('txn_count', 'sum')
             )
-            .fillna(0)
         )
-
-        avg_bal = df_bal.groupby('month')['balance'].mean().round(2)
+        summary = summary[summary['txn_count'] > 0].drop(columns='txn_count')
 
         summary['net_cash_flow'] = summary['inflow'] - summary['outflow']
-        summary['monthly_avg_balance'] = avg_bal
+        summary['monthly_avg_balance'] = avg_balance.reindex(summary.index).round(2)
 
         return summary.reset_index().fillna(0)
 
     # Monthly detailed data
-    monthwise = compute_summary(df_txn, df_bal)
+    monthwise = compute_summary(df_agg)
 
     def aggregate_period(df, period_label, months):
         last_months = df.tail(months)
@@ -98,3 +89,34 @@ def financial_summary(username: Optional[str] = Query(None)):
             aggregate_period(monthwise, "Last 12 Months", 12),
         ]
     }
+
+
+@router.get("/window")
+def cashflow_window(
+    username: Optional[str] = Query(None),
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to")
+):
+    """Cashflow totals, counts, largest debit/credit and average end-of-day balance of any date window"""
+    if not username:
+        raise HTTPException(status_code=400, detail="Username is required")
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+    user_data = crud.get_user_statements(username)
+    if not user_data:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if not user_data["table_names"]:
+        raise HTTPException(status_code=404, detail="No transaction tables found")
+
+    # Built once per data version; each window is then a few binary searches
+    index = cached_payload("window-index", user_data, lambda: build_window_index(username, user_data))
+    window = index.window(from_date, to_date)
+
+    return {
+        "username": username,
+        "from": from_date,
+        "to": to_date,
+        **{k: round(v, 2) if isinstance(v, float) else v for k, v in window.items()}
+    }
@@ -1,44 +1,40 @@
 from fastapi import APIRouter, HTTPException
-from database.crud import get_user_id_by_username, get_transaction_table_names, get_transaction_data_from_table
+from database.monthly_aggregates import load_monthly_aggregates
 import pandas as pd
 
 router = APIRouter()
 
 @router.get("/monthly-cashflow")
 def monthly_cashflow_summary(username: str):
-    # Step 1: Get user ID
-    user_id = get_user_id_by_username(username)
-    if user_id is None:
+    # Step 1: Resolve user and load the latest table's monthly aggregates
+    user_data = load_monthly_aggregates(username, latest_only=True)
+    if user_data is None:
         raise HTTPException(status_code=404, detail=f"User '{username}' not found")
 
-    # Step 2: Get latest transaction table for user
-    table_names = get_transaction_table_names(user_id)
-    if not table_names:
-        raise HTTPException(status_code=404, detail=f"No transaction tables found for user '{username}'")
+    return build_monthly_cashflow(username, user_data)
 
-    latest_table = sorted(table_names)[-1]
+def build_monthly_cashflow(username: str, user_data: dict) -> dict:
+    """Net cashflow per month of the latest statement table, from load_monthly_aggregates(..., latest_only=True)"""
+    # Step 2: Make sure the user has at least one transaction table
+    if not user_data["table_names"]:
+        raise HTTPException(status_code=404, detail=f"No transaction tables found for user '{username}'")
 
-    # Step 3: Load transaction data
-    transactions = get_transaction_data_from_table(latest_table)
-    if not transactions:
+    # Step 3: Load precomputed monthly rows
+    aggregates = user_data["rows"]
+    if not aggregates:
         raise HTTPException(status_code=404, detail="No transactions found in the latest table")
 
-    df = pd.DataFrame(transactions)
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    df = df.dropna(subset=['date'])
+    df = pd.DataFrame(aggregates)
+    df = df[df['txn_count'] > 0]
 
-    # Step 4: Group by month and calculate net cashflow
-    df['month'] = df['date'].dt.to_period('M').astype(str)
+    # Step 4: Calculate net cashflow per month
     result_df = (
-        df.groupby('month')
-        .agg(
-            total_credit=pd.NamedAgg(column='credit_amount', aggfunc='sum'),
-            total_debit=pd.NamedAgg(column='debit_amount', aggfunc='sum')
-        )
+        df.rename(columns={'inflow': 'total_credit', 'outflow': 'total_debit'})
+        [['month', 'total_credit', 'total_debit']]
         .fillna(0)
         .assign(net_cashflow=lambda x: x['total_credit'] - x['total_debit'])
         .round(2)
-        .reset_index()
+        .reset_index(drop=True)
     )
 
     return {
@@ -0,0 +1,70 @@
+import os
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from database import crud
+from database.frame_cache import load_user_frame
+from database.portfolio import load_users_frame, split_users_frame
+from database.shared_cache import cached_payload
+from bank_statement_parser.utils.compliance import COMPILED_RULES, evaluate_rules
+from api.responses import FastJSONResponse
+
+router = APIRouter()
+
+FLAG_COLUMNS = ['date', 'particulars', 'debit_amount', 'credit_amount', 'balance_amount']
+
+# Users whose transactions the batch loads together (override through the environment)
+COMPLIANCE_BATCH_USERS = int(os.getenv("COMPLIANCE_BATCH_USERS", "50"))
+
+@router.get("/red-flags")
+def red_flags(username: Optional[str] = Query(None)):
+    if not username:
+        raise HTTPException(status_code=400, detail="Username is required")
+
+    user_data = crud.get_user_statements(username)
+    if not user_data:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    content = cached_payload("red-flags", user_data, lambda: build_red_flags(load_user_frame(username, user_data)))
+    return FastJSONResponse(content)
+
+def build_red_flags(user_data: dict) -> dict:
+    """Transactions matched by each compliance rule, with a count and total per rule"""
+    df = user_data["frame"]
+    matches = evaluate_rules(df)
+
+    flags = {}
+    for rule in COMPILED_RULES["rules"]:
+        rows = df.iloc[matches[rule["name"]]]
+        amount = rows['debit_amount'].fillna(0) + rows['credit_amount'].fillna(0)
+        flags[rule["name"]] = {
+            "description": rule["description"],
+            "severity": rule["severity"],
+            "count": len(rows),
+            "total_amount": round(float(amount.sum()), 2),
+            "transactions": rows[FLAG_COLUMNS].assign(date=rows['date'].dt.strftime('%Y-%m-%d')).to_dict(orient='records'),
+        }
+    return {"red_flags": flags}
+
+@router.get("/batch")
+def red_flags_batch():
+    """Match counts of every compliance rule for every user with statements"""
+    return FastJSONResponse({"users": run_compliance_batch()})
+
+def run_compliance_batch() -> dict:
+    """
+    Run every compliance rule across all users. The rules are compiled once;
+    users are loaded COMPLIANCE_BATCH_USERS at a time with load_users_frame
+    (two queries per batch) and each user's rows are evaluated against all of
+    them. The frames bypass the frame cache, so a batch run does not evict the
+    frames of users being served.
+    """
+    results = {}
+    usernames = crud.get_all_usernames()
+    for start in range(0, len(usernames), COMPLIANCE_BATCH_USERS):
+        data = load_users_frame(usernames[start:start + COMPLIANCE_BATCH_USERS])
+        for username, frame in split_users_frame(data).items():
+            if not data["users"][username]["table_names"]:
+                continue
+            matches = evaluate_rules(frame)
+            results[username] = {name: len(rows) for name, rows in matches.items()}
+    return results
@@ -1,57 +1,64 @@
 import pandas as pd
 from fastapi import APIRouter, HTTPException, Query
 from typing import Optional
+from datetime import date
 import numpy as np
-from database import crud
+from database.daily_balances import load_daily_balances, combine_daily_balances
+from database.balance_kernel import day_numbers, lttb_points, minmax_points
+from api.responses import FastJSONResponse, frame_records
 
 router = APIRouter()
 
+# Downsampling methods: position picker of (day numbers, balances, max_points)
+DOWNSAMPLERS = {
+    "lttb": lttb_points,
+    "minmax": lambda days, balances, max_points: minmax_points(balances, max_points),
+}
+
 @router.get("/get-daily-balance")
-def get_daily_balance(username: Optional[str] = Query(None)):
+def get_daily_balance(
+    username: Optional[str] = Query(None),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    max_points: Optional[int] = Query(None, ge=3, description="Downsample the series to at most this many points"),
+    method: str = Query("lttb", description="Downsampling method: 'lttb' or 'minmax'")
+):
     if not username:
         raise HTTPException(status_code=400, detail="Username is required")
+    if method not in DOWNSAMPLERS:
+        raise HTTPException(status_code=400, detail=f"Unknown method: {method}. Available: {list(DOWNSAMPLERS)}")
 
-    user_id = crud.get_user_id_by_username(username)
-    if not user_id:
+    # Step 1: Load the end-of-day series stored at ingest, sliced to the requested range
+    user_data = load_daily_balances(username, start_date, end_date)
+    if not user_data:
         raise HTTPException(status_code=404, detail="User not found")
 
-    table_names = crud.get_transaction_table_names(user_id)
-    if not table_names:
-        return {}
+    return FastJSONResponse(build_daily_balance(user_data, max_points, method))
 
-    all_data = []
-    for table in table_names:
-        rows = crud.get_transaction_data_from_table(table)
-        if rows:
-            all_data.extend(rows)
+def build_daily_balance(user_data: dict, max_points: int = None, method: str = "lttb") -> dict:
+    """
+    End-of-day balances grouped by month, from load_daily_balances.
 
-    if not all_data:
+    With ``max_points`` a longer series is downsampled to the days that keep its
+    shape (days without a known balance are left out), for charts that cannot
+    draw one point per day anyway.
+    """
+    if not user_data["rows"]:
         return {}
 
-    # Step 1: Create DataFrame
-    df = pd.DataFrame(all_data)
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    df = df.dropna(subset=['date', 'balance_amount'])
-
-    # Step 2: Keep only the last balance per day
-    df = df.sort_values('date')
-    df = df.drop_duplicates(subset='date', keep='last')
+    # Step 2: One balance per calendar day across the user's statement tables
+    series = combine_daily_balances(user_data["rows"], user_data["accounts"], user_data["opening"])
+    if max_points and len(series) > max_points:
+        series = series.dropna()
+        keep = DOWNSAMPLERS[method](day_numbers(series.index.to_numpy()), series.to_numpy(), max_points)
+        series = series.iloc[keep]
+    df = series.to_frame()
 
-    # Step 3: Create a complete date range and reindex
-    full_range = pd.date_range(start=df['date'].min(), end=df['date'].max(), freq='D')
-    df = df.set_index('date').reindex(full_range).rename_axis('date')
-
-    # Step 4: Forward fill missing balances
-    df['balance'] = df['balance_amount'].ffill()
-
-    # Step 5: Prepare clean output
+    # Step 3: Prepare clean output
     df['month'] = df.index.to_period('M').astype(str)
     df['date'] = df.index.strftime('%Y-%m-%d')
-    df = df.replace({np.nan: None, np.inf: None, -np.inf: None})
 
-    result = {
-        month: group[['date', 'balance']].to_dict(orient='records')
+    return {
+        month: frame_records(group[['date', 'balance']])
         for month, group in df.groupby('month')
     }
-
-    return result
@@ -0,0 +1,115 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from functools import cached_property
+from database import crud
+from database.frame_cache import load_user_frame
+from database.shared_cache import cached_payload
+from database.monthly_aggregates import load_monthly_aggregates, latest_table_only
+from database.daily_balances import load_daily_balances
+from api.endpoints.month_wise_analysis import generate_monthly_summary
+from api.endpoints.overview_details import build_overview
+from api.endpoints.daily_balance_per_month import build_daily_balance
+from api.endpoints.monthly_balance_chart import build_monthly_avg_balance
+from api.endpoints.monthly_debit_credit_chart import build_monthly_debit_credit
+from api.endpoints.cashflow_chart import build_monthly_cashflow
+from api.endpoints.cashflowPage import build_financial_summary
+from api.responses import FastJSONResponse
+
+router = APIRouter()
+
+
+class DashboardSources:
+    """
+    The data behind the dashboard views, each loaded at most once per request:
+    the transaction frame, the monthly aggregates and the end-of-day balances.
+    """
+
+    def __init__(self, username: str, user_data: dict):
+        self.username = username
+        self.user_data = user_data
+
+    @cached_property
+    def frame(self):
+        return load_user_frame(self.username, dict(self.user_data))["frame"]
+
+    def frame_data(self) -> dict:
+        """user_data with a private copy of the frame, as load_user_frame returns it"""
+        return {**self.user_data, "frame": self.frame.copy()}
+
+    @cached_property
+    def aggregates(self) -> dict:
+        return load_monthly_aggregates(self.username)
+
+    @cached_property
+    def latest_aggregates(self) -> dict:
+        return latest_table_only(self.aggregates)
+
+    @cached_property
+    def daily_balances(self) -> dict:
+        return load_daily_balances(self.username)
+
+
+def summary_view(sources: DashboardSources):
+    summary = cached_payload(
+        "monthly-summary", sources.user_data,
+        lambda: generate_monthly_summary(sources.username, sources.frame_data())
+    )
+    return {"summary": summary}
+
+def overview_view(sources: DashboardSources):
+    return cached_payload("overview", sources.user_data, lambda: build_overview(sources.frame_data()))
+
+def cashflow_view(sources: DashboardSources):
+    if not sources.user_data["table_names"]:
+        raise HTTPException(status_code=404, detail="No transaction tables found")
+    return cached_payload(
+        "cashflow-page", sources.user_data,
+        lambda: build_financial_summary(sources.username, sources.aggregates, sources.daily_balances)
+    )
+
+# View name -> builder; each returns the payload of the matching individual endpoint
+DASHBOARD_VIEWS = {
+    "summary": summary_view,
+    "overview": overview_view,
+    "daily_balance": lambda s: build_daily_balance(s.daily_balances),
+    "monthly_avg_balance": lambda s: build_monthly_avg_balance(s.username, s.latest_aggregates),
+    "monthly_debit_credit": lambda s: build_monthly_debit_credit(s.username, s.latest_aggregates),
+    "monthly_cashflow": lambda s: build_monthly_cashflow(s.username, s.latest_aggregates),
+    "cashflow": cashflow_view,
+}
+
+@router.get("")
+def dashboard(
+    username: Optional[str] = Query(None),
+    views: Optional[str] = Query(None, description="Comma-separated views to compute, all when omitted")
+):
+    """
+    Several dashboard views in one response, computed from data loaded once.
+
+    Each view has the same shape as its individual endpoint. A view that the
+    endpoint would answer with an error is left out and its message is
+    reported under ``errors``.
+    """
+    if not username:
+        raise HTTPException(status_code=400, detail="Username is required")
+
+    names = [name.strip() for name in views.split(",") if name.strip()] if views else list(DASHBOARD_VIEWS)
+    unknown = [name for name in names if name not in DASHBOARD_VIEWS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown views: {unknown}. Available: {list(DASHBOARD_VIEWS)}")
+
+    # Step 1: Resolve the user once; every view shares the same data version
+    user_data = crud.get_user_statements(username)
+    if not user_data:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Step 2: Compute the requested views, loading each data source on first use
+    sources = DashboardSources(username, user_data)
+    result = {"username": username, "views": {}, "errors": {}}
+    for name in dict.fromkeys(names):
+        try:
+            result["views"][name] = DASHBOARD_VIEWS[name](sources)
+        except HTTPException as e:
+            result["errors"][name] = e.detail
+
+    return FastJSONResponse(result)
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import date
+from api.exports import EXPORT_FORMATS, export_users, export_stream
+
+router = APIRouter()
+
+@router.get("/{dataset}")
+def export_dataset(
+    dataset: str,
+    username: Optional[str] = Query(None),
+    all_users: bool = Query(False, description="Export every user instead of one"),
+    format: str = Query("parquet", description="'parquet', 'arrow' (IPC stream) or 'csv'"),
+    columns: Optional[str] = Query(None, description="Comma-separated columns, all when omitted"),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None)
+):
+    """
+    Stream transactions, daily balances or monthly summaries as a file, written
+    chunk by chunk as the rows are read (one Parquet row group / Arrow record
+    batch per chunk).
+    """
+    if not username and not all_users:
+        raise HTTPException(status_code=400, detail="Username is required (or all_users=true)")
+
+    # Step 1: Resolve the users to export
+    users = export_users(None if all_users else username)
+    if not users and not all_users:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Step 2: Check the request and open the writer before the response starts
+    try:
+        chunks = export_stream(
+            dataset, users, format,
+            [column.strip() for column in columns.split(",") if column.strip()] if columns else None,
+            start_date, end_date
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    filename = f"{'all_users' if all_users else username}_{dataset}.{EXPORT_FORMATS[format]['extension']}"
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[format]["media_type"],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
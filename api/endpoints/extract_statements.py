@@ -1,32 +1,11 @@
 from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import JSONResponse
 from typing import Optional
 from pathlib import Path
 from bank_statement_parser.utils.extraction_core_process import run_extraction
-from pandas import Timestamp
-import pandas as pd
-import numpy as np
-import math
-import json
+from api.responses import FastJSONResponse, frame_records
 
 router = APIRouter()
 
-def serialize_value(val):
-    if isinstance(val, Timestamp):
-        return val.isoformat()
-    elif isinstance(val, float):
-        if math.isnan(val) or math.isinf(val):
-            return None
-    return val
-
-def safe_json(obj):
-    if isinstance(obj, dict):
-        return {k: safe_json(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [safe_json(v) for v in obj]
-    else:
-        return serialize_value(obj)
-
 @router.get("/extract-statement")
 def extract_bank_statement(username: str = Query(...)):
     pdf_path = Path("./bank_statements") / f"{username}.pdf"
@@ -43,18 +22,14 @@ def extract_bank_statement(username: str = Query(...)):
     try:
         metadata, df, unmatched_count, unmatched_lines = run_extraction(str(pdf_path), password, username)
 
-        metadata = safe_json(metadata)
-
-        df_serialized = df.head(5).replace({np.nan: None}).applymap(serialize_value)
-        df_dict = df_serialized.to_dict(orient="records")
-
-        return JSONResponse(status_code=200, content=safe_json({
+        # Timestamps, NaN and NumPy values are handled by the response encoder
+        return FastJSONResponse(status_code=200, content={
             "message": "✅ Extraction successful",
             "metadata": metadata,
-            "sample_transactions": df_dict,
+            "sample_transactions": frame_records(df.head(5)),
             "columns": list(df.columns),
             "unmatched_count": unmatched_count,
             "unmatched_lines": unmatched_lines[:5]
-        }))
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
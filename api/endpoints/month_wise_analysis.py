@@ -4,187 +4,130 @@ import pandas as pd
 from datetime import datetime
 import re
 from database import crud
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Depends
 from typing import Optional
 from database import crud
 import numpy as np
 from database import crud
-from bank_statement_parser.utils.regex_loader import load_regex_patterns_from_json
+from database.frame_cache import load_user_frame
+from database.shared_cache import cached_payload
+from database.summary_metrics import MetricContext, UsersMetricContext, SUMMARY_FIELDS, evaluate_summary, evaluate_users_summary
+from database.portfolio import load_users_frame
+from api.responses import FastJSONResponse
+from api.deps import bulk_usernames
 
 router = APIRouter()
     
 
 
-def generate_monthly_summary(username: str):
-    user_id = crud.get_user_id_by_username(username)
-    if not user_id:
+def generate_monthly_summary(username: str, user_data: Optional[dict] = None, fields: Optional[list] = None):
+    if user_data is None:
+        user_data = load_user_frame(username)
+    if not user_data:
         return None  
       
-    # Safely extract metadata and bank name
-    metadata_list = crud.get_metadata_by_user_id(user_id)
+    # Safely extract metadata
+    metadata_list = user_data["metadata"]
     metadata = metadata_list[0] if metadata_list else {}
-    bank_name = metadata.get("bank_name", "")
-    
-    try:
-        patterns = load_regex_patterns_from_json(bank_name)
-        print(f"🔍 Loaded patterns for bank: {bank_name}")
-    except ValueError:
-        raise HTTPException(status_code=400, detail=f"No regex patterns defined for bank: {bank_name}")
-        # Fallback to default patterns if bank not supported
-        # patterns = {
-        #     "penalty_pattern": r'(?i)(?:penalty|fine|chargeback|PENAL|penal)',
-        #     "bank_charges_pattern": r'(?i)(?:bank charges|service charge|processing fee)',
-        #     "cash_deposit_pattern": r'(?i)(?:cash deposit|cash dep|cash received)',
-        #     "cash_withdrawal_pattern": r'(?i)(?:cash withdrawal|atm withdrawal|cash wdl)',
-        # }
-
-    PENALTY_PATTERN = patterns["penalty_pattern"]
-    BANK_CHARGES_PATTERN = patterns["bank_charges_pattern"]
-    CASH_DEPOSIT_PATTERN = patterns["cash_deposit_pattern"]
-    CASH_WITHDRAWAL_PATTERN = patterns["cash_withdrawal_pattern"]
-
-    table_names = crud.get_transaction_table_names(user_id)
-    all_data = []
-    
-    if not table_names:
-       return None  # No transaction tables found for the user
 
-    for table in table_names:
-        rows = crud.get_transaction_data_from_table(table)
-        if rows:
-            all_data.extend(rows)
+    if not user_data["table_names"]:
+       return None  # No transaction tables found for the user
 
-    if not all_data:
+    df = user_data["frame"]
+    if df.empty:
         return None
 
-    df = pd.DataFrame(all_data)
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    df = df.dropna(subset=['date'])
-    df['month'] = df['date'].dt.to_period('M')
-    df = df.sort_values(by='date')
-    
-    # Ensure month column exists
-    df['month'] = df['date'].dt.to_period('M')
-
-    # Filter only debit transactions
-    all_debit_txns = df[df['debit_amount'].notnull() & (df['debit_amount'] > 0)]
-
-    # Group by debit amount and month
-    grouped = all_debit_txns.groupby(['debit_amount', 'month']).size().reset_index(name='count')
+    df = prepare_summary_frame(df)
 
-    # Count in how many distinct months each debit_amount appears
-    emi_frequency = grouped.groupby('debit_amount').size().reset_index(name='distinct_months')
+    user_opening_balance = metadata.get("opening_balance")
+    statement_opening_balance = float(user_opening_balance) if user_opening_balance is not None else None
 
-    # Total number of months in the data
-    total_months = df['month'].nunique()
+    # Evaluate only the requested metrics (and the intermediates they need)
+    ctx = MetricContext(df, username, statement_opening_balance)
+    return evaluate_summary(ctx, fields)
 
-    # Consider EMI only if the debit_amount appears in >= N months (you can tune this, maybe N = total_months - 1)
-    emi_amounts = emi_frequency[emi_frequency['distinct_months'] >= total_months - 1]['debit_amount'].tolist()
-
-
-    summaries = []
-    
-    user_opening_balance = crud.get_opening_balance(user_id)
-    
-    previous_closing_balance = None
-    
 
+def prepare_summary_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Dated rows in date order with a ``month`` period column"""
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    df = df.dropna(subset=['date'])
+    df = df.sort_values(by='date', kind='stable')
+    df['month'] = df['date'].dt.to_period('M')
+    return df
+
+
+def generate_users_summary(data: dict, fields: Optional[list] = None) -> dict:
+    """
+    Monthly summaries of several users (a load_users_frame result) from one
+    pass grouped by (username, month). Users without transactions map to None,
+    as generate_monthly_summary returns for them.
+    """
+    summaries = {username: None for username in data["users"]}
+    df = data["frame"]
+    if df.empty:
+        return summaries
+
+    opening_balances = {}
+    for username, user_data in data["users"].items():
+        value = user_data["metadata"][0].get("opening_balance") if user_data["metadata"] else None
+        opening_balances[username] = float(value) if value is not None else None
+
+    # Users whose rows are all undated get no months, like a single-user summary
+    summaries.update(dict.fromkeys(df['username'].unique().tolist(), []))
+    ctx = UsersMetricContext(prepare_summary_frame(df), opening_balances)
+    summaries.update(evaluate_users_summary(ctx, fields))
+    return summaries
 
-    for month, group in df.groupby('month'):
-        group = group.sort_values(by='date')
-        balances = group['balance_amount'].dropna()
-
-        debit_txns = group[group['debit_amount'].notnull() & (group['debit_amount'] > 0)]
-        emi_txns = group[
-            (group['debit_amount'].isin(emi_amounts)) &
-            (group['debit_amount'].notnull()) &
-            (group['debit_amount'] > 0)
-            ]
-
-        credit_txns = group[group['credit_amount'].notnull() & (group['credit_amount'] > 0)]
-
-        # Salary detection
-        salary_candidates = credit_txns.groupby(['date', 'credit_amount']).size().reset_index(name='count')
-        salary_matches = salary_candidates[salary_candidates['count'] > 1]
-
-        
-        
-        # Calculate opening balance:
-        if previous_closing_balance is not None:
-            opening_balance = previous_closing_balance
-        else:
-            opening_balance = float(user_opening_balance) if user_opening_balance is not None else (float(balances.iloc[0]) if not balances.empty else None)
-
-        closing_balance = float(balances.iloc[-1]) if not balances.empty else None
-
-        summary = {
-        "month": str(month),
-        "opening_balance": opening_balance,
-        "closing_balance": closing_balance,
-        "debit_transaction_amount": float(debit_txns['debit_amount'].sum()),
-        "credit_transaction_amount": float(credit_txns['credit_amount'].sum()),
-        "debit_transaction_count": int(len(debit_txns)),
-        "credit_transaction_count": int(len(credit_txns)),
-        "salary_income_total": float(salary_matches['credit_amount'].sum()),
-        "salary_income_count": int(len(salary_matches)),
-        "emi_total": float(emi_txns['debit_amount'].sum()),
-        "emi_count": int(len(emi_txns)),
-        "minimum_balance": float(balances.min()) if not balances.empty else None,
-        "maximum_balance": float(balances.max()) if not balances.empty else None,
-        "average_balance": float(balances.mean()) if not balances.empty else None,
-        "cash_deposit_amount": float(group[group['particulars'].str.contains(CASH_DEPOSIT_PATTERN, na=False)]['credit_amount'].sum()),
-        "cash_deposit_count": int(group[group['particulars'].str.contains(CASH_DEPOSIT_PATTERN, na=False)].shape[0]),
-        "cash_withdrawal_amount": float(group[group['particulars'].str.contains(CASH_WITHDRAWAL_PATTERN, na=False)]['debit_amount'].sum()),
-        "cash_withdrawal_count": int(group[group['particulars'].str.contains(CASH_WITHDRAWAL_PATTERN, na=False)].shape[0]),
-        "penalty_amount": float(group[group['particulars'].str.contains(PENALTY_PATTERN, na=False)]['debit_amount'].sum()),
-        "penalty_count": int(group[group['particulars'].str.contains(PENALTY_PATTERN, na=False)].shape[0]),
-        "bank_charges_amount": float(group[group['particulars'].str.contains(BANK_CHARGES_PATTERN, na=False)]['debit_amount'].sum()),
-        "bank_charges_count": int(group[group['particulars'].str.contains(BANK_CHARGES_PATTERN, na=False)].shape[0]),
-        "net_debit": float(group['debit_amount'].sum()),
-        "net_credit": float(group['credit_amount'].sum()),
-        "overdrawn_days": int((group['balance_amount'] < 0).sum()),
-        "min_eod_balance": float(balances.min()) if not balances.empty else None,
-        "max_eod_balance": float(balances.max()) if not balances.empty else None,
-        "avg_eod_balance": float(balances.mean()) if not balances.empty else None,
-        "balance_on_1st": float(group[group['date'].dt.day == 1]['balance_amount'].mean()) if not group[group['date'].dt.day == 1].empty else None,
-        "balance_on_30th": float(group[group['date'].dt.day == 30]['balance_amount'].mean()) if not group[group['date'].dt.day == 30].empty else None,
-        "daily_balance_change_pct": float(balances.pct_change().mean() * 100) if not balances.empty else None,
-    }
-
-        previous_closing_balance = closing_balance
-        
-        # FOIR score approximation: EMI / salary (if both are detected)
-        if summary['salary_income_total'] and summary['emi_total']:
-            summary['foir'] = round(summary['emi_total'] / summary['salary_income_total'], 2)
-        else:
-            summary['foir'] = None
-
-        def format_value(v):
-            if isinstance(v, (np.integer, int)):
-                return int(v)
-            elif isinstance(v, (np.floating, float)):
-                return round(float(v), 2)
-            return v
-
-        summaries.append({k: format_value(v) for k, v in summary.items()})
 
-    return summaries
+def selected_fields(fields: Optional[str]) -> Optional[list]:
+    """Requested summary metrics in response order, None for all ("month" is always returned)"""
+    if not fields:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()} - {"month"}
+    unknown = requested - set(SUMMARY_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {sorted(unknown)}")
+    return [field for field in SUMMARY_FIELDS if field in requested]
 
 
 @router.get("/get-monthly-summary")
-def get_monthly_summary(username: Optional[str] = Query(None)):
+def get_monthly_summary(
+    username: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated metrics to compute, all when omitted")
+):
     print("🔥 Entered get_monthly_summary")  # Log step
 
     if not username:
         raise HTTPException(status_code=400, detail="Username required")
 
-    user_id = crud.get_user_id_by_username(username)
-    print(f"🧠 User ID: {user_id}")
+    selected = selected_fields(fields)
+
+    user_data = crud.get_user_statements(username)
+    print(f"🧠 User ID: {user_data['user_id'] if user_data else None}")
 
-    if not user_id:
+    if not user_data:
         raise HTTPException(status_code=404, detail="User not found")
 
-    summary = generate_monthly_summary(username)
+    summary = cached_payload(
+        "monthly-summary" if selected is None else f"monthly-summary:{','.join(selected)}", user_data,
+        lambda: generate_monthly_summary(username, load_user_frame(username, user_data), selected)
+    )
     print("📊 Summary Calculated")
 
-    return {"summary": summary}
+    return FastJSONResponse({"summary": summary})
+
+
+@router.post("/bulk-monthly-summary")
+def get_bulk_monthly_summary(
+    usernames: list = Depends(bulk_usernames),
+    fields: Optional[str] = Query(None, description="Comma-separated metrics to compute, all when omitted")
+):
+    """Monthly summaries of many users at once, keyed by username"""
+    selected = selected_fields(fields)
+
+    # One statements query and one rows query for all users
+    data = load_users_frame(usernames)
+    summaries = generate_users_summary(data, selected)
+    print(f"📊 Bulk summary calculated for {len(summaries)} users")
+
+    return FastJSONResponse({"summaries": summaries, "not_found": data["not_found"]})
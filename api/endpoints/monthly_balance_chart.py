@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException
-from database.crud import get_user_id_by_username, get_transaction_table_names, get_transaction_data_from_table
+from database.monthly_aggregates import load_monthly_aggregates
 import pandas as pd
 from datetime import datetime
 
@@ -7,46 +7,32 @@ router = APIRouter()
 
 @router.get("/monthly-avg-balance")
 def monthly_avg_balance(username: str):
-    # Step 1: Get user ID
-    user_id = get_user_id_by_username(username)
-    if user_id is None:
+    # Step 1: Resolve user and load the latest table's monthly aggregates
+    user_data = load_monthly_aggregates(username, latest_only=True)
+    if user_data is None:
         raise HTTPException(status_code=404, detail=f"User '{username}' not found")
 
-    # Step 2: Get latest transaction table for user
-    table_names = get_transaction_table_names(user_id)
-    if not table_names:
-        raise HTTPException(status_code=404, detail=f"No transaction tables found for user '{username}'")
+    return build_monthly_avg_balance(username, user_data)
 
-    latest_table = sorted(table_names)[-1]
+def build_monthly_avg_balance(username: str, user_data: dict) -> dict:
+    """Average end-of-day balance per month of the latest statement table, from load_monthly_aggregates(..., latest_only=True)"""
+    # Step 2: Make sure the user has at least one transaction table
+    if not user_data["table_names"]:
+        raise HTTPException(status_code=404, detail=f"No transaction tables found for user '{username}'")
 
-    # Step 3: Load transaction data
-    transactions = get_transaction_data_from_table(latest_table)
-    if not transactions:
+    # Step 3: Load precomputed monthly rows
+    aggregates = user_data["rows"]
+    if not aggregates:
         raise HTTPException(status_code=404, detail="No transactions found in the latest table")
 
-    df = pd.DataFrame(transactions)
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    df = df.dropna(subset=['date', 'balance_amount'])
-
-    # Step 4: Use accurate daily average logic
-    df = df[['date', 'balance_amount']].sort_values('date')
-    df = df.drop_duplicates(subset='date', keep='last')  # One balance per day (latest if multiple)
-
-    # Create full date range from min to max
-    full_range = pd.date_range(start=df['date'].min(), end=df['date'].max(), freq='D')
-    df = df.set_index('date').reindex(full_range).rename_axis('date')
-
-    # Forward fill missing balances
-    df['balance_amount'] = df['balance_amount'].ffill()
-
-    # Group by month and calculate mean
-    df['month'] = df.index.to_period('M').astype(str)
+    # Step 4: Average of the forward-filled end-of-day balance, computed at ingest
+    df = pd.DataFrame(aggregates)
+    df = df.dropna(subset=['avg_eod_balance'])
     result_df = (
-        df.groupby('month')['balance_amount']
-        .mean()
+        df[['month', 'avg_eod_balance']]
+        .rename(columns={'avg_eod_balance': 'average_balance'})
         .round(2)
-        .reset_index()
-        .rename(columns={'balance_amount': 'average_balance'})
+        .reset_index(drop=True)
     )
 
     return {
@@ -1,84 +1,84 @@
 import pandas as pd
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import Optional
 from datetime import datetime, timedelta
 from database import crud
+from database.frame_cache import load_user_frame
+from database.shared_cache import cached_payload
+from database.window_index import WindowIndex
+from bank_statement_parser.utils.band_rules import BAND_RULES, scan_bands
+from database.activity_gaps import activity_gaps, range_records, expand_date_ranges
+from database.portfolio import load_users_frame, split_users_frame
+from api.responses import FastJSONResponse
+from api.deps import bulk_usernames
 from collections import defaultdict
 import numpy as np
 import math
-from fastapi.responses import JSONResponse
 
 router = APIRouter()
 
-def clean_nans(obj):
-    """Recursively convert all Timestamp and NaNs in nested objects"""
-    if isinstance(obj, dict):
-        return {k: clean_nans(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [clean_nans(v) for v in obj]
-    elif isinstance(obj, pd.Timestamp):
-        return obj.strftime('%Y-%m-%d')
-    elif pd.isna(obj):
-        return None
-    return obj
+def date_records(df: pd.DataFrame, amount_column: str) -> list:
+    """Rows of (date, amount) with the date written as YYYY-MM-DD"""
+    dates = df['date'].dt.strftime('%Y-%m-%d').tolist()
+    return [{'date': day, amount_column: amount} for day, amount in zip(dates, df[amount_column].tolist())]
 
 @router.get("/overview_data")
 def analytics_summary(username: Optional[str] = Query(None)):
     if not username:
         raise HTTPException(status_code=400, detail="Username is required")
 
-    user_id = crud.get_user_id_by_username(username)
-    if not user_id:
+    user_data = crud.get_user_statements(username)
+    if not user_data:
         raise HTTPException(status_code=404, detail="User not found")
 
-    table_names = crud.get_transaction_table_names(user_id)
-    metadata_list = crud.get_metadata_by_user_id(user_id)
-    if not table_names:
-        return JSONResponse(content={})
-
-    all_rows = []
-    for table in table_names:
-        data = crud.get_transaction_data_from_table(table)
-        all_rows.extend(data)
-
-    if not all_rows:
-        return JSONResponse(content={})
-
-    df = pd.DataFrame(all_rows)
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    content = cached_payload("overview", user_data, lambda: build_overview(load_user_frame(username, user_data)))
+    return FastJSONResponse(content)
+
+@router.post("/bulk-overview-data")
+def bulk_analytics_summary(usernames: list = Depends(bulk_usernames)):
+    """Overview analytics of many users at once, keyed by username"""
+    # One statements query and one rows query for all users
+    data = load_users_frame(usernames)
+    overviews = {
+        username: build_overview({**data["users"][username], "frame": frame})
+        for username, frame in split_users_frame(data).items()
+    }
+    return FastJSONResponse({"overviews": overviews, "not_found": data["not_found"]})
+
+def build_overview(user_data: dict) -> dict:
+    """Overview analytics of a user's transaction frame (as returned by load_user_frame)"""
+    metadata_list = user_data["metadata"]
+    df = user_data["frame"]
+    if df.empty:
+        return {}
+
+    if df['date'].dtype.kind != 'M':
+        df['date'] = pd.to_datetime(df['date'], errors='coerce')
     df = df.dropna(subset=['date'])
 
     df['debit_amount'] = df['debit_amount'].fillna(0)
     df['credit_amount'] = df['credit_amount'].fillna(0)
 
     df = df.sort_values(by='date')
-    full_range = pd.date_range(df['date'].min(), df['date'].max())
-    no_txn_dates = sorted(set(full_range.date) - set(df['date'].dt.date))
 
-    month_df = df.copy()
-    month_df['month'] = month_df['date'].dt.to_period('M')
-    active_months = month_df['month'].unique()
-    full_month_range = pd.period_range(df['date'].min(), df['date'].max(), freq='M')
-    no_txn_months = sorted([str(m) for m in full_month_range if m not in active_months])
+    # Days and months without transactions, as run-length ranges
+    gaps = activity_gaps(df['date'])
 
     end = df['date'].max()
     start_12 = end - pd.DateOffset(months=12) + timedelta(days=1)
     start_3 = end - pd.DateOffset(months=3) + timedelta(days=1)
 
-    df_last_12 = df[(df['date'] >= start_12) & (df['date'] <= end)]
-    df_last_3 = df[(df['date'] >= start_3) & (df['date'] <= end)]
+    index = WindowIndex(df)
+    last_12 = index.window(start_12.date(), end.date())
+    last_3 = index.window(start_3.date(), end.date())
 
-    max_debit_12 = df_last_12['debit_amount'].max()
-    max_credit_12 = df_last_12['credit_amount'].max()
-    max_debit_3 = df_last_3['debit_amount'].max()
-    max_credit_3 = df_last_3['credit_amount'].max()
+    max_debit_12 = last_12['max_debit']
+    max_credit_12 = last_12['max_credit']
+    max_debit_3 = last_3['max_debit']
+    max_credit_3 = last_3['max_credit']
 
-    cash_deposit_9_to_10L = df[(df['credit_amount'] >= 9_00_000) & (df['credit_amount'] <= 10_00_000)]
-    cash_deposit_40_to_50k = df[(df['credit_amount'] >= 40_000) & (df['credit_amount'] <= 50_000)]
-
-    atm_withdrawals = df[df['particulars'].str.contains("ATM withdraw", case=False, na=False)]
-    atm_large_withdrawals = atm_withdrawals[atm_withdrawals['debit_amount'] > 2000]
+    # Amount bands (large cash deposits, ATM withdrawals above 2000, ...) from band_rules.json
+    bands = scan_bands(df)
 
     banks_meta = defaultdict(list)
     for meta in metadata_list:
@@ -87,9 +87,11 @@ def analytics_summary(username: Optional[str] = Query(None)):
         banks_meta['transaction_period'].append(meta['transaction_period'])
         banks_meta['account_holder_address'] = meta.get('account_holder_name')
 
-    return JSONResponse(content=clean_nans({
-    "no_transaction_months": no_txn_months,
-    "no_transaction_dates": [d.strftime('%Y-%m-%d') for d in no_txn_dates],
+    return {
+    "no_transaction_months": expand_date_ranges(*gaps["month_ranges"]),
+    "no_transaction_dates": expand_date_ranges(*gaps["day_ranges"]),
+    "no_transaction_month_ranges": range_records(*gaps["month_ranges"], "months"),
+    "no_transaction_date_ranges": range_records(*gaps["day_ranges"], "days"),
     "account_holder_address": banks_meta.get("account_holder_address"),
 
     "last_12_months_max_debit_amount": max_debit_12,
@@ -97,12 +99,9 @@ def analytics_summary(username: Optional[str] = Query(None)):
     "last_3_months_max_debit_amount": max_debit_3,
     "last_3_months_max_credit_amount": max_credit_3,
 
-    "cash_deposits_9_to_10_lakhs": cash_deposit_9_to_10L[['date', 'credit_amount']].to_dict(orient='records'),
-    "cash_deposits_40k_to_50k": cash_deposit_40_to_50k[['date', 'credit_amount']].to_dict(orient='records'),
-
-    "atm_withdrawals_above_2000": atm_large_withdrawals[['date', 'debit_amount']].to_dict(orient='records'),
+    **{name: date_records(df.iloc[rows], BAND_RULES[name]['column']) for name, rows in bands.items()},
 
     "bank_name": banks_meta['bank_name'],
     "account_number": banks_meta['account_number'],
     "transaction_period": banks_meta['transaction_period']
-}))
+}
@@ -1,42 +1,97 @@
 from fastapi import APIRouter, Query, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import Optional
+from datetime import date
+import base64
 import pandas as pd
 from database import crud
-import numpy as np
+from database.frame_cache import load_user_frame, build_transaction_frame
+from api.responses import FastJSONResponse, frame_records, frame_lines
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+def encode_cursor(row: dict) -> str:
+    """Opaque page cursor of a row's (date, id, table_index) key"""
+    key = f"{row['date'].isoformat()}|{row['id']}|{row['table_index']}"
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        day, row_id, table_index = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return date.fromisoformat(day), int(row_id), int(table_index)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def bank_name_of(user_data: dict):
+    return user_data["metadata"][0]["bank_name"] if user_data["metadata"] else None
+
 
 @router.get("/get-all-transactions")
-def get_all_transactions(username: Optional[str] = Query(None)):
+def get_all_transactions(
+    username: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None)
+):
     if not username:
         raise HTTPException(status_code=400, detail="Username is required")
 
-    user_id = crud.get_user_id_by_username(username)
-    if not user_id:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    table_names = crud.get_transaction_table_names(user_id)
-    if not table_names:
-        return {"transactions": []}
+    # With limit or cursor: one keyset page ordered by (date, id) plus the cursor of the next page
+    if limit is not None or cursor is not None:
+        return get_transactions_page(username, limit or DEFAULT_PAGE_SIZE, cursor)
 
-    all_data = []
-    for table in table_names:
-        rows = crud.get_transaction_data_from_table(table)
-        if rows:
-            all_data.extend(rows)
+    user_data = load_user_frame(username)
+    if not user_data:
+        raise HTTPException(status_code=404, detail="User not found")
 
-    if not all_data:
+    df = user_data["frame"]
+    if df.empty:
         return {"transactions": []}
 
-    df = pd.DataFrame(all_data)
-
     # Ensure 'date' is in datetime and sort
     df['date'] = pd.to_datetime(df['date'], errors='coerce')
     df = df.dropna(subset=['date'])
     df = df.sort_values(by='date')
 
-    # Replace NaN/NaT/inf with None so JSON is valid
-    df = df.replace({np.nan: None, np.inf: None, -np.inf: None})
+    # Encoded column-wise; NaN/NaT/inf are written as null
+    return FastJSONResponse({"transactions": frame_records(df)})
+
+
+def get_transactions_page(username: str, limit: int, cursor: Optional[str]):
+    after = decode_cursor(cursor) if cursor else None
+
+    user_data = crud.get_user_statements(username)
+    if not user_data:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # One extra row tells whether another page follows
+    rows = next(crud.iter_statement_rows(user_data["table_names"], after, limit + 1, batch_size=limit + 1), [])
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    rows = rows[:limit]
+
+    df = build_transaction_frame(rows, bank_name_of(user_data))
+    return FastJSONResponse({"transactions": frame_records(df), "next_cursor": next_cursor})
+
+
+@router.get("/stream-transactions")
+def stream_transactions(username: Optional[str] = Query(None)):
+    """All transactions as NDJSON, one row per line in (date, id) order, read in keyset batches of STREAM_BATCH_SIZE rows per table"""
+    if not username:
+        raise HTTPException(status_code=400, detail="Username is required")
+
+    user_data = crud.get_user_statements(username)
+    if not user_data:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    bank_name = bank_name_of(user_data)
+
+    def ndjson_batches():
+        for rows in crud.iter_statement_rows(user_data["table_names"]):
+            yield frame_lines(build_transaction_frame(rows, bank_name))
 
-    return {"transactions": df.to_dict(orient='records')}
+    return StreamingResponse(ndjson_batches(), media_type="application/x-ndjson")
@@ -22,8 +22,9 @@ async def upload_pdf(
     file_path = UPLOAD_DIR / f"{username}.pdf"
     password_path = PASSWORD_DIR / f"{username}.txt"
 
-    if file_path.exists():
-        raise HTTPException(status_code=400, detail=f"User '{username}' already uploaded a statement.")
+    # A newer (possibly overlapping) statement replaces the previous upload;
+    # ingestion only appends the transactions that are not stored yet.
+    replaced = file_path.exists()
 
     try:
         content = await file.read()
@@ -33,12 +34,15 @@ async def upload_pdf(
         if password:
             with open(password_path, "w") as f:
                 f.write(password)
+        elif password_path.exists():
+            password_path.unlink()
 
         return JSONResponse(
             status_code=200,
             content={
                 "message": "✅ File uploaded successfully.",
-                "password_provided": password is not None
+                "password_provided": password is not None,
+                "replaced_previous_upload": replaced
             }
         )
     except Exception as e:
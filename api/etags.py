@@ -0,0 +1,112 @@
+import os
+import hashlib
+from pathlib import Path
+from urllib.parse import urlencode
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+from database import crud
+from database.shared_cache import version_token
+
+# Read endpoints whose responses depend only on the user's stored statements and
+# the analysis code, so they can be revalidated against the statement hashes
+CONDITIONAL_PATHS = (
+    "/summary/get-monthly-summary",
+    "/overview/overview_data",
+    "/daily-balance/get-daily-balance",
+    "/monthly-balance-chart/monthly-avg-balance",
+    "/monthly-debit-credit/monthly-debit-credit",
+    "/monthly-cashflow/monthly-cashflow",
+    "/cashflow/cashflow-page",
+    "/cashflow/window",
+    "/transactions/get-all-transactions",
+    "/transactions/stream-transactions",
+    "/metadata/get-metadata",
+    "/compliance/red-flags",
+    "/dashboard",
+)
+
+# Clients may reuse a response only after revalidating it
+CACHE_CONTROL = "private, no-cache"
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def code_version() -> str:
+    """
+    Digest of the analysis code and rule/pattern files, so a deploy that
+    changes either invalidates every ETag. ANALYTICS_VERSION in the environment
+    (e.g. a release tag) is mixed in as well.
+    """
+    digest = hashlib.sha256(os.getenv("ANALYTICS_VERSION", "").encode())
+    for package in ("api", "database", "bank_statement_parser"):
+        for path in sorted((ROOT / package).rglob("*")):
+            if path.suffix in (".py", ".json") and "__pycache__" not in path.parts:
+                digest.update(str(path.relative_to(ROOT)).encode())
+                digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+CODE_VERSION = code_version()
+
+
+def request_variant(request: Request) -> str:
+    """
+    The parts of a request that select its representation: the query parameters
+    (sorted, so their order does not matter) and the Accept header.
+    """
+    params = urlencode(sorted(request.query_params.multi_items()))
+    accept = " ".join(request.headers.get("accept", "").split())
+    return f"{params}\n{accept}"
+
+
+def user_etag(username: str, variant: str = ""):
+    """
+    Strong ETag of a user's data version for one request variant (see
+    request_variant), or None if the user does not exist.
+    """
+    versions = crud.get_statement_versions(username)
+    if versions is None:
+        return None
+    token = f"{CODE_VERSION}:{versions['user_id']}:{version_token(versions)}:{variant}"
+    return '"' + hashlib.sha256(token.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag (RFC 9110)"""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+async def conditional_get(request: Request, call_next):
+    """
+    ETag / If-None-Match for the analytics read endpoints.
+
+    The ETag comes from the user's statement hashes, the code version and the
+    request's query parameters and Accept header (a date range or another
+    max_points is another representation), so a matching request is answered
+    304 Not Modified after one small indexed query, without loading
+    transactions. Other responses get the ETag when they succeed.
+    """
+    username = request.query_params.get("username")
+    if request.method != "GET" or not username or request.url.path.rstrip("/") not in CONDITIONAL_PATHS:
+        return await call_next(request)
+
+    # Step 1: Current data version of the user (unknown users fall through to the endpoint's 404)
+    etag = await run_in_threadpool(user_etag, username, request_variant(request))
+    if etag is None:
+        return await call_next(request)
+
+    # Step 2: The client already holds this version
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept"})
+
+    # Step 3: Compute the response and tag it with the version it was computed from
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
+        response.headers.add_vary_header("Accept")
+    return response
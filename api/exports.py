@@ -0,0 +1,260 @@
+import os
+from typing import Iterator, Optional
+import pandas as pd
+from database import crud
+from database.daily_balances import load_daily_balances, combine_daily_balances
+from database.frame_cache import build_transaction_frame
+from database.portfolio import load_users_frame
+from database.summary_metrics import SUMMARY_FIELDS
+from api.endpoints.month_wise_analysis import generate_users_summary
+
+# Rows per Parquet row group / Arrow record batch / CSV chunk (override through the environment)
+EXPORT_ROW_GROUP_ROWS = int(os.getenv("EXPORT_ROW_GROUP_ROWS", "50000"))
+# Users whose monthly summaries are computed together in one pass. The pass holds all
+# their transactions in one frame, so keep it to about a row group's worth of rows.
+EXPORT_SUMMARY_USERS = int(os.getenv("EXPORT_SUMMARY_USERS", "20"))
+
+# Column -> type of each export dataset, in output order. The types fix the
+# file schema before the first row is read, so every chunk is written with the
+# same schema whatever values it holds.
+TRANSACTION_TYPES = {
+    "username": "string",
+    "id": "int",
+    "user_id": "int",
+    "date": "date",
+    "transaction_id": "string",
+    "particulars": "string",
+    "debit_amount": "float",
+    "credit_amount": "float",
+    "balance_amount": "float",
+    "type": "string",
+    "optional_1": "string",
+    "optional_2": "string",
+    "optional_3": "string",
+    "created_at": "timestamp",
+    "category_flags": "int",
+}
+DAILY_BALANCE_TYPES = {"username": "string", "date": "date", "balance": "float"}
+SUMMARY_TYPES = {
+    "username": "string",
+    "month": "string",
+    **{field: "int" if field.endswith("_count") or field == "overdrawn_days" else "float" for field in SUMMARY_FIELDS},
+}
+
+
+def export_users(username: Optional[str] = None) -> dict:
+    """username -> statements (as crud.get_users_statements returns them) of one user, or of every user"""
+    return crud.get_users_statements([username] if username else crud.get_all_usernames())
+
+
+# --- Datasets: each yields DataFrames of a few users' rows at a time ---
+
+def transaction_frames(users: dict, start_date=None, end_date=None) -> Iterator[pd.DataFrame]:
+    """Dated transactions of each user in (date, id) order, read in keyset batches of EXPORT_ROW_GROUP_ROWS rows per table"""
+    for username, user_data in users.items():
+        bank_name = user_data["metadata"][0]["bank_name"] if user_data["metadata"] else None
+        batches = crud.iter_statement_rows(
+            user_data["table_names"], batch_size=EXPORT_ROW_GROUP_ROWS, start_date=start_date, end_date=end_date
+        )
+        for rows in batches:
+            df = build_transaction_frame(rows, bank_name)
+            df.insert(0, "username", username)
+            yield df
+
+def daily_balance_frames(users: dict, start_date=None, end_date=None) -> Iterator[pd.DataFrame]:
+    """End-of-day balance series of each user, as /daily-balance serves it"""
+    for username in users:
+        data = load_daily_balances(username, start_date, end_date)
+        series = combine_daily_balances(data["rows"], data["accounts"], data["opening"]) if data else combine_daily_balances([])
+        yield pd.DataFrame({"username": username, "date": series.index, "balance": series.to_numpy()})
+
+def summary_frames(users: dict, start_date=None, end_date=None) -> Iterator[pd.DataFrame]:
+    """
+    Monthly summaries, computed for EXPORT_SUMMARY_USERS users at a time. Months
+    are computed over the whole history (opening balances carry over) and then
+    limited to the months of the date range.
+    """
+    usernames = list(users)
+    for start in range(0, len(usernames), EXPORT_SUMMARY_USERS):
+        summaries = generate_users_summary(load_users_frame(usernames[start:start + EXPORT_SUMMARY_USERS]))
+        rows = [{"username": username, **row} for username, summary in summaries.items() for row in summary or []]
+        df = pd.DataFrame(rows, columns=list(SUMMARY_TYPES))
+        if start_date is not None:
+            df = df[df['month'] >= f"{start_date:%Y-%m}"]
+        if end_date is not None:
+            df = df[df['month'] <= f"{end_date:%Y-%m}"]
+        yield df
+
+# Dataset name -> (column types, frame iterator)
+EXPORT_DATASETS = {
+    "transactions": (TRANSACTION_TYPES, transaction_frames),
+    "daily_balances": (DAILY_BALANCE_TYPES, daily_balance_frames),
+    "monthly_summary": (SUMMARY_TYPES, summary_frames),
+}
+
+
+def row_groups(frames: Iterator[pd.DataFrame], rows: int = EXPORT_ROW_GROUP_ROWS) -> Iterator[pd.DataFrame]:
+    """Regroup frames into chunks of about ``rows`` rows, so small users do not make tiny row groups"""
+    pending, count = [], 0
+    for df in frames:
+        if df.empty:
+            continue
+        pending.append(df)
+        count += len(df)
+        if count >= rows:
+            yield pd.concat(pending, ignore_index=True)
+            pending, count = [], 0
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
+
+
+# --- Formats ---
+
+def require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Parquet and Arrow exports need the optional 'pyarrow' package (the 'export' extra).")
+    return pyarrow
+
+
+def arrow_schema(types: dict):
+    pa = require_pyarrow()
+    arrow_types = {
+        "string": pa.string(),
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "date": pa.date32(),
+        "timestamp": pa.timestamp("us"),
+    }
+    return pa.schema([(column, arrow_types[kind]) for column, kind in types.items()])
+
+
+class ChunkSink:
+    """Write-only file object holding what a writer produced since the last drain()"""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+class CsvChunkWriter:
+    def __init__(self, sink: ChunkSink, types: dict):
+        self.sink = sink
+        self.dates = [column for column, kind in types.items() if kind == "date"]
+        sink.write(pd.DataFrame(columns=list(types)).to_csv(index=False).encode())
+
+    def write(self, df: pd.DataFrame):
+        df = df.assign(**{column: df[column].dt.strftime('%Y-%m-%d') for column in self.dates})
+        self.sink.write(df.to_csv(index=False, header=False).encode())
+
+    def close(self):
+        pass
+
+
+class ParquetChunkWriter:
+    """One Parquet row group per chunk"""
+
+    def __init__(self, sink: ChunkSink, types: dict):
+        require_pyarrow()
+        import pyarrow.parquet as pq
+        self.schema = arrow_schema(types)
+        self.writer = pq.ParquetWriter(sink, self.schema)
+
+    def write(self, df: pd.DataFrame):
+        pa = require_pyarrow()
+        self.writer.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False), row_group_size=len(df))
+
+    def close(self):
+        self.writer.close()
+
+
+class ArrowChunkWriter:
+    """Arrow IPC stream, one record batch per chunk"""
+
+    def __init__(self, sink: ChunkSink, types: dict):
+        pa = require_pyarrow()
+        self.schema = arrow_schema(types)
+        self.writer = pa.ipc.new_stream(sink, self.schema)
+
+    def write(self, df: pd.DataFrame):
+        pa = require_pyarrow()
+        self.writer.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False), max_chunksize=len(df))
+
+    def close(self):
+        self.writer.close()
+
+EXPORT_FORMATS = {
+    "parquet": {"writer": ParquetChunkWriter, "media_type": "application/vnd.apache.parquet", "extension": "parquet"},
+    "arrow": {"writer": ArrowChunkWriter, "media_type": "application/vnd.apache.arrow.stream", "extension": "arrows"},
+    "csv": {"writer": CsvChunkWriter, "media_type": "text/csv", "extension": "csv"},
+}
+
+
+def export_stream(dataset: str, users: dict, fmt: str, columns: Optional[list] = None,
+                  start_date=None, end_date=None) -> Iterator[bytes]:
+    """
+    Stream a dataset of the given users as a Parquet, Arrow IPC or CSV file.
+
+    The dataset, format and columns are checked (and the writer opened) before
+    this returns, so errors surface before the first byte. The returned
+    iterator then reads the rows in chunks and yields the file's bytes as each
+    chunk is encoded; no more than about EXPORT_ROW_GROUP_ROWS rows are held
+    in memory.
+
+    Args:
+        dataset: "transactions", "daily_balances" or "monthly_summary".
+        users: Result of export_users.
+        fmt: "parquet", "arrow" or "csv".
+        columns: Columns to write, in this order (all when None).
+        start_date: Only rows (summary months) on or after this day.
+        end_date: Only rows (summary months) on or before this day.
+
+    Raises:
+        ValueError: Unknown dataset, format or columns.
+        ImportError: Parquet or Arrow requested without pyarrow installed.
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"Unknown dataset: {dataset}. Available: {list(EXPORT_DATASETS)}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format: {fmt}. Available: {list(EXPORT_FORMATS)}")
+
+    all_types, frames = EXPORT_DATASETS[dataset]
+    columns = list(dict.fromkeys(columns or all_types))
+    unknown = [column for column in columns if column not in all_types]
+    if unknown:
+        raise ValueError(f"Unknown columns for {dataset}: {unknown}")
+    types = {column: all_types[column] for column in columns}
+
+    sink = ChunkSink()
+    writer = EXPORT_FORMATS[fmt]["writer"](sink, types)
+
+    def chunks():
+        for df in row_groups(frames(users, start_date, end_date)):
+            writer.write(df[columns])
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    return chunks()
@@ -1,6 +1,7 @@
 import pandas as pd
 from typing import List, Dict, Tuple
 from database.save_user_data import save_user_and_transactions
+from bank_statement_parser.utils.categorizer import category_patterns, compile_category_matcher, categorize
 
 class BaseExtractor:
     def __init__(self):
@@ -46,6 +47,20 @@ class BaseExtractor:
         """
         raise NotImplementedError("parse_transactions_to_dataframe() must be implemented in child class.")
 
+    def categorize_transactions(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Tag every transaction with its category bit flags (see utils/category_rules.json).
+
+        The bank's ``*_pattern`` entries override the shared rules and all
+        categories are matched in one combined regex pass.
+
+        Returns:
+            The DataFrame with an added 'Category Flags' column.
+        """
+        matcher = compile_category_matcher(category_patterns(self.patterns))
+        df['Category Flags'] = categorize(df['Particulars'], matcher)
+        return df
+
     def process_bank_statement(self, lines_per_page: List[List[str]], bank_name: str, username: str) -> Tuple[Dict, pd.DataFrame, int, List[int]]:
         """
         Full processing pipeline to extract metadata and transaction dataframe.
@@ -73,6 +88,8 @@ class BaseExtractor:
         df = self.parse_transactions_to_dataframe(transactions)
         if df.empty:
             raise ValueError("Transaction DataFrame is empty.")
+
+        df = self.categorize_transactions(df)
         
         save_user_and_transactions(username, df, self.metadata)
 
@@ -0,0 +1,66 @@
+import json
+import os
+from typing import Dict
+import numpy as np
+import pandas as pd
+from bank_statement_parser.utils.categorizer import has_category
+
+# Amount band rules: name -> {"column": amount column, bounds, optional "category"}.
+# Bounds are "min"/"max" (inclusive) and "above"/"below" (exclusive).
+BAND_RULES_PATH = os.path.join(os.path.dirname(__file__), "band_rules.json")
+
+with open(BAND_RULES_PATH, "r") as file:
+    BAND_RULES = json.load(file)
+
+BOUND_KEYS = ("min", "max", "above", "below")
+
+
+def band_masks(df: pd.DataFrame, rules: Dict = None) -> Dict[str, np.ndarray]:
+    """
+    Evaluate every amount band in one pass per amount column.
+
+    All bounds of a column are gathered into one sorted edge array and each
+    amount is located among them with two searchsorted calls; every rule is
+    then an integer comparison on those positions instead of a new scan of
+    the amounts.
+
+    Args:
+        df: Transaction rows with the rules' amount columns (and category_flags
+            when a rule has a category).
+        rules: Band rules, defaults to BAND_RULES.
+
+    Returns:
+        Dict[str, np.ndarray]: Boolean mask of the rows matching each rule.
+    """
+    rules = BAND_RULES if rules is None else rules
+    matches = {}
+
+    for column in dict.fromkeys(rule["column"] for rule in rules.values()):
+        column_rules = {name: rule for name, rule in rules.items() if rule["column"] == column}
+        edges = np.unique([rule[key] for rule in column_rules.values() for key in BOUND_KEYS if key in rule]).astype(float)
+
+        values = df[column].to_numpy(dtype=float)
+        below_or_at = np.searchsorted(edges, values, side='right')   # edges <= value
+        below = np.searchsorted(edges, values, side='left')          # edges < value
+        known = ~np.isnan(values)
+
+        for name, rule in column_rules.items():
+            mask = known.copy()
+            if "min" in rule:
+                mask &= below_or_at > np.searchsorted(edges, rule["min"])
+            if "max" in rule:
+                mask &= below <= np.searchsorted(edges, rule["max"])
+            if "above" in rule:
+                mask &= below > np.searchsorted(edges, rule["above"])
+            if "below" in rule:
+                mask &= below_or_at <= np.searchsorted(edges, rule["below"])
+            if "category" in rule:
+                mask &= has_category(df['category_flags'], rule["category"]).to_numpy()
+            matches[name] = mask
+
+    return matches
+
+
+def scan_bands(df: pd.DataFrame, rules: Dict = None) -> Dict[str, np.ndarray]:
+    """Row positions (in frame order) matching each band rule, see band_masks"""
+    return {name: np.flatnonzero(mask) for name, mask in band_masks(df, rules).items()}
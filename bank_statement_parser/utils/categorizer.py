@@ -0,0 +1,111 @@
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Tuple
+import numpy as np
+import pandas as pd
+from bank_statement_parser.utils.regex_loader import load_regex_patterns_from_json
+
+# Shared category rules: name -> {"flag": bit stored in category_flags, "pattern": default regex}
+RULES_PATH = os.path.join(os.path.dirname(__file__), "category_rules.json")
+
+with open(RULES_PATH, "r") as file:
+    CATEGORY_RULES = json.load(file)
+
+CATEGORY_FLAGS = {name: rule["flag"] for name, rule in CATEGORY_RULES.items()}
+
+# Leading global flags such as (?i), which are only allowed at the start of a whole pattern
+GLOBAL_FLAGS_PATTERN = re.compile(r"^\(\?([aimsux]+)\)")
+
+
+def category_patterns(bank_patterns: Dict = None) -> Dict[str, str]:
+    """
+    Resolve the regex of every category for a bank.
+
+    Args:
+        bank_patterns: The bank's patterns (from load_regex_patterns_from_json); a
+            ``<category>_pattern`` entry overrides the shared rule of that category.
+
+    Returns:
+        Dict[str, str]: Pattern source per category name.
+    """
+    patterns = {name: rule["pattern"] for name, rule in CATEGORY_RULES.items()}
+    for name in patterns:
+        bank_pattern = (bank_patterns or {}).get(f"{name}_pattern")
+        if bank_pattern is not None:
+            patterns[name] = getattr(bank_pattern, "pattern", bank_pattern)
+    return patterns
+
+
+def compile_category_matcher(patterns: Dict[str, str]) -> Tuple[re.Pattern, re.Pattern]:
+    """
+    Combine the category patterns so a description is tested against all of them in one pass.
+
+    Args:
+        patterns: Pattern source per category name.
+
+    Returns:
+        Tuple[re.Pattern, re.Pattern]: An alternation of every pattern, used to skip
+        descriptions without any category with a single search, and a pattern of
+        one optional lookahead per category (each capturing into a group named
+        after it) whose ``match()`` reports every category the text belongs to.
+    """
+    scoped = {}
+    for name, pattern in patterns.items():
+        flags = GLOBAL_FLAGS_PATTERN.match(pattern)
+        scoped[name] = f"(?{flags.group(1)}:{pattern[flags.end():]})" if flags else f"(?:{pattern})"
+
+    any_category = re.compile("|".join(scoped.values()))
+    per_category = re.compile("".join(
+        f"(?:(?=[\\s\\S]*?(?P<{name}>{pattern})))?" for name, pattern in scoped.items()
+    ))
+    return any_category, per_category
+
+
+def categorize(particulars: pd.Series, matcher: Tuple[re.Pattern, re.Pattern]) -> pd.Series:
+    """
+    Compute the category bit flags of each transaction description.
+
+    Every distinct description is matched once and rows reuse its result.
+
+    Args:
+        particulars: Transaction descriptions.
+        matcher: Patterns from compile_category_matcher.
+
+    Returns:
+        pd.Series: Integer flags (OR of CATEGORY_FLAGS), 0 for uncategorized or missing descriptions.
+    """
+    any_category, per_category = matcher
+    codes, descriptions = pd.factorize(particulars)
+    flags = np.zeros(len(descriptions) + 1, dtype=np.int64)  # last slot: missing description (code -1)
+    for i, description in enumerate(descriptions):
+        description = str(description)
+        if not any_category.search(description):
+            continue
+        groups = per_category.match(description).groupdict()
+        flags[i] = sum(CATEGORY_FLAGS[name] for name, hit in groups.items() if hit is not None)
+    return pd.Series(flags[codes], index=particulars.index, dtype=np.int64)
+
+
+def has_category(flags: pd.Series, category: str) -> pd.Series:
+    """Boolean mask of the rows tagged with ``category``."""
+    return (flags.astype(np.int64) & CATEGORY_FLAGS[category]) != 0
+
+
+@lru_cache(maxsize=None)
+def bank_category_matcher(bank_name: str = None) -> Tuple[re.Pattern, re.Pattern]:
+    """
+    Combined category patterns of a bank.
+
+    Args:
+        bank_name: Display name of the bank; banks without a pattern file use the shared rules only.
+
+    Returns:
+        Tuple[re.Pattern, re.Pattern]: The patterns from compile_category_matcher.
+    """
+    try:
+        bank_patterns = load_regex_patterns_from_json(bank_name) if bank_name else None
+    except FileNotFoundError:
+        bank_patterns = None
+    return compile_category_matcher(category_patterns(bank_patterns))
@@ -0,0 +1,166 @@
+import json
+import os
+from typing import Dict
+import numpy as np
+import pandas as pd
+from bank_statement_parser.utils.categorizer import CATEGORY_FLAGS
+from bank_statement_parser.utils.band_rules import band_masks
+
+# Red-flag rules: name -> {"description", "severity", conditions...}. A rule matches
+# the rows meeting all of its conditions:
+#   "amount":             band on "debit_amount", "credit_amount" or "amount" (either side),
+#                         with "min"/"max" (inclusive) and "above"/"below" (exclusive) bounds
+#   "categories":         tagged with any of these categories
+#   "exclude_categories": tagged with none of these categories
+#   "weekdays":           dated on one of these days ("Monday" ... "Sunday")
+#   "days_of_month":      dated on one of these days of the month
+#   "multiple_of":        amount is an exact multiple of this value
+#   "window":             {"days": n, "min_count": k}: only rows in a run of at least k
+#                         matches within n consecutive days
+RULES_PATH = os.path.join(os.path.dirname(__file__), "compliance_rules.json")
+
+with open(RULES_PATH, "r") as file:
+    COMPLIANCE_RULES = json.load(file)
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+RULE_KEYS = {
+    "description", "severity", "amount", "categories", "exclude_categories",
+    "weekdays", "days_of_month", "multiple_of", "window",
+}
+
+
+def category_bits(names: list) -> int:
+    """OR of the category_flags bits of the given categories"""
+    unknown = [name for name in names if name not in CATEGORY_FLAGS]
+    if unknown:
+        raise ValueError(f"Unknown categories in compliance rule: {unknown}")
+    bits = 0
+    for name in names:
+        bits |= CATEGORY_FLAGS[name]
+    return bits
+
+
+def compile_rules(rules: Dict = None) -> Dict:
+    """
+    Validate the rules and turn them into masks to evaluate together.
+
+    Amount conditions of all rules are collected into one band table (identical
+    bands are evaluated once), category lists become bit masks and weekday
+    names become numbers, so evaluate_rules only combines precomputed arrays.
+
+    Returns:
+        Dict with ``bands`` (band table for band_masks) and ``rules`` (compiled rules).
+    """
+    rules = COMPLIANCE_RULES if rules is None else rules
+    bands = {}
+    compiled = []
+
+    for name, rule in rules.items():
+        unknown = set(rule) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"Unknown keys in compliance rule '{name}': {sorted(unknown)}")
+
+        band = None
+        if "amount" in rule:
+            band = json.dumps(rule["amount"], sort_keys=True)
+            bands[band] = rule["amount"]
+
+        compiled.append({
+            "name": name,
+            "description": rule.get("description"),
+            "severity": rule.get("severity"),
+            "band": band,
+            "categories": category_bits(rule.get("categories", [])),
+            "exclude_categories": category_bits(rule.get("exclude_categories", [])),
+            "weekdays": [WEEKDAYS.index(day) for day in rule["weekdays"]] if "weekdays" in rule else None,
+            "days_of_month": rule.get("days_of_month"),
+            "multiple_of": rule.get("multiple_of"),
+            "amount_column": rule.get("amount", {}).get("column", "amount"),
+            "window": rule.get("window"),
+        })
+
+    return {"bands": bands, "rules": compiled}
+
+
+def windowed(days: np.ndarray, mask: np.ndarray, window_days: int, min_count: int) -> np.ndarray:
+    """
+    Keep only the matches that belong to a run of at least ``min_count`` matches
+    within ``window_days`` consecutive days.
+    """
+    positions = np.flatnonzero(mask)
+    order = np.argsort(days[positions], kind='stable')
+    matched_days = days[positions][order]
+
+    # Trailing window ending at each match: first match not older than window_days - 1 days
+    window_start = np.searchsorted(matched_days, matched_days - (window_days - 1), side='left')
+    ends = np.flatnonzero(np.arange(len(matched_days)) - window_start + 1 >= min_count)
+
+    # Mark every match covered by a qualifying window
+    cover = np.zeros(len(matched_days) + 1, dtype=np.int64)
+    np.add.at(cover, window_start[ends], 1)
+    np.add.at(cover, ends + 1, -1)
+
+    result = np.zeros(len(mask), dtype=bool)
+    result[positions[order][np.cumsum(cover)[:-1] > 0]] = True
+    return result
+
+
+def evaluate_rules(df: pd.DataFrame, compiled: Dict = None) -> Dict[str, np.ndarray]:
+    """
+    Evaluate every compiled rule over a transaction frame.
+
+    The amount, category and date arrays are extracted once; all amount bands
+    are evaluated in one pass per amount column, and each rule is then an AND
+    of precomputed masks.
+
+    Args:
+        df: Transaction rows with date, debit_amount, credit_amount and category_flags.
+        compiled: Result of compile_rules (defaults to the shared rules).
+
+    Returns:
+        Dict[str, np.ndarray]: Row positions matching each rule, in frame order.
+    """
+    compiled = COMPILED_RULES if compiled is None else compiled
+    debit = df['debit_amount'].to_numpy(dtype=float)
+    credit = df['credit_amount'].to_numpy(dtype=float)
+    amounts = pd.DataFrame({
+        'debit_amount': debit,
+        'credit_amount': credit,
+        'amount': np.fmax(np.nan_to_num(debit), np.nan_to_num(credit)),
+    })
+    bands = band_masks(amounts, compiled["bands"])
+
+    flags = df['category_flags'].to_numpy(dtype=np.int64)
+    dates = df['date']
+    if dates.dtype.kind != 'M':
+        dates = pd.to_datetime(dates, errors='coerce')
+    dates = dates.to_numpy(dtype='datetime64[D]')
+    dated = ~np.isnat(dates)
+    days = dates.astype(np.int64)
+    weekday = (days + 3) % 7  # 1970-01-01 was a Thursday
+
+    matches = {}
+    for rule in compiled["rules"]:
+        mask = dated.copy()
+        if rule["band"] is not None:
+            mask &= bands[rule["band"]]
+        if rule["categories"]:
+            mask &= (flags & rule["categories"]) != 0
+        if rule["exclude_categories"]:
+            mask &= (flags & rule["exclude_categories"]) == 0
+        if rule["weekdays"] is not None:
+            mask &= np.isin(weekday, rule["weekdays"])
+        if rule["days_of_month"] is not None:
+            day_of_month = (dates - dates.astype('datetime64[M]')).astype(np.int64) + 1
+            mask &= np.isin(day_of_month, rule["days_of_month"])
+        if rule["multiple_of"]:
+            cents = np.round(amounts[rule["amount_column"]].to_numpy() * 100)
+            mask &= (cents > 0) & (cents % round(rule["multiple_of"] * 100) == 0)
+        if rule["window"]:
+            mask = windowed(days, mask, rule["window"]["days"], rule["window"]["min_count"])
+        matches[rule["name"]] = np.flatnonzero(mask)
+
+    return matches
+
+
+COMPILED_RULES = compile_rules()
@@ -0,0 +1,66 @@
+import sys
+import time
+import argparse
+import pandas as pd
+from database import crud
+from database.analytics_store import refresh_snapshot, run_query
+from database.portfolio import load_users_frame
+from api.endpoints.month_wise_analysis import generate_users_summary
+
+# Compare the DuckDB snapshot queries with the pandas path they replace (every
+# user loaded from Postgres and summarized in bulk), on the configured database:
+#   python benchmark_analytics.py --refresh
+# Needs the optional `analytics` extra (duckdb, pyarrow).
+
+# Snapshot query column -> monthly summary field it must equal
+QUERY_FIELDS = {
+    "monthly_flows": {"inflow": "credit_transaction_amount", "outflow": "debit_transaction_amount"},
+    "emi_ratios": {
+        "emi_total": "emi_total", "emi_count": "emi_count",
+        "salary_income_total": "salary_income_total", "salary_income_count": "salary_income_count",
+        "foir": "foir",
+    },
+}
+
+def pandas_summaries(usernames: list, batch: int) -> pd.DataFrame:
+    """Monthly summaries of every user through load_users_frame + generate_users_summary"""
+    rows = []
+    for start in range(0, len(usernames), batch):
+        summaries = generate_users_summary(load_users_frame(usernames[start:start + batch]))
+        rows += [{"username": username, **row} for username, summary in summaries.items() for row in summary or []]
+    return pd.DataFrame(rows).set_index(["username", "month"])
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def mismatches(summary: pd.DataFrame, rows: list, fields: dict) -> int:
+    """Number of values of a snapshot query that differ from the summary (both round to cents, so by a cent at most)"""
+    query = pd.DataFrame(rows).set_index(["username", "month"])
+    joined = query.join(summary[list(fields.values())], how="inner", rsuffix="_summary")
+    count = len(query) - len(joined)
+    for column, field in fields.items():
+        expected = joined[field if field != column else f"{field}_summary"].astype(float).fillna(0)
+        count += int((joined[column].astype(float).fillna(0) - expected).abs().gt(0.015).sum())
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the DuckDB analytics queries against the pandas summary path.")
+    parser.add_argument("--refresh", action="store_true", help="refresh the snapshot first (and time it)")
+    parser.add_argument("--batch", type=int, default=200, help="users per load_users_frame call on the pandas path")
+    args = parser.parse_args()
+
+    if args.refresh:
+        result, seconds = timed(refresh_snapshot)
+        print(f"{'snapshot':15s} {seconds:7.2f}s   {result['written']} tables written, {result['kept']} kept")
+
+    usernames = crud.get_all_usernames()
+    summary, seconds = timed(pandas_summaries, usernames, args.batch)
+    print(f"📊 {len(usernames)} users, {len(summary)} user-months", file=sys.stderr)
+    print(f"{'pandas':15s} {seconds:7.2f}s")
+
+    for name in ("monthly_flows", "category_totals", "emi_ratios"):
+        result, seconds = timed(run_query, name)
+        check = f"   {mismatches(summary, result['rows'], QUERY_FIELDS[name])} mismatches" if name in QUERY_FIELDS else ""
+        print(f"{name:15s} {seconds:7.2f}s   {len(result['rows'])} rows{check}")
@@ -0,0 +1,163 @@
+import sys
+import timeit
+import argparse
+import numpy as np
+import pandas as pd
+from database.daily_balances import compute_eod_balances, combine_daily_balances
+from database.monthly_aggregates import AGGREGATE_COLUMNS, compute_monthly_aggregates
+
+# Compare the NumPy balance kernel with the pandas code it replaced, on synthetic statements:
+#   python benchmark_balance_kernel.py --rows 20000 200000
+# (database.daily_balances connects to the database on import, as the app does)
+
+# --- The previous pandas versions ---
+
+def pandas_eod_balances(df: pd.DataFrame, carry_date=None, carry_balance: float = None) -> pd.Series:
+    """compute_eod_balances before the kernel: sort, drop duplicate days, reindex + ffill"""
+    dates = pd.to_datetime(df['date'], errors='coerce')
+    balances = pd.Series(df['balance_amount'].to_numpy(dtype=float), index=dates)
+    balances = balances[balances.index.notna() & balances.notna()]
+    balances = balances.sort_index(kind='stable')
+    eod = balances[~balances.index.duplicated(keep='last')]
+
+    if carry_date is not None and carry_balance is not None:
+        carry_date = pd.Timestamp(carry_date)
+        if eod.empty or eod.index[0] > carry_date:
+            eod = pd.concat([pd.Series([carry_balance], index=[carry_date]), eod])
+
+    if eod.empty:
+        return pd.Series(dtype=float, index=pd.DatetimeIndex([], name='date'), name='balance')
+
+    full_range = pd.date_range(eod.index[0], eod.index[-1], freq='D', name='date')
+    return eod.reindex(full_range).ffill().rename('balance')
+
+def pandas_monthly_aggregates(df: pd.DataFrame, carry_balance: float = None, start: pd.Timestamp = None) -> pd.DataFrame:
+    """compute_monthly_aggregates before the kernel: per-group lambdas and a groupby for the EOD stats"""
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    df = df.dropna(subset=['date']).sort_values('date', kind='stable')
+    if df.empty:
+        return pd.DataFrame(columns=['month'] + AGGREGATE_COLUMNS)
+
+    df['month'] = df['date'].dt.to_period('M')
+    flows = df.groupby('month').agg(
+        inflow=('credit_amount', 'sum'),
+        outflow=('debit_amount', 'sum'),
+        inflow_txn_count=('credit_amount', lambda x: x.gt(0).sum()),
+        outflow_txn_count=('debit_amount', lambda x: x.gt(0).sum()),
+        txn_count=('date', 'size'),
+    )
+
+    daily = pandas_eod_balances(df, start, carry_balance)
+    eod_stats = daily.groupby(daily.index.to_period('M')).agg(
+        avg_eod_balance='mean', min_eod_balance='min', max_eod_balance='max'
+    )
+    result = flows.join(eod_stats, how='outer')
+    if start is not None:
+        result = result[result.index >= start.to_period('M')]
+
+    count_columns = ['inflow_txn_count', 'outflow_txn_count', 'txn_count']
+    result[['inflow', 'outflow']] = result[['inflow', 'outflow']].fillna(0.0)
+    result[count_columns] = result[count_columns].fillna(0).astype(int)
+
+    result.index = result.index.astype(str)
+    return result.rename_axis('month').reset_index()[['month'] + AGGREGATE_COLUMNS]
+
+def pandas_combine_daily_balances(rows: list) -> pd.Series:
+    """combine_daily_balances before the kernel: pivot the tables, reindex + ffill, sum"""
+    if not rows:
+        return pd.Series(dtype=float, index=pd.DatetimeIndex([], name='date'), name='balance')
+
+    df = pd.DataFrame(rows)
+    df['date'] = pd.to_datetime(df['date'])
+    if df['table_name'].nunique() == 1:
+        return df.set_index('date')['balance'].rename_axis('date')
+
+    wide = df.pivot(index='date', columns='table_name', values='balance').sort_index()
+    full_range = pd.date_range(wide.index.min(), wide.index.max(), freq='D', name='date')
+    return wide.reindex(full_range).ffill().sum(axis=1, min_count=1).rename('balance')
+
+# --- Synthetic data ---
+
+def synthetic_statement(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Transactions of one account over about five years, in statement order, with a few missing balances"""
+    rng = np.random.default_rng(seed)
+    dates = np.sort(pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1800, rows), unit="D"))
+    amounts = rng.random(rows) * 1e4
+    debit = rng.random(rows) < .6
+    return pd.DataFrame({
+        "date": dates,
+        "debit_amount": np.where(debit, amounts, np.nan),
+        "credit_amount": np.where(debit, np.nan, amounts),
+        "balance_amount": np.where(rng.random(rows) < .01, np.nan, 1e6 + np.cumsum(np.where(debit, -amounts, amounts))),
+    })
+
+def stored_daily_rows(frames: list) -> list:
+    """Rows of the daily_balances table for one statement table per frame (separate accounts)"""
+    return [
+        {"table_name": f"transactions_user_1_{n}", "date": day.date(), "balance": balance}
+        for n, df in enumerate(frames, start=1)
+        for day, balance in compute_eod_balances(df).items()
+    ]
+
+def assert_same_series(new: pd.Series, old: pd.Series, rtol: float = None):
+    """
+    Same days and values (identical, or within ``rtol`` when summed in another
+    order); the kernel builds its index from day numbers, so its datetime unit may differ.
+    """
+    old = old.set_axis(old.index.as_unit(new.index.unit))
+    if rtol is None:
+        pd.testing.assert_series_equal(new, old, check_exact=True, check_freq=False)
+    else:
+        pd.testing.assert_series_equal(new, old, check_exact=False, rtol=rtol, atol=0, check_freq=False)
+
+def best_ms(function, *args, repeat: int = 5) -> float:
+    return min(timeit.repeat(lambda: function(*args), number=1, repeat=repeat)) * 1000
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the balance kernel against the previous pandas functions.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[20_000, 200_000])
+    parser.add_argument("--accounts", type=int, default=3, help="statement tables combined by combine_daily_balances")
+    parser.add_argument("--repeat", type=int, default=5, help="best of this many runs")
+    args = parser.parse_args()
+
+    print(f"{'':40s} {'pandas':>9s} {'kernel':>9s}")
+    for rows in args.rows:
+        df = synthetic_statement(rows)
+        start = df['date'].iloc[rows // 2].to_period('M').start_time
+        before = df[df['date'] < start]
+        carry = before['balance_amount'].dropna().iloc[-1]
+        tail = df[df['date'] >= start]
+
+        # EOD series, full and carried into a window: identical, index included
+        assert_same_series(compute_eod_balances(df), pandas_eod_balances(df))
+        assert_same_series(compute_eod_balances(tail, start, carry), pandas_eod_balances(tail, start, carry))
+
+        # Monthly aggregates: equal apart from the summation order of the EOD means (relative error)
+        new, old = compute_monthly_aggregates(df), pandas_monthly_aggregates(df)
+        mean_error = float(((new['avg_eod_balance'] - old['avg_eod_balance']) / old['avg_eod_balance']).abs().max())
+        assert mean_error <= 1e-12, mean_error
+        pd.testing.assert_frame_equal(new.drop(columns='avg_eod_balance'), old.drop(columns='avg_eod_balance'), check_exact=True)
+        pd.testing.assert_frame_equal(
+            compute_monthly_aggregates(tail, carry, start).drop(columns='avg_eod_balance'),
+            pandas_monthly_aggregates(tail, carry, start).drop(columns='avg_eod_balance'),
+            check_exact=True,
+        )
+
+        print(f"{f'compute_eod_balances {rows} rows':40s} "
+              f"{best_ms(pandas_eod_balances, df, repeat=args.repeat):7.1f}ms {best_ms(compute_eod_balances, df, repeat=args.repeat):7.1f}ms")
+        print(f"{f'compute_monthly_aggregates {rows} rows':40s} "
+              f"{best_ms(pandas_monthly_aggregates, df, repeat=args.repeat):7.1f}ms "
+              f"{best_ms(compute_monthly_aggregates, df, repeat=args.repeat):7.1f}ms   mean relative error {mean_error:.1e}")
+
+    # Combined series of separate accounts with staggered statement periods: same days, and totals
+    # within rounding (the consolidated series re-adds the account balances on every day)
+    frames = [synthetic_statement(args.rows[0], seed) for seed in range(1, args.accounts + 1)]
+    for n, df in enumerate(frames):
+        df['date'] += pd.Timedelta(days=90 * n)
+    rows = stored_daily_rows(frames)
+    assert_same_series(combine_daily_balances(rows), pandas_combine_daily_balances(rows), rtol=1e-12)
+    print(f"{f'combine_daily_balances {args.accounts} accounts':40s} "
+          f"{best_ms(pandas_combine_daily_balances, rows, repeat=args.repeat):7.1f}ms "
+          f"{best_ms(combine_daily_balances, rows, repeat=args.repeat):7.1f}ms")
+    print("✅ outputs equal", file=sys.stderr)
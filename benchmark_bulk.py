@@ -0,0 +1,96 @@
+import io
+import os
+import sys
+import time
+import argparse
+import contextlib
+import orjson
+import pandas as pd
+
+# Compare N single-user calls of the monthly summary and overview endpoints with
+# one bulk call each, on the configured database, and check that every user's
+# bulk result is byte-identical to their single-user response:
+#   python benchmark_bulk.py --users 1000 --seed
+# --seed stores the sample BOI statement for the benchmark users that do not
+# exist yet (dates shifted per user, so their months differ). Caches are cold
+# for every run; the shared cache is kept in memory unless SHARED_CACHE_URL is set.
+os.environ.setdefault("SHARED_CACHE_URL", "memory://")
+
+from fastapi.testclient import TestClient
+from main import app
+from database import crud
+from database.frame_cache import frame_cache
+from database.shared_cache import InMemoryBackend, shared_cache
+from database.save_user_data import save_user_and_transactions
+from bank_statement_parser.utils.extraction_core_process import run_extraction
+
+SAMPLE_STATEMENT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_statements", "BOI.pdf")
+
+# Endpoint -> (single-user GET path and its result key, bulk POST path and its result key)
+ENDPOINTS = {
+    "monthly summary": (("/summary/get-monthly-summary", "summary"), ("/summary/bulk-monthly-summary", "summaries")),
+    "overview": (("/overview/overview_data", None), ("/overview/bulk-overview-data", "overviews")),
+}
+
+def seed_users(usernames: list):
+    """Store the sample statement for each of the usernames that has no statements yet"""
+    existing = crud.get_users_statements(usernames)
+    missing = [username for username in usernames if not existing.get(username, {}).get("table_names")]
+    if not missing:
+        return
+    metadata, df, _, _ = run_extraction(SAMPLE_STATEMENT, "", missing[0])
+    for i, username in enumerate(missing[1:], start=1):
+        shifted = df.assign(Date=df["Date"] + pd.Timedelta(days=i % 60))
+        save_user_and_transactions(username, shifted, metadata)
+
+def clear_caches():
+    frame_cache.clear()
+    shared_cache.backend = InMemoryBackend()
+
+def timed(function, *args):
+    """Result and seconds of a call, with the endpoints' progress prints silenced"""
+    clear_caches()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = function(*args)
+    return result, time.perf_counter() - start
+
+def single_calls(client: TestClient, path: str, key: str, usernames: list) -> dict:
+    results = {}
+    for username in usernames:
+        response = client.get(path, params={"username": username})
+        assert response.status_code == 200, (username, response.text)
+        results[username] = response.json()[key] if key else response.json()
+    return results
+
+def bulk_call(client: TestClient, path: str, key: str, usernames: list) -> dict:
+    response = client.post(path, json={"usernames": usernames})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert not body["not_found"], body["not_found"]
+    return body[key]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time single-user calls against one bulk call.")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--prefix", default="bench_client_", help="usernames are the prefix plus a number")
+    parser.add_argument("--seed", action="store_true", help="store the sample statement for missing users first")
+    args = parser.parse_args()
+
+    usernames = [f"{args.prefix}{i}" for i in range(args.users)]
+    if args.seed:
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed_users(usernames)
+
+    client = TestClient(app)
+    print(f"📊 {len(usernames)} users", file=sys.stderr)
+    print(f"{'':16s} {'single':>9s} {'bulk':>9s}")
+    for name, ((single_path, single_key), (bulk_path, bulk_key)) in ENDPOINTS.items():
+        singles, single_seconds = timed(single_calls, client, single_path, single_key, usernames)
+        bulk, bulk_seconds = timed(bulk_call, client, bulk_path, bulk_key, usernames)
+
+        # Byte-identical per user, as the JSON responses encode them
+        differ = [username for username in usernames if orjson.dumps(bulk[username]) != orjson.dumps(singles[username])]
+        assert not differ, f"{name}: {len(differ)} users differ, e.g. {differ[:5]}"
+        print(f"{name:16s} {single_seconds:8.1f}s {bulk_seconds:8.1f}s   {single_seconds / bulk_seconds:.1f}x")
+    print("✅ bulk results identical to single-user responses", file=sys.stderr)
@@ -0,0 +1,58 @@
+import sys
+import time
+import hashlib
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+from database.save_user_data import hash_dataframe
+
+# Compare the statement fingerprint with the sort + CSV hash it replaced:
+#   python benchmark_statement_hash.py --rows 1000000
+# (database.save_user_data connects to the database on import, as the app does)
+
+def sort_csv_hash(df: pd.DataFrame) -> str:
+    """The previous fingerprint: sort by every column, serialize to CSV, SHA-256"""
+    df_copy = df.sort_index(axis=1).sort_values(by=df.columns.tolist()).reset_index(drop=True)
+    return hashlib.sha256(df_copy.to_csv(index=False).encode()).hexdigest()
+
+def synthetic_statement(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Transactions shaped like a parsed statement, with about half the amounts missing"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "date": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1800, rows), unit="D"),
+        "transaction_id": rng.integers(10**8, 10**9, rows).astype(str),
+        "particulars": np.array(["UPI/409426505852/CR/KIRAN", "NEFT SALARY", "ATM WDL", "CHQ DEP 1234"])[rng.integers(0, 4, rows)],
+        "debit_amount": np.where(rng.random(rows) < .5, rng.random(rows) * 1e5, np.nan),
+        "credit_amount": np.where(rng.random(rows) < .5, rng.random(rows) * 1e5, np.nan),
+        "balance_amount": rng.random(rows) * 1e6,
+        "type": np.array(["CR", "DR"])[rng.integers(0, 2, rows)],
+    })
+
+def measure(function, df: pd.DataFrame) -> tuple:
+    """Seconds of one call, and the peak traced MiB of another (tracing slows it down)"""
+    start = time.perf_counter()
+    function(df)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    function(df)
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return seconds, peak
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time statement fingerprinting on a synthetic statement.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = synthetic_statement(args.rows)
+    print(f"📊 {args.rows} rows", file=sys.stderr)
+    for name, function in [("sort + csv", sort_csv_hash), ("fingerprint", hash_dataframe)]:
+        seconds, peak = measure(function, df)
+        print(f"{name:12s} {seconds:7.2f}s   peak {peak:8.1f} MiB")
+
+    shuffled = df.sample(frac=1, random_state=1)[df.columns[::-1]]
+    edited = df.assign(balance_amount=df["balance_amount"].where(df.index != 5, 0))
+    print(f"order independent: {hash_dataframe(df) == hash_dataframe(shuffled)}, "
+          f"changes on edit: {hash_dataframe(df) != hash_dataframe(edited)}")
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+from .balance_kernel import day_numbers
+
+
+def gap_ranges(values: np.ndarray):
+    """
+    Runs missing from sorted distinct integers (day or month numbers).
+
+    Returns:
+        (starts, ends) arrays: the first and last missing value of each run
+        between two consecutive present values.
+    """
+    at = np.flatnonzero(np.diff(values) > 1)
+    return values[at] + 1, values[at + 1] - 1
+
+
+def expand_ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Every value of the inclusive ranges [starts[i], ends[i]], in order"""
+    lengths = ends - starts + 1
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + offsets
+
+
+def activity_gaps(dates: pd.Series) -> dict:
+    """
+    Days and months without transactions between the first and last transaction.
+
+    Gaps are found with np.diff over the sorted distinct day (and month)
+    numbers and kept as run-length ranges, which stay small for sparse
+    multi-year accounts.
+
+    Returns:
+        Dict with ``day_ranges`` and ``month_ranges`` as (starts, ends) arrays
+        of datetime64[D] and datetime64[M] values.
+    """
+    days = np.unique(day_numbers(dates.dropna().to_numpy()))
+    months = np.unique(days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64))
+
+    day_starts, day_ends = gap_ranges(days)
+    month_starts, month_ends = gap_ranges(months)
+    return {
+        "day_ranges": (day_starts.astype('datetime64[D]'), day_ends.astype('datetime64[D]')),
+        "month_ranges": (month_starts.astype('datetime64[M]'), month_ends.astype('datetime64[M]')),
+    }
+
+
+def range_records(starts: np.ndarray, ends: np.ndarray, unit: str) -> list:
+    """Ranges as {"from", "to", <unit>} dicts with ISO dates (or YYYY-MM months)"""
+    counts = (ends - starts).astype(np.int64) + 1
+    return [
+        {"from": start, "to": end, unit: int(count)}
+        for start, end, count in zip(starts.astype(str).tolist(), ends.astype(str).tolist(), counts)
+    ]
+
+
+def expand_date_ranges(starts: np.ndarray, ends: np.ndarray) -> list:
+    """ISO strings of every day (or month) in the ranges"""
+    unit = starts.dtype
+    return expand_ranges(starts.astype(np.int64), ends.astype(np.int64)).astype(unit).astype(str).tolist()
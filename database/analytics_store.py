@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import hashlib
+from datetime import datetime
+import pandas as pd
+from . import crud
+from .frame_cache import build_transaction_frame
+from .recurring_flows import load_users_recurring_schedules, SCHEDULE_COLUMNS
+from bank_statement_parser.utils.categorizer import CATEGORY_FLAGS
+
+# Directory of the Parquet snapshots read by the analytical engine (override through the environment).
+# Cross-user aggregates are answered by DuckDB (optional `duckdb` package) from these files only,
+# never from Postgres; refresh them periodically, e.g. `python snapshot_analytics.py` from cron.
+ANALYTICS_SNAPSHOT_DIR = os.getenv("ANALYTICS_SNAPSHOT_DIR", "./analytics_snapshots")
+
+MANIFEST = "manifest.json"
+
+# Snapshot columns and their types (one Parquet file per statement table)
+SNAPSHOT_COLUMNS = {
+    "username": "string",
+    "user_id": "int",
+    "table_name": "string",
+    "id": "int",
+    "date": "date",
+    "particulars": "string",
+    "debit_amount": "float",
+    "credit_amount": "float",
+    "balance_amount": "float",
+    "category_flags": "int",
+}
+SCHEDULE_SNAPSHOT_COLUMNS = {
+    "username": "string",
+    "table_name": "string",
+    "direction": "string",
+    "amount": "float",
+    "amount_min": "float",
+    "amount_max": "float",
+    "period_days": "float",
+    "occurrences": "int",
+    "first_date": "date",
+    "last_date": "date",
+}
+DUCKDB_TYPES = {"string": "VARCHAR", "int": "BIGINT", "float": "DOUBLE", "date": "DATE"}
+
+
+def require_duckdb():
+    try:
+        import duckdb
+    except ImportError:
+        raise ImportError("The analytics snapshot engine needs the optional 'duckdb' package (the 'analytics' extra).")
+    return duckdb
+
+
+def arrow_schema(types: dict):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("Writing analytics snapshots needs the optional 'pyarrow' package (the 'analytics' extra).")
+    arrow_types = {"string": pa.string(), "int": pa.int64(), "float": pa.float64(), "date": pa.date32()}
+    return pa.schema([(column, arrow_types[kind]) for column, kind in types.items()])
+
+
+def read_manifest(directory: str = ANALYTICS_SNAPSHOT_DIR):
+    """The current snapshot's manifest, or None before the first snapshot"""
+    try:
+        with open(os.path.join(directory, MANIFEST), "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def write_parquet(path: str, frames, types: dict) -> int:
+    """Write DataFrame chunks to one Parquet file (via a temp file and an atomic rename); returns the row count"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(types)
+    rows = 0
+    with pq.ParquetWriter(path + ".tmp", schema) as writer:
+        for df in frames:
+            writer.write_table(pa.Table.from_pandas(df[list(types)], schema=schema, preserve_index=False))
+            rows += len(df)
+    os.replace(path + ".tmp", path)
+    return rows
+
+
+def table_frames(username: str, user_data: dict, table_name: str):
+    """Dated rows of one statement table, read in keyset batches of STREAM_BATCH_SIZE rows"""
+    bank_name = user_data["metadata"][0]["bank_name"] if user_data["metadata"] else None
+    for rows in crud.iter_statement_rows([table_name]):
+        df = build_transaction_frame(rows, bank_name)
+        df['username'] = username
+        df['table_name'] = table_name
+        yield df
+
+
+def refresh_snapshot(directory: str = ANALYTICS_SNAPSHOT_DIR) -> dict:
+    """
+    Bring the Parquet snapshot of every user's transactions up to date.
+
+    Each statement table is one file named after its data hash, so only
+    tables ingested or extended since the last snapshot are read from
+    Postgres; the recurring schedules (small) are rewritten every time. The
+    new manifest replaces the old one atomically and files no longer listed
+    in either of them are removed, so queries running during a refresh keep
+    a consistent view.
+
+    Returns:
+        Dict with the snapshot's tables, rows and what the refresh wrote, kept and removed.
+    """
+    started = time.perf_counter()
+    transactions_dir = os.path.join(directory, "transactions")
+    os.makedirs(transactions_dir, exist_ok=True)
+    previous = read_manifest(directory) or {"tables": {}, "schedules": None}
+
+    # Step 1: Every user's statement tables and their data hashes (one query)
+    users = crud.get_users_statements(crud.get_all_usernames())
+
+    # Step 2: Write the tables whose hash is not in the snapshot yet
+    tables = {}
+    written = 0
+    for username, user_data in users.items():
+        for table_name in user_data["table_names"]:
+            table_hash = user_data["hashes"][table_name]
+            file = f"transactions/{table_name}-{hashlib.sha256(table_hash.encode()).hexdigest()[:16]}.parquet"
+            known = previous["tables"].get(table_name)
+            if known and known["file"] == file and os.path.exists(os.path.join(directory, file)):
+                tables[table_name] = known
+                continue
+            rows = write_parquet(
+                os.path.join(directory, file), table_frames(username, user_data, table_name), SNAPSHOT_COLUMNS
+            )
+            tables[table_name] = {"file": file, "username": username, "rows": rows}
+            written += 1
+
+    # Step 3: Recurring schedules of every user (detected at ingest) for EMI / salary matching
+    schedules = load_users_recurring_schedules(list(users))
+    schedule_rows = pd.DataFrame(
+        [{"username": username, **row} for username, data in schedules.items() for row in data["rows"]],
+        columns=["username", "table_name", *SCHEDULE_COLUMNS]
+    )
+    for column in ("first_date", "last_date"):
+        schedule_rows[column] = pd.to_datetime(schedule_rows[column])
+    schedules_file = f"recurring_schedules-{datetime.now():%Y%m%d%H%M%S%f}.parquet"
+    write_parquet(os.path.join(directory, schedules_file), [schedule_rows], SCHEDULE_SNAPSHOT_COLUMNS)
+
+    # Step 4: Publish the new manifest, then drop files neither manifest refers to
+    manifest = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "tables": tables,
+        "schedules": schedules_file,
+    }
+    with open(os.path.join(directory, MANIFEST + ".tmp"), "w") as file:
+        json.dump(manifest, file)
+    os.replace(os.path.join(directory, MANIFEST + ".tmp"), os.path.join(directory, MANIFEST))
+
+    keep = {entry["file"] for entry in [*tables.values(), *previous["tables"].values()]}
+    keep |= {manifest["schedules"], previous["schedules"]}
+    removed = 0
+    for folder in (directory, transactions_dir):
+        for name in os.listdir(folder):
+            relative = os.path.relpath(os.path.join(folder, name), directory)
+            if name.endswith(".parquet") and relative not in keep:
+                os.remove(os.path.join(folder, name))
+                removed += 1
+
+    return {
+        "created_at": manifest["created_at"],
+        "users": len(users),
+        "tables": len(tables),
+        "rows": sum(entry["rows"] for entry in tables.values()),
+        "written": written,
+        "kept": len(tables) - written,
+        "removed": removed,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+# --- Queries ---
+
+# Categories as a (name, bit) relation for category joins
+CATEGORY_VALUES = ", ".join(f"('{name}', {bit})" for name, bit in CATEGORY_FLAGS.items())
+
+# Month range filter shared by the queries ($start_month / $end_month as 'YYYY-MM', NULL for open)
+MONTH_RANGE = "($start_month IS NULL OR month >= $start_month) AND ($end_month IS NULL OR month <= $end_month)"
+
+# Named cross-user aggregates over the snapshot views `transactions` and `recurring_schedules`
+ANALYTICS_QUERIES = {
+    # Inflow / outflow of every user and month
+    "monthly_flows": f"""
+        SELECT username, month,
+               round(sum(credit_amount) FILTER (WHERE credit_amount > 0), 2) AS inflow,
+               round(sum(debit_amount) FILTER (WHERE debit_amount > 0), 2) AS outflow,
+               count(*) FILTER (WHERE credit_amount > 0) AS inflow_txn_count,
+               count(*) FILTER (WHERE debit_amount > 0) AS outflow_txn_count,
+               count(*) AS txn_count
+        FROM (SELECT *, strftime(date, '%Y-%m') AS month FROM transactions)
+        WHERE {MONTH_RANGE}
+        GROUP BY username, month
+        ORDER BY username, month
+    """,
+    # Portfolio-wide transactions of each category per month
+    "category_totals": f"""
+        SELECT month, category, count(*) AS txn_count, count(DISTINCT username) AS users,
+               round(coalesce(sum(debit_amount), 0), 2) AS debit_amount,
+               round(coalesce(sum(credit_amount), 0), 2) AS credit_amount
+        FROM (SELECT *, strftime(date, '%Y-%m') AS month FROM transactions) AS t
+        JOIN (VALUES {CATEGORY_VALUES}) AS categories(category, bit) ON (t.category_flags & categories.bit) != 0
+        WHERE {MONTH_RANGE}
+        GROUP BY month, category
+        ORDER BY month, category
+    """,
+    # EMI (recurring debits) against salary (recurring credits) of every user and month. Like
+    # match_schedules, a row counts once when it falls inside the amount band and date span of
+    # any of its user's schedules (bands of several statement tables may overlap).
+    "emi_ratios": f"""
+        WITH dated AS (
+            SELECT *, strftime(date, '%Y-%m') AS month FROM transactions
+        ),
+        emi AS (
+            SELECT d.username, d.month, d.debit_amount AS amount
+            FROM dated AS d
+            WHERE d.debit_amount > 0 AND EXISTS (
+                SELECT 1 FROM recurring_schedules AS s
+                WHERE s.direction = 'debit' AND s.username = d.username
+                  AND d.debit_amount BETWEEN s.amount_min AND s.amount_max
+                  AND d.date BETWEEN s.first_date AND s.last_date
+            )
+        ),
+        salary AS (
+            SELECT d.username, d.month, d.credit_amount AS amount
+            FROM dated AS d
+            WHERE d.credit_amount > 0 AND EXISTS (
+                SELECT 1 FROM recurring_schedules AS s
+                WHERE s.direction = 'credit' AND s.username = d.username
+                  AND d.credit_amount BETWEEN s.amount_min AND s.amount_max
+                  AND d.date BETWEEN s.first_date AND s.last_date
+            )
+        ),
+        months AS (SELECT DISTINCT username, month FROM dated)
+        SELECT m.username, m.month,
+               round(coalesce(e.total, 0), 2) AS emi_total, coalesce(e.count, 0) AS emi_count,
+               round(coalesce(s.total, 0), 2) AS salary_income_total, coalesce(s.count, 0) AS salary_income_count,
+               CASE WHEN e.total > 0 AND s.total > 0 THEN round(e.total / s.total, 2) END AS foir
+        FROM months AS m
+        LEFT JOIN (SELECT username, month, sum(amount) AS total, count(*) AS count FROM emi GROUP BY ALL) AS e
+          USING (username, month)
+        LEFT JOIN (SELECT username, month, sum(amount) AS total, count(*) AS count FROM salary GROUP BY ALL) AS s
+          USING (username, month)
+        WHERE {MONTH_RANGE}
+        ORDER BY m.username, m.month
+    """,
+}
+
+
+def create_view(conn, name: str, files: list, types: dict):
+    """A view over Parquet files (an empty typed table when there are none)"""
+    if files:
+        listing = ", ".join("'" + path.replace("'", "''") + "'" for path in files)
+        conn.execute(f"CREATE VIEW {name} AS SELECT * FROM read_parquet([{listing}])")
+    else:
+        columns = ", ".join(f"{column} {DUCKDB_TYPES[kind]}" for column, kind in types.items())
+        conn.execute(f"CREATE TABLE {name} ({columns})")
+
+
+def run_query(name: str, start_month: str = None, end_month: str = None,
+              directory: str = ANALYTICS_SNAPSHOT_DIR) -> dict:
+    """
+    Run a named analytics query on the latest snapshot with an in-process DuckDB.
+
+    Returns:
+        Dict with ``snapshot`` (its creation time) and ``rows`` (list of row dicts).
+
+    Raises:
+        ValueError: Unknown query name.
+        LookupError: No snapshot has been taken yet.
+        ImportError: duckdb is not installed.
+    """
+    if name not in ANALYTICS_QUERIES:
+        raise ValueError(f"Unknown query: {name}. Available: {list(ANALYTICS_QUERIES)}")
+    duckdb = require_duckdb()
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise LookupError("No analytics snapshot has been taken yet")
+
+    with duckdb.connect() as conn:
+        create_view(
+            conn, "transactions",
+            [os.path.join(directory, entry["file"]) for entry in manifest["tables"].values()], SNAPSHOT_COLUMNS
+        )
+        create_view(conn, "recurring_schedules", [os.path.join(directory, manifest["schedules"])], SCHEDULE_SNAPSHOT_COLUMNS)
+        result = conn.execute(ANALYTICS_QUERIES[name], {"start_month": start_month, "end_month": end_month})
+        columns = [column[0] for column in result.description]
+        rows = [dict(zip(columns, row)) for row in result.fetchall()]
+
+    return {"snapshot": manifest["created_at"], "rows": rows}
+
+
+def snapshot_status(directory: str = ANALYTICS_SNAPSHOT_DIR):
+    """Creation time, tables and rows of the current snapshot, or None before the first one"""
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return None
+    return {
+        "created_at": manifest["created_at"],
+        "users": len({entry["username"] for entry in manifest["tables"].values()}),
+        "tables": len(manifest["tables"]),
+        "rows": sum(entry["rows"] for entry in manifest["tables"].values()),
+    }
@@ -0,0 +1,139 @@
+import numpy as np
+
+# End-of-day balance kernel on plain arrays. Days are integer day numbers
+# (days since 1970-01-01) so ranges, lookups and month boundaries are all
+# searchsorted calls on sorted int64 arrays.
+
+
+def day_numbers(dates) -> np.ndarray:
+    """Day numbers of dates (anything NumPy can cast to datetime64[D]); NaT stays as the NaT sentinel"""
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+
+
+def last_per_day(days: np.ndarray, balances: np.ndarray):
+    """
+    Last balance of each day.
+
+    Args:
+        days: Sorted day numbers, one per transaction.
+        balances: Balance after each transaction, in the same (statement) order.
+
+    Returns:
+        (unique_days, balances) with one entry per distinct day.
+    """
+    if len(days) == 0:
+        return days, balances
+    last = np.flatnonzero(np.append(days[1:] != days[:-1], True))
+    return days[last], balances[last]
+
+
+def fill_daily(days: np.ndarray, balances: np.ndarray, first_day: int = None, last_day: int = None) -> np.ndarray:
+    """
+    Carry end-of-day balances forward over every calendar day of [first_day, last_day].
+
+    Each day takes the balance of the latest entry on or before it (one
+    searchsorted over the whole range); days before the first entry are NaN.
+
+    Args:
+        days: Sorted distinct day numbers with a known balance.
+        balances: Balance of each of those days.
+        first_day: First day of the output (default: days[0]).
+        last_day: Last day of the output (default: days[-1]).
+    """
+    first_day = days[0] if first_day is None else first_day
+    last_day = days[-1] if last_day is None else last_day
+    position = np.searchsorted(days, np.arange(first_day, last_day + 1), side='right') - 1
+    daily = balances[np.clip(position, 0, None)].astype(float)
+    daily[position < 0] = np.nan
+    return daily
+
+
+def month_stats(first_day: int, daily: np.ndarray):
+    """
+    Mean, min and max of a daily series per calendar month, ignoring NaN days.
+
+    Month boundaries are found with searchsorted on the month starts and each
+    month is reduced with one reduceat call per statistic.
+
+    Returns:
+        (months, mean, minimum, maximum) where months is a datetime64[M] array.
+    """
+    dates = np.arange(first_day, first_day + len(daily)).astype('datetime64[D]')
+    months = np.arange(dates[0].astype('datetime64[M]'), dates[-1].astype('datetime64[M]') + 1)
+    starts = np.searchsorted(dates, months.astype('datetime64[D]'))
+
+    valid = ~np.isnan(daily)
+    sums = np.add.reduceat(np.where(valid, daily, 0.0), starts)
+    counts = np.add.reduceat(valid.astype(np.int64), starts)
+    mean = np.divide(sums, counts, out=np.full(len(sums), np.nan), where=counts > 0)
+    return months, mean, np.fmin.reduceat(daily, starts), np.fmax.reduceat(daily, starts)
+
+
+def minmax_points(values: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Positions of a series to keep when drawing it with at most ``max_points``
+    points: the first and last points plus the minimum and maximum of each of
+    (max_points - 2) // 2 equal buckets, so every peak and trough survives.
+    With max_points == 3 there is room for one extreme only: the global
+    minimum or maximum, whichever lies further outside the endpoints.
+
+    All buckets are reduced together: one lexsort orders the points by value
+    within their bucket, so each bucket's minimum and maximum are its first
+    and last entries.
+    """
+    length = len(values)
+    if length <= max_points or max_points < 3:
+        return np.arange(length)
+
+    buckets = (max_points - 2) // 2
+    if buckets < 1:
+        lowest, highest = int(np.argmin(values)), int(np.argmax(values))
+        below = min(values[0], values[-1]) - values[lowest]
+        above = values[highest] - max(values[0], values[-1])
+        return np.unique([0, lowest if below >= above else highest, length - 1])
+
+    bucket = np.arange(length) * buckets // length
+    order = np.lexsort((values, bucket))
+    ends = np.cumsum(np.bincount(bucket, minlength=buckets))
+    starts = np.append(0, ends[:-1])
+    return np.unique(np.concatenate([order[starts], order[ends - 1], [0, length - 1]]))
+
+
+def lttb_points(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Positions of a series kept by Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are kept; the points in between are split into
+    max_points - 2 buckets and each bucket keeps the point forming the largest
+    triangle with the previously kept point and the next bucket's average.
+    Bucket averages come from cumulative sums and each bucket's triangle areas
+    are one array expression; only the walk over buckets is sequential, since
+    each choice depends on the previous one.
+    """
+    length = len(x)
+    if length <= max_points or max_points < 3:
+        return np.arange(length)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, length - 1, max_points - 1).astype(np.int64)
+
+    # Average of every bucket; the bucket after the last one is the last point
+    sum_x = np.append(0.0, np.cumsum(x))
+    sum_y = np.append(0.0, np.cumsum(y))
+    sizes = np.diff(edges)
+    next_x = np.append(((sum_x[edges[1:]] - sum_x[edges[:-1]]) / sizes)[1:], x[-1])
+    next_y = np.append(((sum_y[edges[1:]] - sum_y[edges[:-1]]) / sizes)[1:], y[-1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, length - 1
+    previous = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[previous] - next_x[i]) * (y[lo:hi] - y[previous])
+            - (x[previous] - x[lo:hi]) * (next_y[i] - y[previous])
+        )
+        previous = lo + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
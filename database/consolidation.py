@@ -0,0 +1,77 @@
+import heapq
+from itertools import groupby
+from operator import itemgetter
+
+# Consolidated view of a user's statements: every statement table (or stored
+# per-table series) is already sorted, so the streams are combined with a
+# k-way heap merge (O(n log k) for k streams) instead of concatenating and
+# re-sorting the whole history, and balances are tracked per account.
+
+
+def merge_sorted_streams(streams: list, key):
+    """
+    Merge streams that are each sorted by ``key`` into one sorted stream.
+
+    Streams are consumed lazily, so batched readers such as
+    crud.iter_statement_rows are never materialized in full; with a single
+    stream the rows pass straight through.
+    """
+    if len(streams) == 1:
+        return iter(streams[0])
+    return heapq.merge(*streams, key=key)
+
+
+class AccountBalances:
+    """
+    Latest known balance of each account of a user, and their total.
+
+    Several statement tables of one account share one balance (the most
+    recent update wins), while different accounts add up. Accounts that have
+    no balance yet are left out of the total.
+    """
+
+    def __init__(self):
+        self.balances = {}
+        self.total = None
+
+    def update(self, account, balance):
+        if balance is None or balance != balance:  # unknown (None / NaN) keeps the previous balance
+            return
+        self.balances[account] = balance
+        self.total = sum(self.balances.values())
+
+
+def tag_stream(rows, index: int, account):
+    """(day, stream index, account, balance) entries of one stream"""
+    for day, balance in rows:
+        yield day, index, account, balance
+
+
+def consolidated_eod(streams: list, opening: list = None) -> tuple:
+    """
+    Combined end-of-day balance of several accounts.
+
+    Args:
+        streams: (account, rows) pairs where rows are (day, balance) pairs sorted
+            by day, e.g. the stored daily series of each statement table. Streams
+            of the same account update one balance, later streams winning on a
+            shared day.
+        opening: (account, balance) pairs in effect before the first day of the
+            streams, oldest first, e.g. when only a date range is combined.
+
+    Returns:
+        (days, totals): every day present in any stream, in order, with the sum
+        of each account's balance as of the end of that day (None before any
+        account has a balance).
+    """
+    tagged = [tag_stream(rows, index, account) for index, (account, rows) in enumerate(streams)]
+    state = AccountBalances()
+    for account, balance in opening or []:
+        state.update(account, balance)
+    days, totals = [], []
+    for day, updates in groupby(merge_sorted_streams(tagged, key=itemgetter(0, 1)), key=itemgetter(0)):
+        for _, _, account, balance in updates:
+            state.update(account, balance)
+        days.append(day)
+        totals.append(state.total)
+    return days, totals
@@ -1,8 +1,18 @@
-from sqlalchemy import select
-from database.db import engine, user_table_metadata, users, user_table_hashes
+from bisect import bisect_left, bisect_right
+from itertools import chain, islice
+from operator import itemgetter
+from sqlalchemy import select, exists, true
+from database.db import (
+    engine, user_table_metadata, users, user_table_hashes, account_watermarks, monthly_aggregates, daily_balances,
+    recurring_schedules, recurring_scans
+)
+from database.consolidation import merge_sorted_streams
 from sqlalchemy import text
 from sqlalchemy.orm import Session
-from sqlalchemy import Table, Column, Integer, String, Float, DateTime, MetaData, Date, Text
+from sqlalchemy import Table, Column, Integer, String, Float, DateTime, MetaData, Date, Text, Index
+
+# Rows read per table and round trip when transaction rows are streamed in keyset batches (iter_statement_rows)
+STREAM_BATCH_SIZE = 2000
 
 def get_metadata_by_user_id(user_id: int):
     with Session(engine) as session:
@@ -31,6 +41,12 @@ def get_user_id_by_username(username: str):
         result = session.execute(stmt).fetchone()
         return result[0] if result else None
     
+def get_all_usernames():
+    """Return the usernames of every user."""
+    with Session(engine) as session:
+        result = session.execute(select(users.c.username).order_by(users.c.id)).fetchall()
+        return [row[0] for row in result]
+
 def get_transaction_table_names(user_id: int):
     """Return list of transaction table names for a user."""
     with Session(engine) as session:
@@ -47,6 +63,501 @@ def get_transaction_data_from_table(table_name: str):
         return [dict(zip(columns, row)) for row in rows]
 
 
+TRANSACTION_COLUMNS = [
+    "id", "user_id", "date", "transaction_id", "particulars",
+    "debit_amount", "credit_amount", "balance_amount", "type",
+    "optional_1", "optional_2", "optional_3", "created_at", "category_flags",
+]
+
+def get_user_statements(username: str):
+    """
+    Resolve a user together with their statement tables, hashes and metadata in one query.
+
+    Returns:
+        None if the user does not exist, else a dict with user_id, table_names,
+        hashes (table name -> data hash) and metadata.
+    """
+    return get_users_statements([username]).get(username)
+
+
+def get_users_statements(usernames: list):
+    """
+    Resolve several users with their statement tables, hashes and metadata in one query.
+
+    Returns:
+        Dict of username -> the dict described in get_user_statements, for the
+        users that exist.
+    """
+    stmt = (
+        select(
+            users.c.id.label("resolved_user_id"),
+            users.c.username.label("resolved_username"),
+            user_table_hashes.c.table_name.label("source_table"),
+            user_table_hashes.c.hash.label("source_hash"),
+            *user_table_metadata.c,
+        )
+        .select_from(users)
+        .outerjoin(user_table_hashes, user_table_hashes.c.user_id == users.c.id)
+        .outerjoin(user_table_metadata, user_table_metadata.c.table_hash_id == user_table_hashes.c.id)
+        .where(users.c.username.in_(usernames))
+        .order_by(users.c.id, user_table_hashes.c.id)
+    )
+
+    with engine.connect() as conn:
+        result = conn.execute(stmt).fetchall()
+
+    found = {}
+    for row in result:
+        mapping = row._mapping
+        user_data = found.get(mapping["resolved_username"])
+        if user_data is None:
+            user_data = found[mapping["resolved_username"]] = {
+                "user_id": mapping["resolved_user_id"],
+                "table_names": [],
+                "hashes": {},
+                "metadata": [],
+            }
+        table = mapping["source_table"]
+        if table and table not in user_data["hashes"]:
+            user_data["table_names"].append(table)
+            user_data["hashes"][table] = mapping["source_hash"]
+        if mapping["id"] is not None:
+            user_data["metadata"].append({c.name: mapping[c.name] for c in user_table_metadata.c})
+
+    return found
+
+
+def get_statement_versions(username: str):
+    """
+    The user's id and statement hashes only, for validating cached responses
+    without touching transaction tables (two indexed lookups).
+
+    Returns:
+        None if the user does not exist, else a dict with user_id and hashes
+        (table name -> data hash).
+    """
+    stmt = (
+        select(users.c.id, user_table_hashes.c.table_name, user_table_hashes.c.hash)
+        .select_from(users)
+        .outerjoin(user_table_hashes, user_table_hashes.c.user_id == users.c.id)
+        .where(users.c.username == username)
+    )
+    with engine.connect() as conn:
+        result = conn.execute(stmt).fetchall()
+
+    if not result:
+        return None
+    return {
+        "user_id": result[0][0],
+        "hashes": {table_name: table_hash for _, table_name, table_hash in result if table_name},
+    }
+
+
+def split_table_runs(rows: list, keys: list, table_indexes: list):
+    """Cut rows sorted by table_index into the run of each of the (ascending) table_indexes"""
+    table_of = itemgetter(keys.index("table_index"))
+    runs, start = [], 0
+    for index in table_indexes:
+        end = bisect_left(rows, index + 1, lo=start, key=table_of)
+        runs.append(rows[start:end])
+        start = end
+    return runs
+
+
+def merge_table_runs(rows: list, keys: list, table_count: int):
+    """
+    Reorder rows sorted by (table_index, date, id) into (date, id, table_index) order.
+
+    Every table's run of rows is already in statement order, so the runs are
+    combined with a k-way heap merge instead of sorting the union; undated rows,
+    which come last in every run, follow by id.
+    """
+    table_key, date_key, id_key = keys.index("table_index"), keys.index("date"), keys.index("id")
+    dated, undated = [], []
+    for run in split_table_runs(rows, keys, range(table_count)):
+        split = len(run)
+        while split and run[split - 1][date_key] is None:
+            split -= 1
+        dated.append(run[:split])
+        undated.append(run[split:])
+
+    return chain(
+        merge_sorted_streams(dated, key=itemgetter(date_key, id_key, table_key)),
+        merge_sorted_streams(undated, key=itemgetter(id_key, table_key)),
+    )
+
+
+def get_statement_rows(table_names: list):
+    """
+    Fetch the rows of several transaction tables with a single UNION ALL.
+
+    Rows come back by date and then id, i.e. in statement order, whatever their
+    physical order in the tables (updated rows move on disk); undated rows come
+    last. The union is ordered by table first, which costs the database next to
+    nothing as every table is stored in statement order, and the per-table runs
+    are heap-merged here.
+    """
+    if not table_names:
+        return []
+
+    columns = ", ".join(f'"{c}"' for c in TRANSACTION_COLUMNS)
+    union = " UNION ALL ".join(
+        f'SELECT {columns}, {index} AS table_index FROM "{table}"' for index, table in enumerate(table_names)
+    )
+    with engine.connect() as conn:
+        result = conn.execute(text(union + " ORDER BY table_index, date, id"))
+        keys = list(result.keys())
+        rows = result.fetchall()
+
+    return [dict(zip(keys, row)) for row in merge_table_runs(rows, keys, len(table_names))]
+
+
+# Columns the analytics read (bulk loads skip the rest)
+ANALYSIS_COLUMNS = ["id", "date", "particulars", "debit_amount", "credit_amount", "balance_amount", "category_flags"]
+
+def get_users_statement_rows(tables_by_user: dict, columns: list = ANALYSIS_COLUMNS):
+    """
+    Fetch the statement rows of several users with a single UNION ALL.
+
+    Rows are returned as tuples in no particular order (the caller sorts them,
+    which is cheaper than sorting the union in the database).
+
+    Args:
+        tables_by_user: username -> that user's statement table names.
+        columns: Transaction columns to fetch.
+
+    Returns:
+        Tuples of (index of the username in tables_by_user, *columns).
+    """
+    selected = ", ".join(f'"{c}"' for c in columns)
+    union = " UNION ALL ".join(
+        f'SELECT {index} AS user_index, {selected} FROM "{table}"'
+        for index, username in enumerate(tables_by_user)
+        for table in tables_by_user[username]
+    )
+    if not union:
+        return []
+
+    with engine.connect() as conn:
+        return conn.execute(text(union)).fetchall()
+
+
+def iter_statement_rows(table_names: list, after: tuple = None, limit: int = None,
+                        batch_size: int = STREAM_BATCH_SIZE, start_date=None, end_date=None):
+    """
+    Yield the dated rows of several transaction tables in batches, ordered by
+    (date, id, table_index) where table_index is the table's position in table_names.
+
+    Rows are read ``batch_size`` at a time from each table's (date, id) index,
+    one UNION ALL per round trip covering the tables whose buffered rows ran
+    out, and heap-merged as far as every table is known; so only a few batches
+    are held in memory at a time and the database never sorts the user's full
+    history. ``after`` is the (date, id, table_index) key of the last
+    row already returned: every table is read from its (date, id) index just
+    past that key, which makes each page cost the same however deep it is.
+
+    Args:
+        table_names: Transaction tables, in a stable order.
+        after: Keyset position to resume after, or None to start from the first row.
+        limit: Maximum number of rows to return, or None for all of them.
+        batch_size: Rows fetched per table and round trip.
+        start_date: Only rows dated on or after this day.
+        end_date: Only rows dated on or before this day.
+
+    Yields:
+        Lists of row dicts with the TRANSACTION_COLUMNS plus table_index.
+    """
+    if not table_names:
+        return
+
+    columns = ", ".join(f'"{c}"' for c in TRANSACTION_COLUMNS)
+    params = {}
+    date_range = ""
+    if start_date is not None:
+        params["start_date"] = start_date
+        date_range += " AND date >= :start_date"
+    if end_date is not None:
+        params["end_date"] = end_date
+        date_range += " AND date <= :end_date"
+
+    with engine.connect() as conn:
+        buffers = [[] for _ in table_names]  # Fetched rows of each table not returned yet
+        positions = [None] * len(table_names)  # (date, id) of the last row fetched from each table
+        exhausted = [False] * len(table_names)
+        batch, remaining = [], limit
+        while remaining is None or remaining > 0:
+            refill = [index for index, rows in enumerate(buffers) if not rows and not exhausted[index]]
+            if refill:
+                params["size"] = batch_size
+                branches = []
+                for index in refill:
+                    branch = f'SELECT {columns}, {index} AS table_index FROM "{table_names[index]}" WHERE date IS NOT NULL{date_range}'
+                    if positions[index] is not None:
+                        params[f"date_{index}"], params[f"id_{index}"] = positions[index]
+                        branch += f" AND (date, id) > (:date_{index}, :id_{index})"
+                    elif after is not None:
+                        # Tables after the cursor's table may still hold rows with the cursor's own (date, id)
+                        params["after_date"], params["after_id"], after_table = after
+                        operator = ">=" if index > after_table else ">"
+                        branch += f" AND (date, id) {operator} (:after_date, :after_id)"
+                    branches.append(f"({branch} ORDER BY date, id LIMIT :size)")
+
+                union = " UNION ALL ".join(branches)
+                result = conn.execute(text(f"SELECT * FROM ({union}) AS statement_rows ORDER BY table_index, date, id"), params)
+                keys = list(result.keys())
+                row_key = itemgetter(keys.index("date"), keys.index("id"), keys.index("table_index"))
+                for index, rows in zip(refill, split_table_runs(result.fetchall(), keys, refill)):
+                    buffers[index] = rows
+                    exhausted[index] = len(rows) < batch_size
+                    if rows:
+                        positions[index] = row_key(rows[-1])[:2]
+
+            # Rows up to the smallest last fetched key of the tables not exhausted yet are final
+            frontier = min((row_key(rows[-1]) for index, rows in enumerate(buffers) if not exhausted[index]), default=None)
+            ready = []
+            for index, rows in enumerate(buffers):
+                cut = len(rows) if frontier is None else bisect_right(rows, frontier, key=row_key)
+                ready.append(rows[:cut])
+                buffers[index] = rows[cut:]
+
+            for row in islice(merge_sorted_streams(ready, key=row_key), remaining):
+                batch.append(row)
+                if len(batch) == batch_size:
+                    yield [dict(zip(keys, row)) for row in batch]
+                    batch = []
+                if remaining is not None:
+                    remaining -= 1
+            if frontier is None:
+                break
+
+        if batch:
+            yield [dict(zip(keys, row)) for row in batch]
+
+
+def get_user_data(username: str, latest_only: bool = False):
+    """
+    Resolve a user and load their metadata plus all statement rows.
+
+    The user, table names and metadata come from one joined query and every
+    statement table is read with a single UNION ALL, so the cost is two round
+    trips however many statements the user has.
+
+    Returns:
+        None if the user does not exist, else a dict with user_id, table_names,
+        hashes, metadata and rows.
+    """
+    user_data = get_user_statements(username)
+    if not user_data:
+        return None
+
+    if latest_only and user_data["table_names"]:
+        user_data["table_names"] = [sorted(user_data["table_names"])[-1]]
+
+    user_data["rows"] = get_statement_rows(user_data["table_names"])
+    return user_data
+
+
+def get_monthly_aggregates(username: str):
+    """
+    Resolve a user and load the precomputed monthly aggregates of all their
+    statement tables in one query.
+
+    Returns:
+        None if the user does not exist, else a dict with user_id, table_names,
+        accounts (table name -> account number) and rows ordered by month.
+    """
+    stmt = (
+        select(
+            users.c.id.label("resolved_user_id"),
+            user_table_hashes.c.table_name.label("source_table"),
+            user_table_metadata.c.account_number.label("source_account"),
+            *monthly_aggregates.c,
+        )
+        .select_from(users)
+        .outerjoin(user_table_hashes, user_table_hashes.c.user_id == users.c.id)
+        .outerjoin(user_table_metadata, user_table_metadata.c.table_hash_id == user_table_hashes.c.id)
+        .outerjoin(monthly_aggregates, monthly_aggregates.c.table_name == user_table_hashes.c.table_name)
+        .where(users.c.username == username)
+        .order_by(monthly_aggregates.c.month, user_table_hashes.c.id)
+    )
+
+    with engine.connect() as conn:
+        result = conn.execute(stmt).fetchall()
+    if not result:
+        return None
+
+    table_names = []
+    accounts = {}
+    rows = []
+    for row in result:
+        mapping = row._mapping
+        table = mapping["source_table"]
+        if table and table not in accounts:
+            table_names.append(table)
+            accounts[table] = mapping["source_account"]
+        if mapping["id"] is not None:
+            rows.append({c.name: mapping[c.name] for c in monthly_aggregates.c})
+
+    return {
+        "user_id": result[0]._mapping["resolved_user_id"],
+        "table_names": table_names,
+        "accounts": accounts,
+        "rows": rows,
+    }
+
+
+def get_daily_balances(username: str, start_date=None, end_date=None):
+    """
+    Resolve a user and load the stored end-of-day balances of all their
+    statement tables, optionally limited to [start_date, end_date], in one query.
+
+    Returns:
+        None if the user does not exist, else a dict with user_id, table_names,
+        accounts, missing (tables with no stored series yet), rows ordered by date
+        and opening (table name -> (date, balance) of its last stored day before
+        start_date).
+    """
+    join_on = daily_balances.c.table_name == user_table_hashes.c.table_name
+    if start_date is not None:
+        join_on = join_on & (daily_balances.c.date >= start_date)
+    if end_date is not None:
+        join_on = join_on & (daily_balances.c.date <= end_date)
+
+    stored = daily_balances.alias("stored")
+    has_series = exists().where(stored.c.table_name == user_table_hashes.c.table_name)
+
+    sources = (
+        users
+        .outerjoin(user_table_hashes, user_table_hashes.c.user_id == users.c.id)
+        .outerjoin(user_table_metadata, user_table_metadata.c.table_hash_id == user_table_hashes.c.id)
+    )
+    opening_columns = []
+    if start_date is not None:
+        # Last stored day of each table before the range (one index lookup per table)
+        carried = daily_balances.alias("carried")
+        opening = (
+            select(carried.c.date.label("opening_date"), carried.c.balance.label("opening_balance"))
+            .where(carried.c.table_name == user_table_hashes.c.table_name, carried.c.date < start_date)
+            .order_by(carried.c.date.desc())
+            .limit(1)
+            .lateral("opening")
+        )
+        sources = sources.outerjoin(opening, true())
+        opening_columns = [opening.c.opening_date, opening.c.opening_balance]
+
+    stmt = (
+        select(
+            users.c.id.label("resolved_user_id"),
+            user_table_hashes.c.table_name.label("source_table"),
+            user_table_metadata.c.account_number.label("source_account"),
+            has_series.label("has_series"),
+            *opening_columns,
+            daily_balances.c.date,
+            daily_balances.c.balance,
+        )
+        .select_from(sources.outerjoin(daily_balances, join_on))
+        .where(users.c.username == username)
+        .order_by(daily_balances.c.date, user_table_hashes.c.id)
+    )
+
+    with engine.connect() as conn:
+        result = conn.execute(stmt).fetchall()
+    if not result:
+        return None
+
+    table_names = []
+    accounts = {}
+    missing = []
+    opening = {}
+    rows = []
+    for row in result:
+        mapping = row._mapping
+        table = mapping["source_table"]
+        if table and table not in accounts:
+            table_names.append(table)
+            accounts[table] = mapping["source_account"]
+            if not mapping["has_series"]:
+                missing.append(table)
+            if opening_columns and mapping["opening_date"] is not None:
+                opening[table] = (mapping["opening_date"], mapping["opening_balance"])
+        if mapping["date"] is not None:
+            rows.append({"table_name": table, "date": mapping["date"], "balance": mapping["balance"]})
+
+    return {
+        "user_id": result[0]._mapping["resolved_user_id"],
+        "table_names": table_names,
+        "accounts": accounts,
+        "missing": missing,
+        "rows": rows,
+        "opening": opening,
+    }
+
+
+def get_recurring_schedules(username: str):
+    """
+    Resolve a user and load the recurring-flow schedules detected in all their
+    statement tables in one query.
+
+    Returns:
+        None if the user does not exist, else a dict with user_id, table_names,
+        accounts, missing (tables not scanned yet) and rows.
+    """
+    return get_users_recurring_schedules([username]).get(username)
+
+
+def get_users_recurring_schedules(usernames: list):
+    """
+    Load the recurring-flow schedules of several users in one query.
+
+    Returns:
+        Dict of username -> the dict described in get_recurring_schedules, for
+        the users that exist.
+    """
+    scanned = exists().where(recurring_scans.c.table_name == user_table_hashes.c.table_name)
+    stmt = (
+        select(
+            users.c.id.label("resolved_user_id"),
+            users.c.username.label("resolved_username"),
+            user_table_hashes.c.table_name.label("source_table"),
+            user_table_metadata.c.account_number.label("source_account"),
+            scanned.label("scanned"),
+            *recurring_schedules.c,
+        )
+        .select_from(users)
+        .outerjoin(user_table_hashes, user_table_hashes.c.user_id == users.c.id)
+        .outerjoin(user_table_metadata, user_table_metadata.c.table_hash_id == user_table_hashes.c.id)
+        .outerjoin(recurring_schedules, recurring_schedules.c.table_name == user_table_hashes.c.table_name)
+        .where(users.c.username.in_(usernames))
+        .order_by(users.c.id, user_table_hashes.c.id, recurring_schedules.c.direction, recurring_schedules.c.amount_min)
+    )
+
+    with engine.connect() as conn:
+        result = conn.execute(stmt).fetchall()
+
+    found = {}
+    for row in result:
+        mapping = row._mapping
+        data = found.get(mapping["resolved_username"])
+        if data is None:
+            data = found[mapping["resolved_username"]] = {
+                "user_id": mapping["resolved_user_id"],
+                "table_names": [],
+                "accounts": {},
+                "missing": [],
+                "rows": [],
+            }
+        table = mapping["source_table"]
+        if table and table not in data["accounts"]:
+            data["table_names"].append(table)
+            data["accounts"][table] = mapping["source_account"]
+            if not mapping["scanned"]:
+                data["missing"].append(table)
+        if mapping["id"] is not None:
+            data["rows"].append({c.name: mapping[c.name] for c in recurring_schedules.c})
+
+    return found
+
+
 def get_opening_balance(user_id: int) -> float:
     stmt = select(user_table_metadata.c.opening_balance).where(user_table_metadata.c.user_id == user_id).limit(1)
     with engine.connect() as conn:
@@ -54,10 +565,10 @@ def get_opening_balance(user_id: int) -> float:
         return float(result[0]) if result else None
     
 
-def create_transaction_table(table_name: str):
-    metadata = MetaData()
-    table = Table(
-        table_name, metadata,
+def transaction_table(table_name: str, metadata: MetaData = None) -> Table:
+    """Build the Table definition shared by every per-user transaction table."""
+    return Table(
+        table_name, metadata if metadata is not None else MetaData(),
         Column("id", Integer, primary_key=True, autoincrement=True),
         Column("user_id", Integer),
         Column("date", Date),
@@ -71,7 +582,121 @@ def create_transaction_table(table_name: str):
         Column("optional_2", String, nullable=True),
         Column("optional_3", String, nullable=True),
         Column("created_at", DateTime),
+        Column("row_key", Text, unique=True),
+        Column("category_flags", Integer),
+        Index(f"{table_name}_date_id_idx", "date", "id"),
     )
+
+def create_transaction_table(table_name: str):
+    metadata = MetaData()
+    transaction_table(table_name, metadata)
     metadata.create_all(engine)  # Actually creates the table in DB
 
 
+def add_row_key_column(table_name: str):
+    """Add the natural-key column to a transaction table created before it existed."""
+    with engine.begin() as conn:
+        conn.execute(text(f'ALTER TABLE "{table_name}" ADD COLUMN IF NOT EXISTS row_key TEXT'))
+
+
+def add_category_flags_column(table_name: str):
+    """Add the category flags column to a transaction table created before it existed."""
+    with engine.begin() as conn:
+        conn.execute(text(f'ALTER TABLE "{table_name}" ADD COLUMN IF NOT EXISTS category_flags INTEGER'))
+
+
+def create_row_key_index(table_name: str):
+    """Enforce uniqueness of row_key so inserts can use ON CONFLICT DO NOTHING."""
+    with engine.begin() as conn:
+        conn.execute(text(
+            f'CREATE UNIQUE INDEX IF NOT EXISTS "{table_name}_row_key_idx" ON "{table_name}" (row_key)'
+        ))
+
+
+def create_date_index(table_name: str):
+    """Index a transaction table created before it existed on (date, id), the keyset order of its rows."""
+    with engine.begin() as conn:
+        conn.execute(text(
+            f'CREATE INDEX IF NOT EXISTS "{table_name}_date_id_idx" ON "{table_name}" (date, id)'
+        ))
+
+
+def add_hash_version_column():
+    """Add the fingerprint format column to a user_table_hashes table created before it existed."""
+    with engine.begin() as conn:
+        conn.execute(text('ALTER TABLE user_table_hashes ADD COLUMN IF NOT EXISTS hash_version INTEGER'))
+
+
+def create_statement_hash_index():
+    """Index user_table_hashes on user_id when the table was created before the index existed."""
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE INDEX IF NOT EXISTS "ix_user_table_hashes_user_id" ON user_table_hashes (user_id)'
+        ))
+
+
+def get_account_watermark(user_id: int, account_number: str):
+    """
+    Return the ingestion watermark of an account as a dict with table_name,
+    last_date and last_balance, or None if the account has never been ingested.
+
+    Accounts ingested before watermarks existed are resolved through their
+    statement metadata and the last row of their transaction table.
+    """
+    with engine.connect() as conn:
+        stmt = select(
+            account_watermarks.c.table_name,
+            account_watermarks.c.last_date,
+            account_watermarks.c.last_balance,
+        ).where(
+            account_watermarks.c.user_id == user_id,
+            account_watermarks.c.account_number == account_number,
+        )
+        row = conn.execute(stmt).fetchone()
+        if row:
+            return dict(row._mapping)
+
+        stmt = (
+            select(user_table_hashes.c.table_name)
+            .join(user_table_metadata, user_table_metadata.c.table_hash_id == user_table_hashes.c.id)
+            .where(
+                user_table_hashes.c.user_id == user_id,
+                user_table_metadata.c.account_number == account_number,
+            )
+            .order_by(user_table_hashes.c.id.desc())
+            .limit(1)
+        )
+        row = conn.execute(stmt).fetchone()
+        if not row:
+            return None
+
+        table_name = row[0]
+        last = conn.execute(text(
+            f'SELECT date, balance_amount FROM "{table_name}" '
+            f'WHERE date IS NOT NULL ORDER BY date DESC, id DESC LIMIT 1'
+        )).fetchone()
+        return {
+            "table_name": table_name,
+            "last_date": last[0] if last else None,
+            "last_balance": last[1] if last else None,
+        }
+
+
+# --- Portfolio analytics: answered by DuckDB from the Parquet snapshot, never from Postgres ---
+
+def get_portfolio_monthly_flows(start_month: str = None, end_month: str = None):
+    """Inflow and outflow of every user and month ('YYYY-MM' bounds), from the latest analytics snapshot."""
+    from .analytics_store import run_query
+    return run_query("monthly_flows", start_month, end_month)
+
+
+def get_portfolio_category_totals(start_month: str = None, end_month: str = None):
+    """Portfolio-wide count and amounts of each transaction category per month, from the latest analytics snapshot."""
+    from .analytics_store import run_query
+    return run_query("category_totals", start_month, end_month)
+
+
+def get_portfolio_emi_ratios(start_month: str = None, end_month: str = None):
+    """EMI and salary totals and their ratio (FOIR) of every user and month, from the latest analytics snapshot."""
+    from .analytics_store import run_query
+    return run_query("emi_ratios", start_month, end_month)
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from .db import engine, daily_balances
+from . import crud
+from .balance_kernel import day_numbers, last_per_day, fill_daily
+from .consolidation import consolidated_eod
+
+def compute_eod_balances(df: pd.DataFrame, carry_date=None, carry_balance: float = None) -> pd.Series:
+    """
+    Build the end-of-day balance series of one account.
+
+    The last balance of each day (in statement order) is taken and carried
+    forward over days without transactions.
+
+    Args:
+        df: Transaction rows with date and balance_amount, in statement order.
+        carry_date: Day from which to start the series with ``carry_balance``
+            when only the tail of the history is being rebuilt.
+        carry_balance: Balance in effect on ``carry_date``.
+
+    Returns:
+        Series of balances indexed by every calendar day from the first to the last transaction.
+    """
+    dates = df['date']
+    if dates.dtype.kind != 'M':
+        dates = pd.to_datetime(dates, errors='coerce')
+    dates = dates.to_numpy(dtype='datetime64[D]')
+    balances = df['balance_amount'].to_numpy(dtype=float)
+    known = ~np.isnat(dates) & ~np.isnan(balances)
+    days = day_numbers(dates[known])
+    order = np.argsort(days, kind='stable')
+    days, balances = last_per_day(days[order], balances[known][order])
+
+    if carry_date is not None and carry_balance is not None:
+        carry_day = day_numbers([pd.Timestamp(carry_date).to_datetime64()])[0]
+        if len(days) == 0 or days[0] > carry_day:
+            days = np.insert(days, 0, carry_day)
+            balances = np.insert(balances, 0, carry_balance)
+
+    if len(days) == 0:
+        return pd.Series(dtype=float, index=pd.DatetimeIndex([], name='date'), name='balance')
+
+    daily = fill_daily(days, balances)
+    index = pd.date_range(pd.Timestamp(days[0], unit='D'), periods=len(daily), freq='D', name='date')
+    return pd.Series(daily, index=index, name='balance')
+
+def refresh_daily_balances(user_id: int, table_name: str, account_number: str = None, since=None):
+    """
+    Compute and upsert the stored end-of-day series of a statement table.
+
+    With ``since`` the series is extended from the last stored day before it
+    instead of being rebuilt from the first transaction.
+    """
+    query = f'SELECT date, balance_amount FROM "{table_name}"'
+    params = {}
+    carry_date = carry_balance = None
+
+    with engine.connect() as conn:
+        if since is not None:
+            params['since'] = pd.Timestamp(since).date()
+            last = conn.execute(
+                daily_balances.select()
+                .with_only_columns(daily_balances.c.date, daily_balances.c.balance)
+                .where(daily_balances.c.table_name == table_name, daily_balances.c.date < params['since'])
+                .order_by(daily_balances.c.date.desc())
+                .limit(1)
+            ).fetchone()
+            if last:
+                carry_date, carry_balance = last
+            query += ' WHERE date >= :since'
+        df = pd.read_sql(text(query + ' ORDER BY date, id'), conn, params=params)
+
+    series = compute_eod_balances(df, carry_date, carry_balance)
+    if series.empty:
+        return
+
+    records = [
+        {
+            "user_id": user_id,
+            "account_number": account_number,
+            "table_name": table_name,
+            "date": day.date(),
+            "balance": float(balance),
+        }
+        for day, balance in series.items()
+    ]
+
+    stmt = pg_insert(daily_balances)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['table_name', 'date'],
+        set_={'balance': stmt.excluded.balance, 'account_number': stmt.excluded.account_number}
+    )
+    with engine.begin() as conn:
+        conn.execute(stmt, records)
+
+def load_daily_balances(username: str, start_date=None, end_date=None):
+    """
+    Load a user's stored end-of-day balances, building the series first for
+    statement tables ingested before it was stored.
+
+    Returns:
+        None if the user does not exist, else the dict from crud.get_daily_balances.
+    """
+    data = crud.get_daily_balances(username, start_date, end_date)
+    if data and data['missing']:
+        for table in data['missing']:
+            refresh_daily_balances(data['user_id'], table, data['accounts'].get(table))
+        data = crud.get_daily_balances(username, start_date, end_date)
+    return data
+
+def combine_daily_balances(rows: list, accounts: dict = None, opening: dict = None) -> pd.Series:
+    """
+    Consolidated end-of-day series of a user's statement tables.
+
+    The stored series of each table (rows in date order, as crud.get_daily_balances
+    returns them) are heap-merged by day while the latest balance of every
+    account is kept: different accounts add up and each carries its balance
+    forward, while tables of the same account share one balance instead of
+    being counted twice.
+
+    Args:
+        rows: Per-table daily rows with table_name, date and balance.
+        accounts: Table name -> account number (tables without one are separate accounts).
+        opening: Table name -> (date, balance) of its last stored day before the
+            rows, when they only cover a date range, so that accounts without
+            rows in the range still count with their carried balance.
+    """
+    if not rows:
+        return pd.Series(dtype=float, index=pd.DatetimeIndex([], name='date'), name='balance')
+
+    streams = {}
+    for row in rows:
+        streams.setdefault(row['table_name'], []).append((row['date'], row['balance']))
+    opening = opening or {}
+    if len(streams) == 1 and opening.keys() <= streams.keys():
+        df = pd.DataFrame(rows)
+        df['date'] = pd.to_datetime(df['date'])
+        return df.set_index('date')['balance'].rename_axis('date')
+
+    accounts = accounts or {}
+    days, totals = consolidated_eod(
+        [(accounts.get(table) or table, series) for table, series in streams.items()],
+        [(accounts.get(table) or table, balance) for table, (_, balance) in sorted(opening.items(), key=lambda item: item[1][0])],
+    )
+
+    # Days no table covers keep the last combined balance
+    series = pd.Series(np.array(totals, dtype=float), index=pd.DatetimeIndex(pd.to_datetime(days), name='date'), name='balance')
+    return series.reindex(pd.date_range(series.index[0], series.index[-1], freq='D', name='date')).ffill()
@@ -1,7 +1,7 @@
 # db.py
 from sqlalchemy import (
     create_engine, Table, Column, Integer, String, Date, Float,
-    MetaData, ForeignKey, TIMESTAMP, Text, DateTime
+    MetaData, ForeignKey, TIMESTAMP, Text, DateTime, UniqueConstraint
 )
 from datetime import datetime
 import os
@@ -19,7 +19,8 @@ DBNAME = os.getenv("dbname")
 
 # Prefer assembled connection string if all parts are set
 # if USER and PASSWORD and HOST and PORT and DBNAME:
-DATABASE_URL = f"postgresql+psycopg2://{USER}:{PASSWORD}@{HOST}:{PORT}/{DBNAME}?sslmode=require"
+# (DATABASE_URL overrides it, e.g. to run the tests against a scratch database)
+DATABASE_URL = os.getenv("DATABASE_URL") or f"postgresql+psycopg2://{USER}:{PASSWORD}@{HOST}:{PORT}/{DBNAME}?sslmode=require"
 # else:
 #     # Fallback to full DATABASE_URL (used in Render/Supabase)
 #     DATABASE_URL = os.getenv("SUPABASE_DATABASE_URL")
@@ -63,9 +64,10 @@ transactions = Table('transactions', metadata,
 
 user_table_hashes = Table('user_table_hashes', metadata,
     Column('id', Integer, primary_key=True),
-    Column('user_id', Integer, ForeignKey('users.id')),
+    Column('user_id', Integer, ForeignKey('users.id'), index=True),
     Column('table_name', Text, nullable=False),
     Column('hash', Text, nullable=False),
+    Column('hash_version', Integer),
     Column('created_at', DateTime, default=datetime.now)
 )
 
@@ -86,6 +88,74 @@ user_table_metadata = Table('user_table_metadata', metadata,
     Column('created_at', DateTime, default=datetime.now)
 )
 
+# Ingestion watermark per account: the last stored transaction date and balance
+account_watermarks = Table('account_watermarks', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id')),
+    Column('account_number', Text, nullable=False),
+    Column('table_name', Text, nullable=False),
+    Column('last_date', Date),
+    Column('last_balance', Float),
+    Column('updated_at', DateTime, default=datetime.now),
+    UniqueConstraint('user_id', 'account_number')
+)
+
+# Per-month rollup of each statement table, maintained at ingest time
+monthly_aggregates = Table('monthly_aggregates', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id')),
+    Column('account_number', Text),
+    Column('table_name', Text, nullable=False),
+    Column('month', String, nullable=False),
+    Column('inflow', Float),
+    Column('outflow', Float),
+    Column('inflow_txn_count', Integer),
+    Column('outflow_txn_count', Integer),
+    Column('txn_count', Integer),
+    Column('avg_eod_balance', Float),
+    Column('min_eod_balance', Float),
+    Column('max_eod_balance', Float),
+    Column('updated_at', DateTime, default=datetime.now),
+    UniqueConstraint('table_name', 'month')
+)
+
+# Forward-filled end-of-day balance of each statement table, one row per calendar day
+daily_balances = Table('daily_balances', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id')),
+    Column('account_number', Text),
+    Column('table_name', Text, nullable=False),
+    Column('date', Date, nullable=False),
+    Column('balance', Float),
+    UniqueConstraint('table_name', 'date')
+)
+
+# Recurring monthly flows (EMIs on the debit side, salary on the credit side) of each statement table
+recurring_schedules = Table('recurring_schedules', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id')),
+    Column('account_number', Text),
+    Column('table_name', Text, nullable=False),
+    Column('direction', String, nullable=False),
+    Column('amount', Float),
+    Column('amount_min', Float),
+    Column('amount_max', Float),
+    Column('period_days', Float),
+    Column('occurrences', Integer),
+    Column('first_date', Date),
+    Column('last_date', Date),
+    Column('updated_at', DateTime, default=datetime.now)
+)
+
+# Last transaction date each statement table has been scanned for recurring flows
+recurring_scans = Table('recurring_scans', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id')),
+    Column('table_name', Text, nullable=False, unique=True),
+    Column('scanned_through', Date),
+    Column('updated_at', DateTime, default=datetime.now)
+)
+
 # === Table creation function ===
 def create_tables():
     metadata.create_all(engine)
@@ -0,0 +1,188 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from . import crud
+from .shared_cache import shared_cache, version_token
+from bank_statement_parser.utils.categorizer import categorize, bank_category_matcher
+
+# Cache limits (override through the environment)
+FRAME_CACHE_MAX_ENTRIES = int(os.getenv("FRAME_CACHE_MAX_ENTRIES", "128"))
+FRAME_CACHE_MAX_MB = float(os.getenv("FRAME_CACHE_MAX_MB", "512"))
+FRAME_CACHE_TTL_SECONDS = float(os.getenv("FRAME_CACHE_TTL_SECONDS", "600"))
+
+NUMERIC_COLUMNS = ["debit_amount", "credit_amount", "balance_amount"]
+
+# Part of the shared cache key so frames pickled before a column change are not reused
+FRAME_SCHEMA = hashlib.sha256(",".join(crud.TRANSACTION_COLUMNS).encode()).hexdigest()[:8]
+
+
+class FrameCache:
+    """
+    Bounded LRU cache of per-user transaction frames.
+
+    Entries are keyed by (user_id, data version) and expire after ``ttl_seconds``.
+    The least recently used entries are evicted once either the entry count or
+    the total frame memory goes over its limit.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, size, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                self._drop(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, size: int):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        """Drop every cached version of a user's frame."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+frame_cache = FrameCache(
+    max_entries=FRAME_CACHE_MAX_ENTRIES,
+    max_bytes=int(FRAME_CACHE_MAX_MB * 1024 * 1024),
+    ttl_seconds=FRAME_CACHE_TTL_SECONDS,
+)
+
+
+def data_version(user_data: dict) -> tuple:
+    """Version of a user's stored data: the hashes of their statement tables."""
+    return tuple(sorted(user_data["hashes"].items()))
+
+
+def build_transaction_frame(rows: list, bank_name: str = None) -> pd.DataFrame:
+    """Typed transaction DataFrame: parsed dates, float amounts and integer category flags."""
+    df = pd.DataFrame(rows, columns=crud.TRANSACTION_COLUMNS)
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    for column in NUMERIC_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+
+    # Rows stored without category flags (not yet backfilled) are categorized here
+    uncategorized = df['category_flags'].isna()
+    if uncategorized.any():
+        df.loc[uncategorized, 'category_flags'] = categorize(
+            df.loc[uncategorized, 'particulars'], bank_category_matcher(bank_name)
+        )
+    df['category_flags'] = df['category_flags'].astype('int64')
+    return df
+
+
+def build_users_frame(rows: list, usernames: list, bank_names: dict) -> pd.DataFrame:
+    """
+    Typed transaction DataFrame of several users, with a ``username`` column,
+    in statement order (date, then id).
+
+    Args:
+        rows: Tuples from crud.get_users_statement_rows.
+        usernames: The usernames the tuples' user indexes refer to.
+        bank_names: username -> bank name, for categorizing rows stored without flags.
+    """
+    df = pd.DataFrame(rows, columns=["user_index", *crud.ANALYSIS_COLUMNS])
+    df.insert(0, 'username', np.asarray(usernames, dtype=object)[df.pop('user_index').to_numpy(dtype=np.int64)])
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    for column in NUMERIC_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    df = df.sort_values(['date', 'id'], kind='stable', ignore_index=True)
+
+    uncategorized = df['category_flags'].isna()
+    if uncategorized.any():
+        banks = df.loc[uncategorized, 'username'].map(bank_names)
+        for bank, index in banks.groupby(banks, dropna=False).groups.items():
+            df.loc[index, 'category_flags'] = categorize(
+                df.loc[index, 'particulars'], bank_category_matcher(None if pd.isna(bank) else bank)
+            )
+    df['category_flags'] = df['category_flags'].astype('int64')
+    return df
+
+
+def load_user_frame(username: str, user_data: dict = None):
+    """
+    Resolve a user and return their statements plus a typed transaction frame.
+
+    The statement lookup always hits the database (one small query) so the
+    cache key tracks the current data version. On a local miss the frame is
+    taken from the cross-worker shared cache, and the transaction rows are only
+    loaded when neither cache has it.
+
+    Returns:
+        None if the user does not exist, else the dict from crud.get_user_statements
+        with an added ``frame`` (a private copy the caller may modify).
+    """
+    if user_data is None:
+        user_data = crud.get_user_statements(username)
+    if not user_data:
+        return None
+
+    key = (user_data["user_id"], data_version(user_data))
+    df = frame_cache.get(key)
+    if df is None:
+        df = shared_cache.get_or_compute(
+            f"frame:{FRAME_SCHEMA}:{user_data['user_id']}:{version_token(user_data)}",
+            lambda: build_transaction_frame(
+                crud.get_statement_rows(user_data["table_names"]),
+                user_data["metadata"][0]["bank_name"] if user_data["metadata"] else None
+            )
+        )
+        frame_cache.put(key, df, int(df.memory_usage(deep=True).sum()))
+
+    user_data["frame"] = df.copy()
+    return user_data
@@ -0,0 +1,204 @@
+import os
+import pandas as pd
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from .db import engine, monthly_aggregates
+from . import crud
+from .daily_balances import compute_eod_balances
+from .balance_kernel import day_numbers, month_stats
+
+AGGREGATE_COLUMNS = [
+    "inflow", "outflow", "inflow_txn_count", "outflow_txn_count", "txn_count",
+    "avg_eod_balance", "min_eod_balance", "max_eod_balance",
+]
+
+# Aggregate in the database when it supports the SQL below (set to "0" to always aggregate in pandas)
+AGGREGATE_PUSHDOWN = os.getenv("AGGREGATE_PUSHDOWN", "1") != "0"
+PUSHDOWN_DIALECTS = {"postgresql"}
+
+def supports_pushdown() -> bool:
+    return AGGREGATE_PUSHDOWN and engine.dialect.name in PUSHDOWN_DIALECTS
+
+def combine_monthly_aggregates(flows: pd.DataFrame, daily: pd.Series, start: pd.Timestamp = None) -> pd.DataFrame:
+    """
+    Join monthly flow totals (indexed by month period) with the monthly stats of
+    the end-of-day balance series into the stored aggregate rows.
+    """
+    if not daily.empty:
+        months, mean, minimum, maximum = month_stats(day_numbers(daily.index[:1].to_numpy())[0], daily.to_numpy())
+        eod_stats = pd.DataFrame(
+            {'avg_eod_balance': mean, 'min_eod_balance': minimum, 'max_eod_balance': maximum},
+            index=pd.PeriodIndex(months.astype(str), freq='M')
+        )
+    else:
+        eod_stats = pd.DataFrame(columns=['avg_eod_balance', 'min_eod_balance', 'max_eod_balance'])
+
+    result = flows.join(eod_stats, how='outer')
+    if start is not None:
+        result = result[result.index >= start.to_period('M')]
+
+    count_columns = ['inflow_txn_count', 'outflow_txn_count', 'txn_count']
+    result[['inflow', 'outflow']] = result[['inflow', 'outflow']].fillna(0.0)
+    result[count_columns] = result[count_columns].fillna(0).astype(int)
+
+    result.index = result.index.astype(str)
+    return result.rename_axis('month').reset_index()[['month'] + AGGREGATE_COLUMNS]
+
+def compute_monthly_aggregates(df: pd.DataFrame, carry_balance: float = None, start: pd.Timestamp = None) -> pd.DataFrame:
+    """
+    Roll transaction rows of one account up into one row per month.
+
+    Args:
+        df: Transaction rows (date, debit_amount, credit_amount, balance_amount) in statement order.
+        carry_balance: Last balance before ``start`` when only part of the history is recomputed.
+        start: First day of the first month being recomputed.
+
+    Returns:
+        DataFrame with a 'YYYY-MM' month column and the AGGREGATE_COLUMNS.
+    """
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    df = df.dropna(subset=['date']).sort_values('date', kind='stable')
+    if df.empty:
+        return pd.DataFrame(columns=['month'] + AGGREGATE_COLUMNS)
+
+    df['month'] = df['date'].dt.to_period('M')
+    df['is_inflow'] = df['credit_amount'].gt(0)
+    df['is_outflow'] = df['debit_amount'].gt(0)
+    flows = df.groupby('month').agg(
+        inflow=('credit_amount', 'sum'),
+        outflow=('debit_amount', 'sum'),
+        inflow_txn_count=('is_inflow', 'sum'),
+        outflow_txn_count=('is_outflow', 'sum'),
+        txn_count=('date', 'size'),
+    )
+
+    # End-of-day balance: last balance of each day, carried forward over days without transactions
+    daily = compute_eod_balances(df, start, carry_balance)
+    return combine_monthly_aggregates(flows, daily, start)
+
+def query_monthly_aggregates(conn, table_name: str, carry_balance: float = None, start: pd.Timestamp = None) -> pd.DataFrame:
+    """
+    Same result as compute_monthly_aggregates, with the reductions done by the
+    database: flow totals come from a GROUP BY date_trunc('month', date) and the
+    end-of-day series from the last balance of each day (DISTINCT ON), so only a
+    row per month and a row per day are transferred instead of every transaction.
+    """
+    where = 'WHERE date IS NOT NULL'
+    params = {}
+    if start is not None:
+        where += ' AND date >= :start'
+        params['start'] = start.date()
+
+    flows = pd.read_sql(text(
+        f"SELECT to_char(date_trunc('month', date), 'YYYY-MM') AS month, "
+        f"COALESCE(SUM(credit_amount), 0) AS inflow, "
+        f"COALESCE(SUM(debit_amount), 0) AS outflow, "
+        f"COUNT(*) FILTER (WHERE credit_amount > 0) AS inflow_txn_count, "
+        f"COUNT(*) FILTER (WHERE debit_amount > 0) AS outflow_txn_count, "
+        f"COUNT(*) AS txn_count "
+        f'FROM "{table_name}" {where} GROUP BY 1 ORDER BY 1'
+    ), conn, params=params)
+    if flows.empty:
+        return pd.DataFrame(columns=['month'] + AGGREGATE_COLUMNS)
+
+    last_balances = pd.read_sql(text(
+        f'SELECT DISTINCT ON (date) date, balance_amount FROM "{table_name}" '
+        f'{where} AND balance_amount IS NOT NULL ORDER BY date, id DESC'
+    ), conn, params=params)
+
+    flows.index = pd.PeriodIndex(flows.pop('month'), freq='M')
+    daily = compute_eod_balances(last_balances, start, carry_balance)
+    return combine_monthly_aggregates(flows, daily, start)
+
+def refresh_monthly_aggregates(user_id: int, table_name: str, account_number: str = None, since=None):
+    """
+    Recompute and upsert the monthly aggregates of a statement table.
+
+    When ``since`` is given only the months from its month onwards are rebuilt,
+    starting from the balance carried over from the previous month.
+    """
+    start = pd.Timestamp(since).to_period('M').start_time if since is not None else None
+    query = f'SELECT date, debit_amount, credit_amount, balance_amount FROM "{table_name}"'
+    params = {}
+    carry_balance = None
+
+    with engine.connect() as conn:
+        if start is not None:
+            query += ' WHERE date >= :start'
+            params['start'] = start.date()
+            carry_balance = conn.execute(text(
+                f'SELECT balance_amount FROM "{table_name}" '
+                f'WHERE date < :start AND balance_amount IS NOT NULL '
+                f'ORDER BY date DESC, id DESC LIMIT 1'
+            ), params).scalar()
+
+    aggregates = None
+    if supports_pushdown():
+        try:
+            with engine.connect() as conn:
+                aggregates = query_monthly_aggregates(conn, table_name, carry_balance, start)
+        except DBAPIError as e:
+            print(f"⚠️ SQL aggregation failed for '{table_name}', falling back to pandas: {e}")
+
+    if aggregates is None:
+        with engine.connect() as conn:
+            df = pd.read_sql(text(query + ' ORDER BY date, id'), conn, params=params)
+        aggregates = compute_monthly_aggregates(df, carry_balance, start)
+
+    if aggregates.empty:
+        return
+
+    records = [
+        {
+            **{k: (None if pd.isna(v) else v) for k, v in row.items()},
+            "user_id": user_id,
+            "account_number": account_number,
+            "table_name": table_name,
+            "updated_at": datetime.now(),
+        }
+        for row in aggregates.astype(object).to_dict(orient='records')
+    ]
+
+    stmt = pg_insert(monthly_aggregates).values(records)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['table_name', 'month'],
+        set_={c: stmt.excluded[c] for c in AGGREGATE_COLUMNS + ['account_number', 'updated_at']}
+    )
+    with engine.begin() as conn:
+        conn.execute(stmt)
+
+def load_monthly_aggregates(username: str, latest_only: bool = False):
+    """
+    Load a user's monthly aggregates, building them first for statement tables
+    ingested before the aggregate table existed.
+
+    Returns:
+        None if the user does not exist, else the dict from crud.get_monthly_aggregates
+        (restricted to the most recent statement table when latest_only is set).
+    """
+    data = crud.get_monthly_aggregates(username)
+    if not data:
+        return None
+
+    covered = {row['table_name'] for row in data['rows']}
+    missing = [table for table in data['table_names'] if table not in covered]
+    if missing:
+        for table in missing:
+            refresh_monthly_aggregates(data['user_id'], table, data['accounts'].get(table))
+        data = crud.get_monthly_aggregates(username)
+
+    return latest_table_only(data) if latest_only else data
+
+def latest_table_only(data: dict) -> dict:
+    """Copy of loaded monthly aggregates restricted to the most recent statement table"""
+    if not data['table_names']:
+        return data
+    latest_table = sorted(data['table_names'])[-1]
+    return {
+        **data,
+        'table_names': [latest_table],
+        'rows': [row for row in data['rows'] if row['table_name'] == latest_table],
+    }
@@ -0,0 +1,41 @@
+import os
+import pandas as pd
+from . import crud
+from .frame_cache import build_users_frame
+
+# Most users one bulk request may load (override through the environment)
+BULK_MAX_USERS = int(os.getenv("BULK_MAX_USERS", "2000"))
+
+
+def load_users_frame(usernames: list) -> dict:
+    """
+    Resolve several users and load all their transaction rows into one frame,
+    with one statements query and one rows query whatever the number of users.
+
+    Returns:
+        Dict with ``users`` (username -> the dict from crud.get_user_statements,
+        for the users that exist), ``not_found`` (the other usernames) and
+        ``frame`` (typed rows of all users with a ``username`` column).
+    """
+    usernames = list(dict.fromkeys(usernames))
+    found = crud.get_users_statements(usernames)
+
+    rows = crud.get_users_statement_rows({username: found[username]["table_names"] for username in found})
+    bank_names = {
+        username: user_data["metadata"][0]["bank_name"] if user_data["metadata"] else None
+        for username, user_data in found.items()
+    }
+
+    return {
+        "users": {username: found[username] for username in usernames if username in found},
+        "not_found": [username for username in usernames if username not in found],
+        "frame": build_users_frame(rows, list(found), bank_names),
+    }
+
+
+def split_users_frame(data: dict) -> dict:
+    """username -> that user's rows of a load_users_frame result (empty for users without rows)"""
+    df = data["frame"]
+    frames = {username: rows.drop(columns="username") for username, rows in df.groupby("username", sort=False)}
+    empty = df.iloc[:0].drop(columns="username")
+    return {username: frames.get(username, empty) for username in data["users"]}
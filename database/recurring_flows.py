@@ -0,0 +1,367 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from .db import engine, recurring_schedules, recurring_scans
+from . import crud
+
+# Detection parameters of monthly recurring flows
+AMOUNT_TOLERANCE = 0.02        # a cluster spans from its smallest amount up to 2% above it
+MIN_OCCURRENCES = 3
+MIN_PERIOD_DAYS = 25           # median gap between consecutive occurrences
+MAX_PERIOD_DAYS = 35
+MIN_MONTH_COVERAGE = 0.75      # share of the months between first and last occurrence that have one
+MAX_PER_MONTH = 1.25           # average occurrences per month with an occurrence
+DETECTION_WINDOW_DAYS = 400    # history re-scanned for new schedules when a statement is appended
+
+DIRECTIONS = {"debit": "debit_amount", "credit": "credit_amount"}
+
+SCHEDULE_COLUMNS = [
+    "direction", "amount", "amount_min", "amount_max", "period_days",
+    "occurrences", "first_date", "last_date",
+]
+
+def cluster_amounts(amounts: np.ndarray) -> np.ndarray:
+    """
+    Split sorted amounts into tolerance clusters.
+
+    Each cluster runs from its smallest amount up to AMOUNT_TOLERANCE above it;
+    its end is found with a binary search, so the cost is O(log n) per cluster.
+
+    Returns:
+        Cluster label of every amount.
+    """
+    labels = np.empty(len(amounts), dtype=np.int64)
+    start = cluster = 0
+    while start < len(amounts):
+        end = int(np.searchsorted(amounts, amounts[start] * (1 + AMOUNT_TOLERANCE), side='right'))
+        labels[start:end] = cluster
+        start, cluster = end, cluster + 1
+    return labels
+
+def detect_recurring_flows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Find monthly recurring debits and credits of one account.
+
+    Amounts of each direction are sorted and clustered with a tolerance window,
+    then every cluster is checked for periodicity on its date-sorted occurrences:
+    at least MIN_OCCURRENCES, a median gap of MIN_PERIOD_DAYS..MAX_PERIOD_DAYS,
+    and roughly one occurrence in most months of its span. Overall O(n log n).
+
+    Args:
+        df: Transaction rows with date, debit_amount and credit_amount.
+
+    Returns:
+        DataFrame with the SCHEDULE_COLUMNS, one row per detected schedule.
+    """
+    dates = pd.to_datetime(df['date'], errors='coerce')
+    found = []
+
+    for direction, column in DIRECTIONS.items():
+        flows = pd.DataFrame({'date': dates, 'amount': pd.to_numeric(df[column], errors='coerce')})
+        flows = flows[flows['date'].notna() & flows['amount'].gt(0)]
+        if len(flows) < MIN_OCCURRENCES:
+            continue
+
+        flows = flows.sort_values('amount', kind='stable')
+        flows['cluster'] = cluster_amounts(flows['amount'].to_numpy(dtype=float))
+        flows = flows[flows.groupby('cluster')['amount'].transform('size') >= MIN_OCCURRENCES]
+        if flows.empty:
+            continue
+
+        # Periodicity of each cluster from its occurrences in date order
+        flows = flows.sort_values(['cluster', 'date'], kind='stable')
+        flows['gap'] = flows.groupby('cluster')['date'].diff().dt.days
+        flows['month'] = flows['date'].dt.to_period('M')
+        stats = flows.groupby('cluster').agg(
+            amount=('amount', 'median'),
+            amount_min=('amount', 'min'),
+            amount_max=('amount', 'max'),
+            period_days=('gap', 'median'),
+            occurrences=('amount', 'size'),
+            months_active=('month', 'nunique'),
+            first_date=('date', 'min'),
+            last_date=('date', 'max'),
+        )
+        months_spanned = (
+            (stats['last_date'].dt.year - stats['first_date'].dt.year) * 12
+            + stats['last_date'].dt.month - stats['first_date'].dt.month + 1
+        )
+        periodic = (
+            stats['period_days'].between(MIN_PERIOD_DAYS, MAX_PERIOD_DAYS)
+            & (stats['months_active'] >= MIN_MONTH_COVERAGE * months_spanned)
+            & (stats['occurrences'] <= MAX_PER_MONTH * stats['months_active'])
+        )
+        found.append(stats[periodic].assign(direction=direction))
+
+    if not found:
+        return pd.DataFrame(columns=SCHEDULE_COLUMNS)
+
+    schedules = pd.concat(found, ignore_index=True)[SCHEDULE_COLUMNS]
+    schedules['first_date'] = schedules['first_date'].dt.date
+    schedules['last_date'] = schedules['last_date'].dt.date
+    return schedules
+
+def match_bands(band: np.ndarray, amounts: np.ndarray, dates: np.ndarray, bands: dict) -> np.ndarray:
+    """
+    Check rows against every schedule band whose amount range contains them.
+
+    ``bands`` holds arrays over the bands sorted by amount_min: amount_max,
+    first_date, last_date, group (the owner of each band) and reach (running
+    maximum of amount_max within the group). ``band`` is, per row, the last band
+    of the row's group starting at or below its amount (-1 for none).
+
+    Bands may overlap (schedules of several statement tables, or extended by
+    later statements), so a row that misses its candidate moves down to the
+    previous band for as long as the reach shows an earlier band of the group
+    can still contain the amount. The number of passes is the overlap depth.
+
+    Returns:
+        Boolean array, True where the amount and date fall inside some band.
+    """
+    matched = np.zeros(len(band), dtype=bool)
+    rows = np.flatnonzero(band >= 0)
+    group = bands['group'][band[rows]] if len(rows) else None
+    while len(rows):
+        candidate = band[rows]
+        amount, date = amounts[rows], dates[rows]
+        hit = (
+            (amount <= bands['amount_max'][candidate])
+            & (date >= bands['first_date'][candidate])
+            & (date <= bands['last_date'][candidate])
+        )
+        matched[rows[hit]] = True
+
+        previous = candidate - 1
+        valid = previous >= 0
+        previous = np.clip(previous, 0, None)
+        keep = (
+            ~hit & valid
+            & (bands['group'][previous] == group)
+            & (bands['reach'][previous] >= amount)
+        )
+        rows, group = rows[keep], group[keep]
+        band[rows] = previous[keep]
+    return matched
+
+def sorted_bands(bands: pd.DataFrame, group: np.ndarray) -> dict:
+    """Band arrays for match_bands from bands already sorted by (group, amount_min)"""
+    amount_max = bands['amount_max'].to_numpy(dtype=float)
+    return {
+        'amount_max': amount_max,
+        'first_date': pd.to_datetime(bands['first_date']).to_numpy(),
+        'last_date': pd.to_datetime(bands['last_date']).to_numpy(),
+        'group': group,
+        'reach': pd.Series(amount_max).groupby(group).cummax().to_numpy(),
+    }
+
+def match_schedules(df: pd.DataFrame, schedules: list, direction: str) -> pd.Series:
+    """
+    Mark the rows that belong to one of the schedules of a direction: amount
+    inside the schedule's [amount_min, amount_max] band and date inside its
+    [first_date, last_date] span.
+
+    Args:
+        df: Transaction rows with date and the direction's amount column.
+        schedules: Schedule dicts (rows of recurring_schedules or detect_recurring_flows).
+        direction: 'debit' or 'credit'.
+
+    Returns:
+        Boolean Series aligned with df.
+    """
+    bands = pd.DataFrame([s for s in schedules if s['direction'] == direction], columns=SCHEDULE_COLUMNS)
+    if bands.empty or df.empty:
+        return pd.Series(False, index=df.index)
+
+    bands = bands.sort_values('amount_min', kind='stable')
+    amount_min = bands['amount_min'].to_numpy(dtype=float)
+    amounts = pd.to_numeric(df[DIRECTIONS[direction]], errors='coerce').to_numpy(dtype=float)
+    dates = pd.to_datetime(df['date'], errors='coerce').to_numpy()
+
+    # Start from the last band starting at or below the amount, then check the overlapping ones below it
+    band = np.searchsorted(amount_min, amounts, side='right') - 1
+    matched = match_bands(band, amounts, dates, sorted_bands(bands, np.zeros(len(bands), dtype=np.int64)))
+    return pd.Series(matched, index=df.index)
+
+def match_users_schedules(df: pd.DataFrame, schedules: dict, direction: str) -> pd.Series:
+    """
+    match_schedules over the rows of several users (a ``username`` column),
+    each row checked against its own user's schedules only.
+
+    Amounts and band minimums are ranked on one shared scale, so every
+    (user, amount) pair becomes a single integer key and all rows are located
+    among all users' bands with one searchsorted.
+
+    Args:
+        df: Transaction rows with username, date and the direction's amount column.
+        schedules: username -> that user's schedule dicts.
+        direction: 'debit' or 'credit'.
+
+    Returns:
+        Boolean Series aligned with df.
+    """
+    bands = pd.DataFrame(
+        [{"username": username, **s} for username, rows in schedules.items() for s in rows if s['direction'] == direction],
+        columns=["username", *SCHEDULE_COLUMNS]
+    )
+    if bands.empty or df.empty:
+        return pd.Series(False, index=df.index)
+
+    owners = pd.Index(bands['username'].unique())
+    band_user = owners.get_indexer(bands['username'])
+    row_user = owners.get_indexer(df['username'])   # -1 for users without bands
+
+    amount_min = bands['amount_min'].to_numpy(dtype=float)
+    amounts = pd.to_numeric(df[DIRECTIONS[direction]], errors='coerce').to_numpy(dtype=float)
+    dates = pd.to_datetime(df['date'], errors='coerce').to_numpy()
+
+    scale = np.unique(np.concatenate([amount_min, amounts[~np.isnan(amounts)]]))
+    width = len(scale) + 1
+    band_key = band_user * width + np.searchsorted(scale, amount_min)
+    row_key = row_user * width + np.searchsorted(scale, amounts)
+
+    # Per user, bands in amount_min order as match_schedules sorts them
+    order = np.argsort(band_key, kind='stable')
+    band_key = band_key[order]
+    band_user = band_user[order]
+
+    band = np.searchsorted(band_key, row_key, side='right') - 1
+    # Rows whose user has no band at or below the amount land on another user's band
+    candidate = np.clip(band, 0, None)
+    band[(row_user < 0) | (band_user[candidate] != row_user)] = -1
+    matched = match_bands(band, amounts, dates, sorted_bands(bands.iloc[order], band_user))
+    return pd.Series(matched, index=df.index)
+
+def extend_schedules(schedules: pd.DataFrame, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Continue stored schedules with the rows of a newly ingested statement.
+
+    A new row extends a schedule when its amount keeps the schedule within the
+    tolerance window and it follows the previous occurrence by at most two periods.
+    """
+    schedules = schedules.copy()
+    dates = pd.to_datetime(df['date'], errors='coerce')
+
+    for i, schedule in schedules.iterrows():
+        amounts = pd.to_numeric(df[DIRECTIONS[schedule['direction']]], errors='coerce')
+        low = schedule['amount_max'] / (1 + AMOUNT_TOLERANCE)
+        high = schedule['amount_min'] * (1 + AMOUNT_TOLERANCE)
+        last = pd.Timestamp(schedule['last_date'])
+
+        candidates = pd.DataFrame({'date': dates, 'amount': amounts})
+        candidates = candidates[(candidates['date'] > last) & candidates['amount'].between(low, high)]
+        accepted = []
+        for date, amount in candidates.sort_values('date', kind='stable').itertuples(index=False):
+            if (date - last).days > 2 * MAX_PERIOD_DAYS:
+                break
+            accepted.append(amount)
+            last = date
+
+        if accepted:
+            schedules.at[i, 'occurrences'] = int(schedule['occurrences']) + len(accepted)
+            schedules.at[i, 'amount_min'] = min(schedule['amount_min'], min(accepted))
+            schedules.at[i, 'amount_max'] = max(schedule['amount_max'], max(accepted))
+            schedules.at[i, 'last_date'] = last.date()
+
+    return schedules
+
+def refresh_recurring_schedules(user_id: int, table_name: str, account_number: str = None, since=None):
+    """
+    Detect and store the recurring schedules of a statement table.
+
+    Without ``since`` the whole table is scanned. With it (an appended statement)
+    the stored schedules are extended with the rows from ``since`` on, and only
+    the last DETECTION_WINDOW_DAYS of rows not explained by them are scanned for
+    new schedules.
+    """
+    query = f'SELECT date, debit_amount, credit_amount FROM "{table_name}"'
+    params = {}
+    stored = pd.DataFrame(columns=SCHEDULE_COLUMNS)
+
+    with engine.connect() as conn:
+        if since is not None:
+            since = pd.Timestamp(since)
+            params['window_start'] = (since - timedelta(days=DETECTION_WINDOW_DAYS)).date()
+            query += ' WHERE date >= :window_start'
+            stored = pd.read_sql(
+                recurring_schedules.select()
+                .with_only_columns(*[recurring_schedules.c[c] for c in SCHEDULE_COLUMNS])
+                .where(recurring_schedules.c.table_name == table_name),
+                conn
+            )
+        df = pd.read_sql(text(query + ' ORDER BY date, id'), conn, params=params)
+
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    if since is not None:
+        stored = extend_schedules(stored, df[df['date'] >= since])
+        records = stored.to_dict(orient='records')
+        explained = match_schedules(df, records, 'debit') | match_schedules(df, records, 'credit')
+        fresh = detect_recurring_flows(df[~explained])
+        fresh = fresh[pd.to_datetime(fresh['last_date']) >= since]
+        parts = [frame for frame in (stored, fresh) if not frame.empty]
+        schedules = pd.concat(parts, ignore_index=True) if parts else stored
+    else:
+        schedules = detect_recurring_flows(df)
+
+    records = [
+        {
+            **{k: (None if pd.isna(v) else v) for k, v in row.items()},
+            "user_id": user_id,
+            "account_number": account_number,
+            "table_name": table_name,
+            "updated_at": datetime.now(),
+        }
+        for row in schedules.astype(object).to_dict(orient='records')
+    ]
+
+    scan = pg_insert(recurring_scans).values(
+        user_id=user_id,
+        table_name=table_name,
+        scanned_through=df['date'].max().date() if df['date'].notna().any() else None,
+        updated_at=datetime.now()
+    )
+    scan = scan.on_conflict_do_update(
+        index_elements=['table_name'],
+        set_={'scanned_through': scan.excluded.scanned_through, 'updated_at': scan.excluded.updated_at}
+    )
+
+    # Replace the table's schedule set and its scan marker together
+    with engine.begin() as conn:
+        conn.execute(recurring_schedules.delete().where(recurring_schedules.c.table_name == table_name))
+        if records:
+            conn.execute(recurring_schedules.insert(), records)
+        conn.execute(scan)
+
+def load_recurring_schedules(username: str):
+    """
+    Load a user's stored recurring schedules, scanning first the statement
+    tables ingested before schedules were stored.
+
+    Returns:
+        None if the user does not exist, else the dict from crud.get_recurring_schedules.
+    """
+    data = crud.get_recurring_schedules(username)
+    if data and data['missing']:
+        for table in data['missing']:
+            refresh_recurring_schedules(data['user_id'], table, data['accounts'].get(table))
+        data = crud.get_recurring_schedules(username)
+    return data
+
+def load_users_recurring_schedules(usernames: list) -> dict:
+    """
+    Load the stored recurring schedules of several users in one query,
+    scanning first any statement tables ingested before schedules were stored.
+
+    Returns:
+        Dict of username -> the dict from crud.get_recurring_schedules.
+    """
+    data = crud.get_users_recurring_schedules(usernames)
+    stale = [username for username, user in data.items() if user['missing']]
+    for username in stale:
+        user = data[username]
+        for table in user['missing']:
+            refresh_recurring_schedules(user['user_id'], table, user['accounts'].get(table))
+    if stale:
+        data.update(crud.get_users_recurring_schedules(stale))
+    return data
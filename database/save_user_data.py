@@ -1,21 +1,57 @@
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import select
 from sqlalchemy.exc import IntegrityError
-from .db import engine, users, user_table_hashes, user_table_metadata
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import text
+from .db import engine, users, user_table_hashes, user_table_metadata, account_watermarks
 import pandas as pd
+import numpy as np
 from datetime import datetime
 import hashlib
-from .crud import create_transaction_table
+from .crud import (
+    create_transaction_table, add_row_key_column, create_row_key_index, get_account_watermark,
+    add_category_flags_column, create_date_index, create_statement_hash_index, add_hash_version_column
+)
+from .monthly_aggregates import refresh_monthly_aggregates
+from .daily_balances import refresh_daily_balances
+from .recurring_flows import refresh_recurring_schedules
+from .frame_cache import frame_cache
+from bank_statement_parser.utils.categorizer import categorize, bank_category_matcher
 
 # Create a session
 Session = sessionmaker(bind=engine)
 session = Session()
 
+# Format of the fingerprints in user_table_hashes: bump it when hash_dataframe changes
+# so that migrate_statement_tables rehashes the stored statements once
+STATEMENT_HASH_VERSION = 2
+
+# Columns of an uploaded statement that go into its fingerprint
+HASHED_COLUMNS = ['date', 'transaction_id', 'particulars', 'debit_amount', 'credit_amount', 'balance_amount', 'type']
+
 def hash_dataframe(df: pd.DataFrame) -> str:
-    """Create a stable hash of a transaction DataFrame"""
-    df_copy = df.sort_index(axis=1).sort_values(by=df.columns.tolist()).reset_index(drop=True)
-    df_bytes = df_copy.to_csv(index=False).encode()
-    return hashlib.sha256(df_bytes).hexdigest()
+    """
+    Create a stable, order-independent hash of a transaction DataFrame.
+
+    Every row is hashed straight from its column values in one vectorized pass per
+    column, and the row hashes are folded with commutative reductions (wrapping sum
+    and xor) plus the row count, so neither row nor column order changes the result
+    and the frame is never sorted or serialized to CSV.
+    """
+    columns = sorted(df.columns)
+    row_hashes = np.zeros(len(df), dtype=np.uint64)
+    for column in columns:
+        values = df[column]
+        if values.dtype.kind == 'M':
+            values = values.astype('datetime64[ns]')  # the same day hashes alike whatever the resolution
+        column_hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        row_hashes = row_hashes * np.uint64(1_000_003) ^ column_hashes
+
+    folded = np.array(
+        [row_hashes.sum(dtype=np.uint64), np.bitwise_xor.reduce(row_hashes), len(row_hashes)],
+        dtype=np.uint64
+    )
+    return hashlib.sha256(folded.tobytes() + "|".join(map(str, columns)).encode()).hexdigest()
 
 def hash_metadata(metadata: dict) -> str:
     """Create a hash of the metadata dictionary"""
@@ -23,6 +59,209 @@ def hash_metadata(metadata: dict) -> str:
     meta_str = str(clean_meta).encode()
     return hashlib.sha256(meta_str).hexdigest()
 
+def build_row_keys(df: pd.DataFrame) -> pd.Series:
+    """Natural key of each transaction row: sha256 of (date, signed amount, balance, reference)"""
+    dates = pd.to_datetime(df['date'], errors='coerce').dt.strftime('%Y-%m-%d').fillna('')
+    amount = (df['credit_amount'].fillna(0) - df['debit_amount'].fillna(0)).round(2) + 0.0
+    balance = df['balance_amount'].round(2) + 0.0
+    reference = df['transaction_id'].fillna('').astype(str).str.strip()
+
+    raw = dates + '|' + amount.map('{:.2f}'.format) + '|' + balance.map('{:.2f}'.format) + '|' + reference
+    return raw.map(lambda value: hashlib.sha256(value.encode()).hexdigest())
+
+def insert_on_conflict_nothing(table, conn, keys, data_iter):
+    """pandas.to_sql insert method that skips rows whose row_key is already stored"""
+    rows = [dict(zip(keys, row)) for row in data_iter]
+    if not rows:
+        return 0
+    stmt = pg_insert(table.table).values(rows).on_conflict_do_nothing(index_elements=['row_key'])
+    return conn.execute(stmt).rowcount
+
+def backfill_row_keys(table_name: str):
+    """Give rows stored before row_key existed their natural key, then enforce uniqueness"""
+    add_row_key_column(table_name)
+
+    with engine.connect() as conn:
+        legacy = pd.read_sql(
+            text(f'SELECT id, date, transaction_id, debit_amount, credit_amount, balance_amount '
+                 f'FROM "{table_name}" WHERE row_key IS NULL ORDER BY id'),
+            conn
+        )
+
+    if not legacy.empty:
+        legacy['row_key'] = build_row_keys(legacy)
+        # Exact duplicates inside an old statement keep a NULL key rather than break the index
+        legacy = legacy.drop_duplicates(subset='row_key', keep='first')
+        with engine.begin() as conn:
+            conn.execute(
+                text(f'UPDATE "{table_name}" SET row_key = :row_key WHERE id = :id'),
+                legacy[['id', 'row_key']].to_dict(orient='records')
+            )
+
+    create_row_key_index(table_name)
+
+def backfill_category_flags(table_name: str, bank_name: str = None) -> int:
+    """Categorize rows stored before category_flags existed; returns how many rows were tagged"""
+    add_category_flags_column(table_name)
+
+    with engine.connect() as conn:
+        legacy = pd.read_sql(
+            text(f'SELECT id, particulars FROM "{table_name}" WHERE category_flags IS NULL ORDER BY id'),
+            conn
+        )
+    if legacy.empty:
+        return 0
+
+    legacy['category_flags'] = categorize(legacy['particulars'], bank_category_matcher(bank_name))
+    with engine.begin() as conn:
+        conn.execute(
+            text(f'UPDATE "{table_name}" SET category_flags = :category_flags WHERE id = :id'),
+            legacy[['id', 'category_flags']].to_dict(orient='records')
+        )
+    return len(legacy)
+
+def stored_statement_hash(table_name: str) -> str:
+    """Fingerprint of a stored transaction table, computed like that of an upload"""
+    columns = ", ".join(f'"{c}"' for c in HASHED_COLUMNS)
+    with engine.connect() as conn:
+        df = pd.read_sql(text(f'SELECT {columns} FROM "{table_name}"'), conn)
+
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    for column in ['debit_amount', 'credit_amount', 'balance_amount']:
+        df[column] = df[column].astype(float)
+    return hash_dataframe(df)
+
+def rehash_statement_tables() -> int:
+    """
+    Recompute the fingerprints stored in an older format from the rows of each
+    table (one-off per format change); returns how many were rewritten.
+    """
+    add_hash_version_column()
+    stmt = select(user_table_hashes.c.id, user_table_hashes.c.table_name).where(
+        user_table_hashes.c.hash_version.is_distinct_from(STATEMENT_HASH_VERSION)
+    )
+    with engine.connect() as conn:
+        outdated = conn.execute(stmt).fetchall()
+
+    for hash_id, table_name in outdated:
+        with engine.begin() as conn:
+            conn.execute(
+                user_table_hashes.update()
+                .where(user_table_hashes.c.id == hash_id)
+                .values(hash=stored_statement_hash(table_name), hash_version=STATEMENT_HASH_VERSION)
+            )
+    return len(outdated)
+
+def migrate_statement_tables():
+    """Bring every stored transaction table up to the current columns (run at startup)"""
+    create_statement_hash_index()
+    rehashed = rehash_statement_tables()
+    if rehashed:
+        print(f"🔑 Rehashed {rehashed} stored statements to fingerprint format {STATEMENT_HASH_VERSION}.")
+    stmt = (
+        select(user_table_hashes.c.table_name, user_table_metadata.c.bank_name)
+        .select_from(user_table_hashes)
+        .outerjoin(user_table_metadata, user_table_metadata.c.table_hash_id == user_table_hashes.c.id)
+    )
+    with engine.connect() as conn:
+        tables = conn.execute(stmt).fetchall()
+
+    for table_name, bank_name in tables:
+        create_date_index(table_name)
+        tagged = backfill_category_flags(table_name, bank_name)
+        if tagged:
+            print(f"🏷️ Categorized {tagged} stored transactions in '{table_name}'.")
+
+def last_balance_of(df: pd.DataFrame):
+    """Date and balance of the last transaction in statement order"""
+    dated = df.dropna(subset=['date'])
+    if dated.empty:
+        return None, None
+    last = dated[dated['date'] == dated['date'].max()].iloc[-1]
+    balance = last['balance_amount']
+    return last['date'].date(), (None if pd.isna(balance) else float(balance))
+
+def save_watermark(user_id: int, account_number: str, table_name: str, last_date, last_balance):
+    """Insert or move forward the ingestion watermark of an account"""
+    if not account_number:
+        return
+
+    stmt = pg_insert(account_watermarks).values(
+        user_id=user_id,
+        account_number=account_number,
+        table_name=table_name,
+        last_date=last_date,
+        last_balance=last_balance,
+        updated_at=datetime.now()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'account_number'],
+        set_={
+            'table_name': stmt.excluded.table_name,
+            'last_date': stmt.excluded.last_date,
+            'last_balance': stmt.excluded.last_balance,
+            'updated_at': stmt.excluded.updated_at,
+        }
+    )
+    session.execute(stmt)
+    session.commit()
+
+def append_new_transactions(user_id: int, df: pd.DataFrame, metadata_dict: dict, watermark: dict, txn_hash: str):
+    """
+    Incrementally ingest a statement that overlaps an already stored account.
+
+    Rows dated before the account watermark are dropped up front; rows on or after
+    it go through a bulk INSERT ... ON CONFLICT (row_key) DO NOTHING so transactions
+    seen before (e.g. on the watermark day itself) are skipped.
+    """
+    table_name = watermark['table_name']
+    backfill_row_keys(table_name)
+    backfill_category_flags(table_name, metadata_dict.get("bank_name"))
+
+    if watermark['last_date'] is not None:
+        df = df[df['date'] >= pd.Timestamp(watermark['last_date'])]
+
+    inserted = 0
+    if not df.empty:
+        inserted = df.to_sql(
+            table_name, con=engine, if_exists='append', index=False,
+            method=insert_on_conflict_nothing
+        ) or 0
+
+    if not inserted:
+        print(f"🚫 No new transactions to append to '{table_name}'.")
+        return
+
+    last_date, last_balance = last_balance_of(df)
+    if watermark['last_date'] is None or last_date >= watermark['last_date']:
+        save_watermark(user_id, metadata_dict.get("account_number"), table_name, last_date, last_balance)
+
+    # The table now holds different data: record the new statement hash and closing balance
+    session.execute(
+        user_table_hashes.update()
+        .where(user_table_hashes.c.table_name == table_name)
+        .values(hash=txn_hash, hash_version=STATEMENT_HASH_VERSION, created_at=datetime.now())
+    )
+    session.execute(
+        user_table_metadata.update()
+        .where(user_table_metadata.c.table_hash_id.in_(
+            select(user_table_hashes.c.id).where(user_table_hashes.c.table_name == table_name)
+        ))
+        .values(
+            closing_balance=metadata_dict.get("closing_balance"),
+            closing_balance_type=metadata_dict.get("closing_balance_type")
+        )
+    )
+    session.commit()
+
+    # Extend the stored EOD series and rebuild only the months touched by the new rows
+    refresh_daily_balances(user_id, table_name, metadata_dict.get("account_number"), since=df['date'].min())
+    refresh_monthly_aggregates(user_id, table_name, metadata_dict.get("account_number"), since=df['date'].min())
+    refresh_recurring_schedules(user_id, table_name, metadata_dict.get("account_number"), since=df['date'].min())
+    frame_cache.invalidate_user(user_id)
+
+    print(f"✅ Appended {inserted} new transactions to '{table_name}'.")
+
 def get_user_id(username: str) -> int:
     """Get or create a user by username"""
     result = session.execute(
@@ -44,7 +283,7 @@ def get_existing_hashes(user_id: int) -> dict:
     )
     return dict(session.execute(stmt).fetchall())
 
-def save_user_and_transactions(username: str, df: pd.DataFrame, metadata_dict: dict):
+def save_user_and_transactions(username: str, df: pd.DataFrame, metadata_dict: dict, incremental: bool = True):
     user_id = get_user_id(username)
     print(f"Using user_id: {user_id}")
 
@@ -56,7 +295,8 @@ def save_user_and_transactions(username: str, df: pd.DataFrame, metadata_dict: d
         'Debit Amount': 'debit_amount',
         'Credit Amount': 'credit_amount',
         'Balance Amount': 'balance_amount',
-        'Type': 'type'
+        'Type': 'type',
+        'Category Flags': 'category_flags'
     })
 
     # Add required fields
@@ -64,12 +304,26 @@ def save_user_and_transactions(username: str, df: pd.DataFrame, metadata_dict: d
     df['user_id'] = user_id
     df['created_at'] = datetime.now()
 
-    # Generate hashes
-    txn_hash = hash_dataframe(df.drop(columns=['user_id', 'created_at']))
+    # Generate hashes (category flags are derived from the rows, so they stay out of the fingerprint)
+    txn_hash = hash_dataframe(df.drop(columns=['user_id', 'created_at', 'category_flags'], errors='ignore'))
     meta_hash = hash_metadata(metadata_dict)
 
     # Check for duplicates
     existing_hashes = get_existing_hashes(user_id)
+
+    for table, h in existing_hashes.items():
+        if h == txn_hash:
+            print(f"🚫 Duplicate transaction data already saved in table '{table}'.")
+            return
+
+    df['row_key'] = build_row_keys(df)
+
+    # Overlapping statement of an account we already store: append only unseen rows
+    if incremental:
+        watermark = get_account_watermark(user_id, metadata_dict.get("account_number"))
+        if watermark:
+            append_new_transactions(user_id, df, metadata_dict, watermark, txn_hash)
+            return
   
 ##############Temporary Restriction##############
 
@@ -81,11 +335,6 @@ def save_user_and_transactions(username: str, df: pd.DataFrame, metadata_dict: d
     
 ############## Temporary Restriction End ##############
 
-    for table, h in existing_hashes.items():
-        if h == txn_hash:
-            print(f"🚫 Duplicate transaction data already saved in table '{table}'.")
-            return
-
     # Create new versioned table name
     table_version = len(existing_hashes) + 1
     table_name = f"transactions_user_{user_id}_{table_version}"
@@ -95,13 +344,14 @@ def save_user_and_transactions(username: str, df: pd.DataFrame, metadata_dict: d
         create_transaction_table(table_name)
         
         # Save to Postgres (will fail if table exists)
-        df.to_sql(table_name, con=engine, if_exists='append', index=False)
+        df.to_sql(table_name, con=engine, if_exists='append', index=False, method=insert_on_conflict_nothing)
 
         # Save hash to user_table_hashes
         result = session.execute(user_table_hashes.insert().values(
             user_id=user_id,
             table_name=table_name,
             hash=txn_hash,
+            hash_version=STATEMENT_HASH_VERSION,
             created_at=datetime.now()
         ))
         session.commit()
@@ -125,6 +375,13 @@ def save_user_and_transactions(username: str, df: pd.DataFrame, metadata_dict: d
         ))
         session.commit()
 
+        last_date, last_balance = last_balance_of(df)
+        save_watermark(user_id, metadata_dict.get("account_number"), table_name, last_date, last_balance)
+        refresh_daily_balances(user_id, table_name, metadata_dict.get("account_number"))
+        refresh_monthly_aggregates(user_id, table_name, metadata_dict.get("account_number"))
+        refresh_recurring_schedules(user_id, table_name, metadata_dict.get("account_number"))
+        frame_cache.invalidate_user(user_id)
+
         print(f"✅ Data saved successfully in '{table_name}' with metadata.")
     except IntegrityError as e:
         print(f"❌ Error saving data: {e}")
@@ -0,0 +1,301 @@
+import os
+import stat
+import time
+import uuid
+import pickle
+import struct
+import getpass
+import hashlib
+import tempfile
+import threading
+
+# Backend selection (override through the environment):
+#   redis://host:6379/0   -> Redis (needs the optional `redis` package)
+#   memory://             -> in-process dict, for local tests
+#   anything else         -> directory for the on-disk store (default: a private one in /dev/shm when available)
+SHARED_CACHE_URL = os.getenv("SHARED_CACHE_URL", "")
+SHARED_CACHE_TTL_SECONDS = int(os.getenv("SHARED_CACHE_TTL_SECONDS", "600"))
+SHARED_CACHE_LOCK_SECONDS = int(os.getenv("SHARED_CACHE_LOCK_SECONDS", "60"))
+# Size cap of the on-disk store (tmpfs is RAM) and how often a worker sweeps it
+SHARED_CACHE_MAX_MB = float(os.getenv("SHARED_CACHE_MAX_MB", "256"))
+SHARED_CACHE_SWEEP_SECONDS = int(os.getenv("SHARED_CACHE_SWEEP_SECONDS", "60"))
+
+
+class InMemoryBackend:
+    """Dict-backed stand-in for the subset of the Redis client API the cache uses."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at and time.time() > expires_at:
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ex: int = None, nx: bool = False):
+        with self._lock:
+            entry = self._data.get(key)
+            if nx and entry is not None and not (entry[1] and time.time() > entry[1]):
+                return None
+            self._data[key] = (value, time.time() + ex if ex else 0.0)
+            return True
+
+    def delete(self, *keys: str):
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+
+def private_directory(path: str) -> str:
+    """
+    Create ``path`` accessible to this user only, or check that the existing
+    one is: cache entries are unpickled, so nobody else may be able to write
+    into it. Raises RuntimeError for a directory owned by someone else.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if os.name != "posix":
+        return path
+
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise RuntimeError(f"Shared cache directory '{path}' is not a directory owned by this user; refusing to use it.")
+    if info.st_mode & 0o077:
+        os.chmod(path, 0o700)
+    return path
+
+
+class DiskBackend:
+    """
+    Single-host store shared by all worker processes: one file per key in a
+    private directory (tmpfs such as /dev/shm keeps it in shared memory).
+
+    Writes go through a temp file and an atomic rename; ``nx`` uses O_EXCL so
+    only one process can create a lock key. Entries of superseded data
+    versions are never read again, so writes sweep the directory now and then:
+    expired entries are deleted, then the oldest ones beyond ``max_bytes``.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = None, sweep_seconds: float = SHARED_CACHE_SWEEP_SECONDS):
+        self.directory = private_directory(directory)
+        self.max_bytes = max_bytes
+        self.sweep_seconds = sweep_seconds
+        self._last_sweep = 0.0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        if len(data) < 8:
+            return b""  # lock file still being written
+        expires_at = struct.unpack("d", data[:8])[0]
+        if expires_at and time.time() > expires_at:
+            self.delete(key)
+            return None
+        return data[8:]
+
+    def set(self, key: str, value: bytes, ex: int = None, nx: bool = False):
+        path = self._path(key)
+        payload = struct.pack("d", time.time() + ex if ex else 0.0) + value
+
+        if nx:
+            if self.get(key) is not None:
+                return None
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                return None
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            return True
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+        if time.monotonic() - self._last_sweep >= self.sweep_seconds:
+            self.sweep()
+        return True
+
+    def sweep(self) -> int:
+        """Delete expired entries, then the least recently written ones over max_bytes; returns how many"""
+        self._last_sweep = time.monotonic()
+        now = time.time()
+        entries = []
+        deleted = 0
+        for entry in os.scandir(self.directory):
+            try:
+                info = entry.stat()
+                if entry.name.endswith(".tmp"):
+                    # Left behind by a worker that died mid-write
+                    if now - info.st_mtime > SHARED_CACHE_LOCK_SECONDS:
+                        deleted += self._unlink(entry.path)
+                    continue
+                with open(entry.path, "rb") as f:
+                    header = f.read(8)
+            except FileNotFoundError:
+                continue
+            expires_at = struct.unpack("d", header)[0] if len(header) == 8 else 0.0
+            if expires_at and now > expires_at:
+                deleted += self._unlink(entry.path)
+            else:
+                entries.append((info.st_mtime, info.st_size, entry.path))
+
+        if self.max_bytes:
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                deleted += self._unlink(path)
+                total -= size
+        return deleted
+
+    @staticmethod
+    def _unlink(path: str) -> int:
+        try:
+            os.unlink(path)
+            return 1
+        except FileNotFoundError:
+            return 0
+
+    def delete(self, *keys: str):
+        deleted = 0
+        for key in keys:
+            try:
+                os.unlink(self._path(key))
+                deleted += 1
+            except FileNotFoundError:
+                pass
+        return deleted
+
+
+def create_backend(url: str = SHARED_CACHE_URL):
+    """Build the cache backend described by ``url``."""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("SHARED_CACHE_URL points at Redis but the 'redis' package is not installed.")
+        return redis.Redis.from_url(url)
+
+    if url.startswith("memory://"):
+        return InMemoryBackend()
+
+    max_bytes = int(SHARED_CACHE_MAX_MB * 1024 * 1024)
+    if url:
+        return DiskBackend(url, max_bytes)
+
+    # One directory per OS user, so another account cannot squat the name
+    base_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    owner = os.getuid() if hasattr(os, "getuid") else getpass.getuser()
+    return DiskBackend(os.path.join(base_dir, f"novillex-analytics-cache-{owner}"), max_bytes)
+
+
+class SharedCache:
+    """
+    Cache of pickled values in a backend shared by all workers, with
+    single-flight computation: for a missing key only one caller (across
+    threads and processes) runs ``compute``; the others wait for its result.
+    """
+
+    def __init__(self, backend, ttl_seconds: int, lock_seconds: int, poll_interval: float = 0.05):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+        self.poll_interval = poll_interval
+        self._local_locks = {}
+        self._local_guard = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _load(self, key: str):
+        data = self.backend.get(key)
+        return None if not data else data
+
+    def _local_lock(self, key: str) -> threading.Lock:
+        with self._local_guard:
+            lock = self._local_locks.get(key)
+            if lock is None:
+                lock = self._local_locks[key] = threading.Lock()
+            return lock
+
+    def get_or_compute(self, key: str, compute, ttl_seconds: int = None):
+        data = self._load(key)
+        if data is not None:
+            self.hits += 1
+            return pickle.loads(data)
+
+        # Threads of this worker queue up here; the first one does the work
+        local_lock = self._local_lock(key)
+        try:
+            with local_lock:
+                data = self._load(key)
+                if data is not None:
+                    self.coalesced += 1
+                    return pickle.loads(data)
+                return self._compute_once(key, compute, ttl_seconds)
+        finally:
+            with self._local_guard:
+                if self._local_locks.get(key) is local_lock and not local_lock.locked():
+                    del self._local_locks[key]
+
+    def _compute_once(self, key: str, compute, ttl_seconds: int = None):
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex.encode()
+        if not self.backend.set(lock_key, token, ex=self.lock_seconds, nx=True):
+            # Another worker is computing this key: wait for its result
+            deadline = time.monotonic() + self.lock_seconds
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                data = self._load(key)
+                if data is not None:
+                    self.coalesced += 1
+                    return pickle.loads(data)
+                if self.backend.get(lock_key) is None:
+                    break
+
+        try:
+            value = compute()
+            self.misses += 1
+            self.backend.set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+                             ex=ttl_seconds or self.ttl_seconds)
+            return value
+        finally:
+            if self.backend.get(lock_key) == token:
+                self.backend.delete(lock_key)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+
+shared_cache = SharedCache(
+    create_backend(),
+    ttl_seconds=SHARED_CACHE_TTL_SECONDS,
+    lock_seconds=SHARED_CACHE_LOCK_SECONDS,
+)
+
+
+def version_token(user_data: dict) -> str:
+    """Short digest of a user's statement hashes, used in shared cache keys."""
+    versions = sorted(user_data["hashes"].items())
+    return hashlib.sha256(repr(versions).encode()).hexdigest()[:16]
+
+
+def cached_payload(name: str, user_data: dict, compute):
+    """Return the payload of endpoint ``name`` for this user's data version, computing it at most once."""
+    key = f"payload:{name}:{user_data['user_id']}:{version_token(user_data)}"
+    return shared_cache.get_or_compute(key, compute)
@@ -0,0 +1,350 @@
+import numpy as np
+import pandas as pd
+from .recurring_flows import load_recurring_schedules, load_users_recurring_schedules, match_schedules, match_users_schedules
+from bank_statement_parser.utils.categorizer import has_category
+
+# Every metric and intermediate of the monthly summary is a named node. A node
+# is a function of the MetricContext and reads the nodes it depends on through
+# ctx[name], so only the requested metrics and what they need are evaluated,
+# each at most once per request.
+NODES = {}
+
+# Output metrics of a monthly summary row, in response order ("month" is always included)
+SUMMARY_FIELDS = [
+    "opening_balance", "closing_balance",
+    "debit_transaction_amount", "credit_transaction_amount",
+    "debit_transaction_count", "credit_transaction_count",
+    "salary_income_total", "salary_income_count", "emi_total", "emi_count",
+    "minimum_balance", "maximum_balance", "average_balance",
+    "cash_deposit_amount", "cash_deposit_count",
+    "cash_withdrawal_amount", "cash_withdrawal_count",
+    "penalty_amount", "penalty_count", "bank_charges_amount", "bank_charges_count",
+    "net_debit", "net_credit", "overdrawn_days",
+    "min_eod_balance", "max_eod_balance", "avg_eod_balance",
+    "balance_on_1st", "balance_on_30th", "daily_balance_change_pct", "foir",
+]
+
+
+def node(fn):
+    NODES[fn.__name__] = fn
+    return fn
+
+
+class MetricContext:
+    """
+    Memoized evaluation of summary nodes over one user's transaction frame.
+
+    Args:
+        df: Dated transactions sorted by date, with a ``month`` period column.
+        username: Owner of the rows (recurring schedules are loaded on demand).
+        opening_balance: The statement's opening balance, if known.
+    """
+
+    # Columns identifying a summary row
+    group_keys = ['month']
+
+    def __init__(self, df: pd.DataFrame, username: str, opening_balance: float = None):
+        self.df = df
+        self.username = username
+        self.opening_balance = opening_balance
+        self.values = {}
+
+    def __getitem__(self, name: str):
+        if name not in self.values:
+            self.values[name] = NODES[name](self)
+        return self.values[name]
+
+    def per_month(self, values: pd.Series, how: str) -> np.ndarray:
+        """Per-month ``how`` aggregate ('sum', 'count', 'mean', ...) of a row-aligned series"""
+        return values.groupby(self['month_groups'][0], sort=True).agg(how).to_numpy()
+
+    def count_per_month(self, mask: pd.Series) -> np.ndarray:
+        """Number of rows per month where ``mask`` holds (integer counts need no groupby)"""
+        codes, months = self['month_groups']
+        return np.bincount(codes[mask.to_numpy(dtype=bool)], minlength=len(months))
+
+    def load_schedules(self):
+        # Recurring flows detected at ingest: debit schedules are EMIs, credit schedules salary
+        recurring = load_recurring_schedules(self.username)
+        return recurring["rows"] if recurring else []
+
+    def recurring(self, direction: str) -> pd.Series:
+        """Rows matching one of the owner's recurring schedules of a direction"""
+        return match_schedules(self.df, self['schedules'], direction)
+
+    def opening_balances(self) -> np.ndarray:
+        """Statement opening balance of each summary row's owner (NaN when unknown)"""
+        value = np.nan if self.opening_balance is None else self.opening_balance
+        return np.full(len(self['month_groups'][1]), value, dtype=float)
+
+    def first_months(self) -> np.ndarray:
+        """True for the summary rows that are their owner's first month"""
+        return np.arange(len(self['month_groups'][1])) == 0
+
+
+class UsersMetricContext(MetricContext):
+    """
+    Summary nodes over several users' transactions in one frame: the rows have
+    a ``username`` column and every node is grouped by (username, month).
+
+    Args:
+        df: Dated transactions of all users sorted by date, with ``username`` and ``month`` columns.
+        opening_balances: username -> statement opening balance (None when unknown).
+    """
+
+    group_keys = ['username', 'month']
+
+    def __init__(self, df: pd.DataFrame, opening_balances: dict):
+        super().__init__(df, None)
+        self.user_opening_balances = opening_balances
+
+    def load_schedules(self):
+        # One query for every user's schedules
+        recurring = load_users_recurring_schedules(list(self.user_opening_balances))
+        return {username: data["rows"] for username, data in recurring.items()}
+
+    def recurring(self, direction: str) -> pd.Series:
+        return match_users_schedules(self.df, self['schedules'], direction)
+
+    def opening_balances(self) -> np.ndarray:
+        users = self['month_groups'][1].get_level_values('username')
+        return np.array([self.user_opening_balances.get(user) for user in users], dtype=float)
+
+    def first_months(self) -> np.ndarray:
+        users = self['month_groups'][1].get_level_values('username')
+        return np.append(True, users[1:] != users[:-1])
+
+
+# --- Shared intermediates ---
+
+@node
+def month_groups(ctx):
+    # (group code of every row, sorted summary keys)
+    if len(ctx.group_keys) == 1:
+        codes, keys = pd.factorize(ctx.df[ctx.group_keys[0]], sort=True)
+        return codes, keys.rename(ctx.group_keys[0])
+    groups = ctx.df.groupby(ctx.group_keys, sort=True)
+    return groups.ngroup().to_numpy(), groups.size().index
+
+@node
+def day_of_month(ctx):
+    return ctx.df['date'].dt.day
+
+@node
+def is_debit(ctx):
+    debit = ctx.df['debit_amount']
+    return debit.notnull() & (debit > 0)
+
+@node
+def is_credit(ctx):
+    credit = ctx.df['credit_amount']
+    return credit.notnull() & (credit > 0)
+
+@node
+def schedules(ctx):
+    return ctx.load_schedules()
+
+@node
+def emi(ctx):
+    return ctx.df['debit_amount'].where(ctx['is_debit'] & ctx.recurring("debit"))
+
+@node
+def salary(ctx):
+    return ctx.df['credit_amount'].where(ctx['is_credit'] & ctx.recurring("credit"))
+
+@node
+def balance_count(ctx):
+    return ctx.count_per_month(ctx.df['balance_amount'].notna())
+
+@node
+def has_balance(ctx):
+    return ctx['balance_count'] > 0
+
+@node
+def first_balance(ctx):
+    return ctx.per_month(ctx.df['balance_amount'], 'first')
+
+@node
+def raw_closing_balance(ctx):
+    return ctx.per_month(ctx.df['balance_amount'], 'last')
+
+@node
+def debit_txn(ctx):
+    return ctx.df['debit_amount'].where(ctx['is_debit'])
+
+@node
+def credit_txn(ctx):
+    return ctx.df['credit_amount'].where(ctx['is_credit'])
+
+
+def floats(values) -> list:
+    return [float(v) for v in values]
+
+def ints(values) -> list:
+    return [int(v) for v in values]
+
+def when(condition, values) -> list:
+    """float(value) where condition holds, else None"""
+    return [float(v) if ok else None for v, ok in zip(values, condition)]
+
+def category_metrics(name: str, category: str, column: str):
+    """Register the ``<name>_amount`` and ``<name>_count`` metrics of a category"""
+    def mask(ctx):
+        return has_category(ctx.df['category_flags'], category)
+
+    def amount(ctx):
+        return floats(ctx.per_month(ctx.df[column].where(ctx[f'is_{name}']), 'sum'))
+
+    def count(ctx):
+        return ints(ctx.count_per_month(ctx[f'is_{name}']))
+
+    NODES[f'is_{name}'] = mask
+    NODES[f'{name}_amount'] = amount
+    NODES[f'{name}_count'] = count
+
+
+# --- Output metrics ---
+
+@node
+def opening_balance(ctx):
+    # Previous month's closing, else the statement's opening balance
+    # (or the month's first balance when the statement has none)
+    statement_opening = pd.Series(ctx.opening_balances())
+    fallback = statement_opening.where(statement_opening.notna(), pd.Series(ctx['first_balance']))
+    previous_closing = pd.Series(ctx['raw_closing_balance']).shift(1)
+    previous_closing[ctx.first_months()] = np.nan
+    opening = previous_closing.where(previous_closing.notna(), fallback)
+    return [None if pd.isna(v) else float(v) for v in opening]
+
+@node
+def closing_balance(ctx):
+    return when(ctx['has_balance'], ctx['raw_closing_balance'])
+
+@node
+def debit_transaction_amount(ctx):
+    return floats(ctx.per_month(ctx['debit_txn'], 'sum'))
+
+@node
+def credit_transaction_amount(ctx):
+    return floats(ctx.per_month(ctx['credit_txn'], 'sum'))
+
+@node
+def debit_transaction_count(ctx):
+    return ints(ctx.count_per_month(ctx['debit_txn'].notna()))
+
+@node
+def credit_transaction_count(ctx):
+    return ints(ctx.count_per_month(ctx['credit_txn'].notna()))
+
+@node
+def salary_income_total(ctx):
+    return floats(ctx.per_month(ctx['salary'], 'sum'))
+
+@node
+def salary_income_count(ctx):
+    return ints(ctx.count_per_month(ctx['salary'].notna()))
+
+@node
+def emi_total(ctx):
+    return floats(ctx.per_month(ctx['emi'], 'sum'))
+
+@node
+def emi_count(ctx):
+    return ints(ctx.count_per_month(ctx['emi'].notna()))
+
+@node
+def minimum_balance(ctx):
+    return when(ctx['has_balance'], ctx.per_month(ctx.df['balance_amount'], 'min'))
+
+@node
+def maximum_balance(ctx):
+    return when(ctx['has_balance'], ctx.per_month(ctx.df['balance_amount'], 'max'))
+
+@node
+def average_balance(ctx):
+    return when(ctx['has_balance'], ctx.per_month(ctx.df['balance_amount'], 'mean'))
+
+category_metrics('cash_deposit', 'cash_deposit', 'credit_amount')
+category_metrics('cash_withdrawal', 'cash_withdrawal', 'debit_amount')
+category_metrics('penalty', 'penalty', 'debit_amount')
+category_metrics('bank_charges', 'bank_charges', 'debit_amount')
+
+@node
+def net_debit(ctx):
+    return floats(ctx.per_month(ctx.df['debit_amount'], 'sum'))
+
+@node
+def net_credit(ctx):
+    return floats(ctx.per_month(ctx.df['credit_amount'], 'sum'))
+
+@node
+def overdrawn_days(ctx):
+    return ints(ctx.count_per_month(ctx.df['balance_amount'] < 0))
+
+@node
+def min_eod_balance(ctx):
+    return ctx['minimum_balance']
+
+@node
+def max_eod_balance(ctx):
+    return ctx['maximum_balance']
+
+@node
+def avg_eod_balance(ctx):
+    return ctx['average_balance']
+
+@node
+def balance_on_1st(ctx):
+    on_1st = ctx['day_of_month'] == 1
+    return when(ctx.count_per_month(on_1st), ctx.per_month(ctx.df['balance_amount'].where(on_1st), 'mean'))
+
+@node
+def balance_on_30th(ctx):
+    on_30th = ctx['day_of_month'] == 30
+    return when(ctx.count_per_month(on_30th), ctx.per_month(ctx.df['balance_amount'].where(on_30th), 'mean'))
+
+@node
+def daily_balance_change_pct(ctx):
+    # Balance change between consecutive known balances of the same month
+    balances = ctx.df[[*ctx.group_keys, 'balance_amount']].dropna(subset=['balance_amount'])
+    change = balances.groupby(ctx.group_keys)['balance_amount'].pct_change().reindex(ctx.df.index)
+    return when(ctx['has_balance'], ctx.per_month(change, 'mean') * 100)
+
+@node
+def foir(ctx):
+    # FOIR score approximation: EMI / salary (if both are detected)
+    return [
+        round(emi / salary, 2) if salary and emi else None
+        for emi, salary in zip(ctx['emi_total'], ctx['salary_income_total'])
+    ]
+
+
+def format_value(v):
+    if isinstance(v, (np.integer, int)):
+        return int(v)
+    elif isinstance(v, (np.floating, float)):
+        return round(float(v), 2)
+    return v
+
+
+def evaluate_summary(ctx: MetricContext, fields: list = None) -> list:
+    """
+    Monthly summary rows holding ``month`` and the requested fields (all when
+    None). Fields are evaluated lazily through the node graph, so shared
+    intermediates are computed once and unrequested metrics not at all.
+    """
+    fields = SUMMARY_FIELDS if fields is None else fields
+    columns = {field: ctx[field] for field in fields}
+    return [
+        {"month": str(month), **{field: format_value(values[i]) for field, values in columns.items()}}
+        for i, month in enumerate(ctx['month_groups'][1].get_level_values('month'))
+    ]
+
+
+def evaluate_users_summary(ctx: UsersMetricContext, fields: list = None) -> dict:
+    """Monthly summary rows of every user in a UsersMetricContext, keyed by username"""
+    rows = evaluate_summary(ctx, fields)
+    summaries = {}
+    for username, row in zip(ctx['month_groups'][1].get_level_values('username'), rows):
+        summaries.setdefault(username, []).append(row)
+    return summaries
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+from datetime import date
+from .balance_kernel import day_numbers
+from .frame_cache import load_user_frame
+from .daily_balances import load_daily_balances, combine_daily_balances
+
+
+class SparseMax:
+    """Sparse table over a fixed array: the max of any range in O(1) after an O(n log n) build."""
+
+    def __init__(self, values: np.ndarray):
+        # Level k holds the max of every run of 2**k consecutive values
+        self.levels = [values]
+        span = 1
+        while 2 * span <= len(values):
+            previous = self.levels[-1]
+            self.levels.append(np.maximum(previous[:-span], previous[span:]))
+            span *= 2
+
+    def query(self, start: int, stop: int) -> float:
+        """Max of values[start:stop] (stop > start)"""
+        level = (stop - start).bit_length() - 1
+        values = self.levels[level]
+        return max(values[start], values[stop - (1 << level)])
+
+
+def prefix_sums(values: np.ndarray) -> np.ndarray:
+    """Running totals with a leading zero, so the sum of values[i:j] is sums[j] - sums[i]"""
+    return np.concatenate([[0], np.cumsum(values)])
+
+
+class WindowIndex:
+    """
+    Per-user index answering cashflow aggregates over any date window.
+
+    Transactions are rolled up per day; cumulative sums of the daily inflow,
+    outflow and counts give window totals with two binary searches, and sparse
+    tables give the largest debit and credit of the window in O(1). The
+    end-of-day balance series has its own running sums for window averages.
+    """
+
+    def __init__(self, df: pd.DataFrame, daily_balance: pd.Series = None):
+        dates = df['date']
+        if dates.dtype.kind != 'M':
+            dates = pd.to_datetime(dates, errors='coerce')
+        dates = dates.to_numpy(dtype='datetime64[D]')
+        dated = ~np.isnat(dates)
+        days = day_numbers(dates[dated])
+        order = np.argsort(days, kind='stable')
+        days = days[order]
+        debit = np.nan_to_num(df['debit_amount'].to_numpy(dtype=float)[dated][order])
+        credit = np.nan_to_num(df['credit_amount'].to_numpy(dtype=float)[dated][order])
+
+        # One entry per day with transactions
+        starts = np.flatnonzero(np.append(True, days[1:] != days[:-1])) if len(days) else np.array([], dtype=np.int64)
+        self.days = days[starts]
+        if len(days):
+            self.inflow = prefix_sums(np.add.reduceat(credit, starts))
+            self.outflow = prefix_sums(np.add.reduceat(debit, starts))
+            self.inflow_count = prefix_sums(np.add.reduceat((credit > 0).astype(np.int64), starts))
+            self.outflow_count = prefix_sums(np.add.reduceat((debit > 0).astype(np.int64), starts))
+            self.txn_count = prefix_sums(np.diff(np.append(starts, len(days))))
+            self.max_debit = SparseMax(np.maximum.reduceat(debit, starts))
+            self.max_credit = SparseMax(np.maximum.reduceat(credit, starts))
+
+        # Daily balance series: contiguous days from balance_start
+        self.balance_start = None
+        if daily_balance is not None and not daily_balance.empty:
+            balances = daily_balance.to_numpy(dtype=float)
+            known = ~np.isnan(balances)
+            self.balance_start = int(day_numbers(daily_balance.index[:1].to_numpy())[0])
+            self.balance_sum = prefix_sums(np.where(known, balances, 0.0))
+            self.balance_days = prefix_sums(known.astype(np.int64))
+
+    def window(self, start: date = None, end: date = None) -> dict:
+        """
+        Aggregates of the transactions dated within [start, end] (both inclusive,
+        open-ended when omitted). Max amounts and the average balance are None
+        when the window has no transactions or balances.
+        """
+        first = day_numbers([start])[0] if start is not None else None
+        last = day_numbers([end])[0] if end is not None else None
+
+        low = 0 if first is None else int(np.searchsorted(self.days, first, side='left'))
+        high = len(self.days) if last is None else int(np.searchsorted(self.days, last, side='right'))
+        result = {
+            "inflow": 0.0, "outflow": 0.0,
+            "inflow_txn_count": 0, "outflow_txn_count": 0, "txn_count": 0,
+            "max_debit": None, "max_credit": None,
+        }
+        if high > low:
+            result.update({
+                "inflow": float(self.inflow[high] - self.inflow[low]),
+                "outflow": float(self.outflow[high] - self.outflow[low]),
+                "inflow_txn_count": int(self.inflow_count[high] - self.inflow_count[low]),
+                "outflow_txn_count": int(self.outflow_count[high] - self.outflow_count[low]),
+                "txn_count": int(self.txn_count[high] - self.txn_count[low]),
+                "max_debit": float(self.max_debit.query(low, high)),
+                "max_credit": float(self.max_credit.query(low, high)),
+            })
+        result["net_cash_flow"] = result["inflow"] - result["outflow"]
+
+        result["avg_eod_balance"] = None
+        if self.balance_start is not None:
+            length = len(self.balance_days) - 1
+            low = 0 if first is None else min(max(first - self.balance_start, 0), length)
+            high = length if last is None else min(max(last - self.balance_start + 1, 0), length)
+            days_known = self.balance_days[high] - self.balance_days[low] if high > low else 0
+            if days_known:
+                result["avg_eod_balance"] = float((self.balance_sum[high] - self.balance_sum[low]) / days_known)
+
+        return result
+
+
+def build_window_index(username: str, user_data: dict) -> WindowIndex:
+    """Window index of a user's transactions and combined end-of-day balance series"""
+    frame = load_user_frame(username, user_data)["frame"]
+    balances = load_daily_balances(username)
+    return WindowIndex(frame, combine_daily_balances(balances["rows"], balances["accounts"]) if balances else None)
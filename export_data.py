@@ -0,0 +1,44 @@
+import sys
+import argparse
+from datetime import date
+from api.exports import EXPORT_DATASETS, EXPORT_FORMATS, export_users, export_stream
+
+# Usage:
+#   python export_data.py transactions --username boi --format parquet
+#   python export_data.py monthly_summary --all-users --format csv --output -
+#   python export_data.py daily_balances --username boi --start-date 2024-01-01 --columns date,balance
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export transactions, daily balances or monthly summaries to a file.")
+    parser.add_argument("dataset", choices=list(EXPORT_DATASETS))
+    who = parser.add_mutually_exclusive_group(required=True)
+    who.add_argument("--username")
+    who.add_argument("--all-users", action="store_true")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="parquet")
+    parser.add_argument("--columns", help="Comma-separated columns to write (all when omitted)")
+    parser.add_argument("--start-date", type=date.fromisoformat)
+    parser.add_argument("--end-date", type=date.fromisoformat)
+    parser.add_argument("--output", help="Output file ('-' for stdout, default <user>_<dataset>.<extension>)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    users = export_users(args.username)
+    if not users and args.username:
+        sys.exit(f"❌ User not found: {args.username}")
+
+    columns = [column.strip() for column in args.columns.split(",") if column.strip()] if args.columns else None
+    try:
+        chunks = export_stream(args.dataset, users, args.format, columns, args.start_date, args.end_date)
+    except (ValueError, ImportError) as e:
+        sys.exit(f"❌ {e}")
+
+    output = args.output or f"{args.username or 'all_users'}_{args.dataset}.{EXPORT_FORMATS[args.format]['extension']}"
+    size = 0
+    with (open(sys.stdout.fileno(), "wb", closefd=False) if output == "-" else open(output, "wb")) as file:
+        for chunk in chunks:
+            file.write(chunk)
+            size += len(chunk)
+
+    print(f"✅ Exported {args.dataset} of {len(users)} users to {output} ({size} bytes)", file=sys.stderr)
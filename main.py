@@ -2,7 +2,12 @@
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from api.responses import FastJSONResponse
+from api.etags import conditional_get
 from database.db import create_tables
+from database.save_user_data import migrate_statement_tables
+from database.frame_cache import frame_cache
+from database.shared_cache import shared_cache
 from api.endpoints import (
     metadata,
     month_wise_analysis,
@@ -14,14 +19,19 @@ from api.endpoints import (
     cashflow_chart,
     upload_statement,
     extract_statements,
-    cashflowPage
+    cashflowPage,
+    compliance,
+    dashboard,
+    export,
+    analytics_admin
 )
 
-# Initialize FastAPI app
-app = FastAPI()
+# Initialize FastAPI app (responses are encoded with orjson)
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Run table creation logic on startup
 create_tables()
+migrate_statement_tables()
 
 # Register API routes
 app.include_router(metadata.router, prefix="/metadata", tags=["Metadata"])
@@ -35,6 +45,13 @@ app.include_router(cashflow_chart.router, prefix="/monthly-cashflow", tags=["Mon
 app.include_router(upload_statement.router, prefix="/upload", tags=["Upload Statement"])
 app.include_router(extract_statements.router, prefix="/extract", tags=["Extract Statement"])
 app.include_router(cashflowPage.router, prefix="/cashflow", tags=["Cashflow Page"])
+app.include_router(compliance.router, prefix="/compliance", tags=["Compliance"])
+app.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
+app.include_router(export.router, prefix="/export", tags=["Export"])
+app.include_router(analytics_admin.router, prefix="/admin/analytics", tags=["Portfolio Analytics"])
+
+# Conditional GET: analytics reads carry an ETag of the user's data version (304 when unchanged)
+app.middleware("http")(conditional_get)
 
 # CORS middleware (adjust allowed origins in production)
 app.add_middleware(
@@ -43,6 +60,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # Startup test
@@ -50,6 +68,11 @@ app.add_middleware(
 def read_root():
     return {"message": "🚀 Bank Statement Analyzer is running!"}
 
+# Cache counters (frame_cache is per worker, shared_cache counts this worker's lookups)
+@app.get("/cache/stats")
+def cache_stats():
+    return {"frame_cache": frame_cache.stats(), "shared_cache": shared_cache.stats()}
+
 
 # from database.db import create_tables
 # # Create tables when app starts
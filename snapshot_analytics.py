@@ -0,0 +1,12 @@
+from database.analytics_store import ANALYTICS_SNAPSHOT_DIR, refresh_snapshot
+
+# Refresh the Parquet snapshot behind the portfolio analytics queries, e.g. hourly from cron:
+#   0 * * * * cd /app && python snapshot_analytics.py
+
+if __name__ == "__main__":
+    result = refresh_snapshot()
+    print(
+        f"📦 Snapshot in {ANALYTICS_SNAPSHOT_DIR}: {result['users']} users, {result['tables']} tables, "
+        f"{result['rows']} rows ({result['written']} tables written, {result['kept']} kept, "
+        f"{result['removed']} files removed) in {result['seconds']}s"
+    )
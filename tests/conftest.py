@@ -0,0 +1,165 @@
+import os
+from contextlib import contextmanager
+import pytest
+
+# The tests run the app against a scratch Postgres database that they fill from
+# sample_statements, e.g.
+#   TEST_DATABASE_URL=postgresql+psycopg2://postgres@localhost/novillex_test python -m pytest
+# Without TEST_DATABASE_URL they are skipped.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ["SHARED_CACHE_URL"] = "memory://"
+
+SAMPLE_STATEMENT = os.path.join(os.path.dirname(__file__), "..", "sample_statements", "BOI.pdf")
+SAMPLE_USER = "test_sample_boi"
+TWO_STATEMENTS_USER = "test_two_statements"
+SAME_ACCOUNT_USER = "test_same_account"
+ENDED_STATEMENT_USER = "test_ended_statement"
+SECOND_ACCOUNT = "TEST-SECOND-ACCOUNT"
+
+
+@pytest.fixture(scope="session")
+def client():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from fastapi.testclient import TestClient
+    from main import app  # creates and migrates the tables
+
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session")
+def sample_statement(client):
+    """Metadata and transactions parsed from the sample BOI statement (stored for SAMPLE_USER)"""
+    from database import crud
+    from bank_statement_parser.utils.extraction_core_process import run_extraction
+
+    metadata, df, _, _ = run_extraction(SAMPLE_STATEMENT, "", SAMPLE_USER)
+    assert crud.get_user_statements(SAMPLE_USER)["table_names"]
+    return metadata, df
+
+
+@pytest.fixture(scope="session")
+def sample_user(sample_statement):
+    """User with the sample statement as their only statement table"""
+    return SAMPLE_USER
+
+
+@pytest.fixture(scope="session")
+def two_statements_user(sample_statement):
+    """User with two statement tables: the sample statement and a copy of it on a second account"""
+    from database import crud
+    from database.save_user_data import save_user_and_transactions
+
+    metadata, df = sample_statement
+    save_user_and_transactions(TWO_STATEMENTS_USER, df, metadata)
+    if len(crud.get_user_statements(TWO_STATEMENTS_USER)["table_names"]) < 2:
+        add_statement_copy(TWO_STATEMENTS_USER, SECOND_ACCOUNT)
+    return TWO_STATEMENTS_USER
+
+
+@pytest.fixture(scope="session")
+def same_account_user(sample_statement):
+    """User with two statement tables of the same account: the sample statement twice"""
+    from database import crud
+    from database.save_user_data import save_user_and_transactions
+
+    metadata, df = sample_statement
+    save_user_and_transactions(SAME_ACCOUNT_USER, df, metadata)
+    user_data = crud.get_user_statements(SAME_ACCOUNT_USER)
+    if len(user_data["table_names"]) < 2:
+        add_statement_copy(SAME_ACCOUNT_USER, user_data["metadata"][0]["account_number"])
+    return SAME_ACCOUNT_USER
+
+
+@pytest.fixture(scope="session")
+def ended_statement_user(sample_statement):
+    """
+    User with the sample statement plus, on a second account, a copy of its
+    first half only. Returns (username, the first day after the copy ends).
+    """
+    from database import crud
+    from database.save_user_data import save_user_and_transactions
+
+    metadata, df = sample_statement
+    dates = df["Date"].dropna().sort_values()
+    cutoff = dates.iloc[len(dates) // 2].date()
+    save_user_and_transactions(ENDED_STATEMENT_USER, df, metadata)
+    if len(crud.get_user_statements(ENDED_STATEMENT_USER)["table_names"]) < 2:
+        add_statement_copy(ENDED_STATEMENT_USER, SECOND_ACCOUNT, before=cutoff)
+    return ENDED_STATEMENT_USER, cutoff
+
+
+def add_statement_copy(username: str, account_number: str, before=None):
+    """
+    Store a copy of the user's first statement table as another account's statement
+    (uploads are limited to one table per user, so the second table is made by hand),
+    keeping only the rows dated before ``before`` when it is given.
+    """
+    from datetime import datetime
+    from sqlalchemy import text
+    from database import crud
+    from database.db import engine, user_table_hashes, user_table_metadata
+    from database.daily_balances import refresh_daily_balances
+    from database.monthly_aggregates import refresh_monthly_aggregates
+    from database.recurring_flows import refresh_recurring_schedules
+
+    user_data = crud.get_user_statements(username)
+    source = user_data["table_names"][0]
+    table_name = f"transactions_user_{user_data['user_id']}_{len(user_data['table_names']) + 1}"
+    columns = ", ".join(f'"{c}"' for c in crud.TRANSACTION_COLUMNS + ["row_key"] if c != "id")
+    metadata = dict(user_data["metadata"][0], account_number=account_number, metadata_hash=f"copy:{table_name}")
+    metadata.pop("id")
+
+    crud.create_transaction_table(table_name)
+    with engine.begin() as conn:
+        where = "WHERE date < :before" if before is not None else ""
+        conn.execute(
+            text(f'INSERT INTO "{table_name}" ({columns}) SELECT {columns} FROM "{source}" {where} ORDER BY id'),
+            {"before": before} if before is not None else {}
+        )
+        table_hash_id = conn.execute(user_table_hashes.insert().values(
+            user_id=user_data["user_id"], table_name=table_name, hash=f"copy:{table_name}", created_at=datetime.now()
+        )).inserted_primary_key[0]
+        conn.execute(user_table_metadata.insert().values(dict(metadata, table_hash_id=table_hash_id)))
+
+    refresh_daily_balances(user_data["user_id"], table_name, account_number)
+    refresh_monthly_aggregates(user_data["user_id"], table_name, account_number)
+    refresh_recurring_schedules(user_data["user_id"], table_name, account_number)
+
+
+@pytest.fixture
+def count_queries():
+    """Context manager collecting the SQL statements sent to the database inside its block"""
+    from sqlalchemy import event
+    from database.db import engine
+
+    @contextmanager
+    def counting():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    return counting
+
+
+@pytest.fixture
+def clear_caches():
+    """Function emptying the per-worker frame cache and the shared payload cache"""
+    from database.frame_cache import frame_cache
+    from database.shared_cache import InMemoryBackend, shared_cache
+
+    def clear():
+        frame_cache.clear()
+        shared_cache.backend = InMemoryBackend()
+
+    clear()
+    return clear
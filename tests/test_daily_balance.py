@@ -0,0 +1,54 @@
+import pytest
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+@pytest.mark.parametrize("max_points", [3, 4, 10])
+def test_downsampled_series_fits_max_points(client, sample_user, clear_caches, method, max_points):
+    full = client.get("/daily-balance/get-daily-balance", params={"username": sample_user}).json()
+    response = client.get(
+        "/daily-balance/get-daily-balance",
+        params={"username": sample_user, "max_points": max_points, "method": method},
+    )
+    assert response.status_code == 200
+
+    points = [row for rows in response.json().values() for row in rows]
+    days = [row for rows in full.values() for row in rows if row["balance"] is not None]
+    assert len(days) > max_points
+    assert len(points) <= max_points
+    # The first and last days are always kept
+    assert points[0] == days[0] and points[-1] == days[-1]
+    if method == "minmax":
+        balances = [row["balance"] for row in points]
+        extremes = {min(row["balance"] for row in days), max(row["balance"] for row in days)}
+        assert extremes & set(balances)
+
+
+def daily_series(client, username, **params) -> dict:
+    """date -> balance of the user's /daily-balance series"""
+    response = client.get("/daily-balance/get-daily-balance", params={"username": username, **params})
+    assert response.status_code == 200
+    return {row["date"]: row["balance"] for rows in response.json().values() for row in rows}
+
+
+def test_same_account_tables_share_one_balance(client, sample_user, same_account_user, clear_caches):
+    # A second statement of the same account is not counted twice
+    assert daily_series(client, same_account_user) == daily_series(client, sample_user)
+
+
+def test_separate_accounts_add_up(client, sample_user, two_statements_user, clear_caches):
+    single = daily_series(client, sample_user)
+    combined = daily_series(client, two_statements_user)
+    assert combined.keys() == single.keys()
+    assert combined == {day: pytest.approx(2 * balance) for day, balance in single.items()}
+
+
+def test_date_range_carries_the_balance_of_an_ended_statement(client, sample_user, ended_statement_user, clear_caches):
+    username, copy_ended = ended_statement_user
+    full = daily_series(client, username)
+    start = next(day for day in sorted(full) if day > f"{copy_ended:%Y-%m-%d}")
+
+    ranged = daily_series(client, username, start_date=start)
+    assert ranged == {day: balance for day, balance in full.items() if day >= start}
+    # The ended account still counts with its last balance
+    single = daily_series(client, sample_user)
+    assert ranged[start] != pytest.approx(single[start])
@@ -0,0 +1,30 @@
+DAILY_BALANCE = "/daily-balance/get-daily-balance"
+
+
+def test_etag_revalidates_the_same_request(client, sample_user):
+    response = client.get(DAILY_BALANCE, params={"username": sample_user, "max_points": 10})
+    etag = response.headers["ETag"]
+
+    # Parameter order does not change the representation
+    revalidated = client.get(
+        DAILY_BALANCE, params={"max_points": 10, "username": sample_user}, headers={"If-None-Match": etag}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+
+
+def test_etag_depends_on_query_and_accept(client, sample_user):
+    etag = client.get(DAILY_BALANCE, params={"username": sample_user}).headers["ETag"]
+
+    other_query = client.get(
+        DAILY_BALANCE, params={"username": sample_user, "max_points": 10}, headers={"If-None-Match": etag}
+    )
+    assert other_query.status_code == 200
+    assert other_query.headers["ETag"] != etag
+
+    other_accept = client.get(
+        DAILY_BALANCE, params={"username": sample_user}, headers={"If-None-Match": etag, "Accept": "text/csv"}
+    )
+    assert other_accept.status_code == 200
+    assert other_accept.headers["ETag"] != etag
+    assert "Accept" in other_accept.headers["Vary"]
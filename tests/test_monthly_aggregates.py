@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+# The SQL pushdown (query_monthly_aggregates) and the pandas fallback
+# (compute_monthly_aggregates) must store the same monthly rows
+
+
+def pandas_aggregates(conn, table_name, carry_balance=None, start=None):
+    from sqlalchemy import text
+    from database.monthly_aggregates import compute_monthly_aggregates
+
+    query = f'SELECT date, debit_amount, credit_amount, balance_amount FROM "{table_name}"'
+    params = {}
+    if start is not None:
+        query += ' WHERE date >= :start'
+        params['start'] = start.date()
+    df = pd.read_sql(text(query + ' ORDER BY date, id'), conn, params=params)
+    return compute_monthly_aggregates(df, carry_balance, start)
+
+
+def assert_same_aggregates(pushdown, fallback):
+    from database.monthly_aggregates import AGGREGATE_COLUMNS
+
+    assert not fallback.empty
+    assert pushdown['month'].tolist() == fallback['month'].tolist()
+    pd.testing.assert_frame_equal(
+        pushdown[AGGREGATE_COLUMNS].astype(float), fallback[AGGREGATE_COLUMNS].astype(float),
+        check_exact=False, rtol=1e-9,
+    )
+
+
+@pytest.fixture
+def sample_table(sample_user):
+    from database import crud
+
+    return crud.get_user_statements(sample_user)["table_names"][0]
+
+
+def test_pushdown_matches_pandas(sample_table):
+    from database.db import engine
+    from database.monthly_aggregates import query_monthly_aggregates
+
+    with engine.connect() as conn:
+        pushdown = query_monthly_aggregates(conn, sample_table)
+        fallback = pandas_aggregates(conn, sample_table)
+    assert_same_aggregates(pushdown, fallback)
+
+
+def test_pushdown_matches_pandas_from_a_month(sample_table):
+    from sqlalchemy import text
+    from database.db import engine
+    from database.monthly_aggregates import query_monthly_aggregates
+
+    with engine.connect() as conn:
+        months = conn.execute(text(
+            f"SELECT DISTINCT date_trunc('month', date)::date FROM \"{sample_table}\" WHERE date IS NOT NULL ORDER BY 1"
+        )).scalars().all()
+        start = pd.Timestamp(months[len(months) // 2])
+        carry_balance = conn.execute(text(
+            f'SELECT balance_amount FROM "{sample_table}" WHERE date < :start AND balance_amount IS NOT NULL '
+            f'ORDER BY date DESC, id DESC LIMIT 1'
+        ), {"start": start.date()}).scalar()
+
+        pushdown = query_monthly_aggregates(conn, sample_table, carry_balance, start)
+        fallback = pandas_aggregates(conn, sample_table, carry_balance, start)
+    assert pushdown['month'].iloc[0] == start.strftime('%Y-%m')
+    assert_same_aggregates(pushdown, fallback)
+
+
+def test_debit_credit_chart_is_the_same_without_pushdown(client, sample_user, clear_caches, monkeypatch):
+    from database import crud, monthly_aggregates
+    from database.db import engine, monthly_aggregates as aggregates_table
+
+    user_id = crud.get_user_statements(sample_user)["user_id"]
+
+    def chart():
+        with engine.begin() as conn:
+            conn.execute(aggregates_table.delete().where(aggregates_table.c.user_id == user_id))
+        clear_caches()
+        response = client.get("/monthly-debit-credit/monthly-debit-credit", params={"username": sample_user})
+        assert response.status_code == 200
+        return pd.DataFrame(response.json()["monthly_debit_credit"]).set_index("month")
+
+    pushdown = chart()
+    monkeypatch.setattr(monthly_aggregates, "AGGREGATE_PUSHDOWN", False)
+    fallback = chart()
+    assert not fallback.empty
+    pd.testing.assert_frame_equal(pushdown, fallback, check_exact=False, rtol=1e-9)
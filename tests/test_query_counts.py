@@ -0,0 +1,30 @@
+import pytest
+
+# Statements each per-user read may send to the database, whatever the number of
+# statement tables (the ETag lookup of the conditional GET middleware included)
+ENDPOINT_QUERY_LIMITS = {
+    "/summary/get-monthly-summary": 4,
+    "/overview/overview_data": 3,
+    "/daily-balance/get-daily-balance": 2,
+    "/monthly-balance-chart/monthly-avg-balance": 2,
+    "/monthly-debit-credit/monthly-debit-credit": 2,
+    "/monthly-cashflow/monthly-cashflow": 2,
+    "/cashflow/cashflow-page": 4,
+    "/transactions/get-all-transactions": 3,
+    "/metadata/get-metadata": 3,
+}
+
+
+@pytest.mark.parametrize("path", list(ENDPOINT_QUERY_LIMITS))
+def test_query_count_is_bounded(client, sample_user, two_statements_user, count_queries, clear_caches, path):
+    counts = {}
+    for username in (sample_user, two_statements_user):
+        clear_caches()
+        with count_queries() as statements:
+            response = client.get(path, params={"username": username})
+        assert response.status_code == 200
+        counts[username] = len(statements)
+
+    assert counts[sample_user] <= ENDPOINT_QUERY_LIMITS[path], statements
+    # A second statement table must not cost another round trip
+    assert counts[two_statements_user] == counts[sample_user]